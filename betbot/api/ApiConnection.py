@@ -17,69 +17,126 @@ You should have received a copy of the GNU General Public License
 along with betbot.  If not, see <http://www.gnu.org/licenses/>.
 LICENSE"""
 
-import os
 import json
+import time
 import requests
-import logging
+from threading import Lock
+from urllib.parse import urlparse
 from typing import List, Dict, Optional, Any, Tuple
-from base64 import b64encode
+from requests.adapters import HTTPAdapter
 from betbot.api.Bet import Bet
+from betbot.api.BetLedger import BetLedger
 from betbot.api.Match import Match
+from betbot.api.ApiConnectionBase import ApiConnectionBase
 
 
-class ApiConnection:
+class ApiConnection(ApiConnectionBase):
     """
     Class that handles API calls to the bundesliga-tippspiel instance
     """
 
-    def __init__(self, username: str, password: str, url: str):
+    sessions: Dict[Tuple[str, int], requests.Session] = {}
+    """
+    Pooled HTTP sessions, shared by all API connections to the same host
+    that use the same pool size
+    """
+
+    sessions_lock = Lock()
+    """
+    Lock that guards the creation of shared sessions
+    """
+
+    def __init__(
+            self,
+            username: str,
+            password: str,
+            url: str,
+            pool_size: int = 10,
+            timeout: float = 30.0,
+            retries: int = 3,
+            backoff: float = 0.5,
+            session: Optional[requests.Session] = None,
+            key_lifetime: float = 60 * 60 * 24,
+            expiration_margin: float = 60.0,
+            ledger: Optional[BetLedger] = None
+    ):
         """
         Intitializes the API connection
         :param username: The username on bundesliga-tippspiel
         :param password: The password for that user
         :param url: The base url to the bundesliga-tippspiel instance
+        :param pool_size: The maximum amount of pooled connections per host
+        :param timeout: The default timeout for API calls in seconds
+        :param retries: How often a failed API call is retried
+        :param backoff: The base delay between retries in seconds
+        :param session: An explicit session to use. If not provided,
+                        the shared session for the URL's host and the
+                        pool size is used
+        :param key_lifetime: The assumed lifetime of an API key in seconds
+                             if the server does not provide an expiration
+        :param expiration_margin: Keys are renewed this many seconds
+                                  before they expire
+        :param ledger: If provided, only bets that differ from the ones
+                       recorded in this ledger are submitted
         """
-        self.logger = logging.getLogger(__name__)
-        self.username = username
-        self.password = password
-        self.url = os.path.join(url, "api/v3") + "/"
-        self.api_key = ""
+        super().__init__(
+            username,
+            password,
+            url,
+            timeout,
+            retries,
+            backoff,
+            key_lifetime,
+            expiration_margin,
+            ledger
+        )
+        self.session = session if session is not None \
+            else self.get_session(url, pool_size)
         self.login()
         self.logger.debug("Initialized")
 
-    @property
-    def auth_headers(self) -> Dict[str, str]:
+    @classmethod
+    def get_session(cls, url: str, pool_size: int = 10) -> requests.Session:
         """
-        :return: Authorization headers for API calls
+        Retrieves the shared keep-alive session for a host and pool size.
+        The session is created on first use.
+        :param url: The URL whose host the session is used for
+        :param pool_size: The maximum amount of pooled connections
+        :return: The session
         """
-        return {"Authorization": "Basic " + self.api_key}
+        key = (urlparse(url).netloc, pool_size)
+        with cls.sessions_lock:
+            session = cls.sessions.get(key)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=pool_size, pool_maxsize=pool_size
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                cls.sessions[key] = session
+            return session
 
-    def login(self) -> bool:
+    def login(self, force: bool = False) -> bool:
         """
         Retrieves an API Key using a username and password if no key
         has been retrieved yet or if the existing key has expired
+        :param force: Requests a new API key even if the current one
+                      is still considered valid
         :return: True if the login was successfulle
         """
-        if not self.authorized():
+        if force or not self.key_valid:
             self.logger.info("Requesting new API Key")
-            creds = {"username": self.username, "password": self.password}
-            data = self.execute_api_call("key", "POST", False, creds)
-
-            if data["status"] != "ok":
-                self.logger.warning("Login attempt failed")
-                return False
-            else:
-                api_key = data["data"]["api_key"]
-                encoded = b64encode(api_key.encode("utf-8"))
-                self.api_key = encoded.decode("utf-8")
-                self.logger.info("Login successful")
-                return True
+            _, data = self.send_request(
+                "key", "POST", json_data=self.credentials
+            )
+            return self.store_key(data)
         else:
             return True
 
     def authorized(self) -> bool:
         """
-        Checks if the stored API key is valid
+        Checks with the server if the stored API key is valid
         :return: True if valid, False if not (for example because it expired)
         """
         self.logger.debug("Authorization Check")
@@ -94,29 +151,27 @@ class ApiConnection:
         self.execute_api_call(
             "key", "DELETE", json_data={"api_key": self.api_key}
         )
+        self.invalidate_key()
         self.logger.info("Logging out.")
 
     def get_active_leagues(self) -> List[Tuple[str, int]]:
         """
         :return: A list of tuples of leagues and seasons of active leagues
         """
-        leagues = self.execute_api_call(
-            "leagues", "GET", True
-        )["data"]["leagues"]
-        newest_season = max([x[1] for x in leagues])
-        return [x for x in leagues if x[1] == newest_season]
+        return self.parse_leagues(
+            self.execute_api_call("leagues", "GET", True)
+        )
 
-    def get_league_table(self, season: str, league: int) -> List[str]:
+    def get_league_table(self, league: str, season: int) -> List[str]:
         """
         Retrieves the current league table order
-        :param season: The league for which to retrieve the league table
-        :param league: The season for which to retrieve the league table
+        :param league: The league for which to retrieve the league table
+        :param season: The season for which to retrieve the league table
         :return: The team abbreviations in order of their league rankings
         """
-        league_table = self.execute_api_call(
-            f"league_table/{season}/{league}", "GET", True
-        )["data"]["league_table"]
-        return [x[1]["abbreviation"] for x in league_table]
+        return self.parse_league_table(self.execute_api_call(
+            f"league_table/{league}/{season}", "GET", True
+        ))
 
     def get_current_matchday_matches(
             self, league: str, season: int
@@ -128,10 +183,9 @@ class ApiConnection:
         :return: The list of matches
         """
         self.logger.debug("Getting current matches")
-        match_data = self.execute_api_call(
+        return self.parse_matches(self.execute_api_call(
             f"matchday/{league}/{season}", "GET", True
-        )["data"]["matches"]
-        return [Match.from_json(x) for x in match_data]
+        ))
 
     def place_bets(self, bets: List[Bet]):
         """
@@ -139,20 +193,15 @@ class ApiConnection:
         :param bets: The bets to place
         :return: None
         """
-        for bet in bets:
-            self.logger.info(f"Placing bet: "
-                             f"{bet.match.home_team} VS {bet.match.away_team}:"
-                             f" {bet.home_score}:{bet.away_score}")
+        bets = self.select_bets(bets)
+        if len(bets) == 0:
+            return
 
         bet_dicts = [bet.to_dict() for bet in bets]
         data = self.execute_api_call(
             "place_bets", "PUT", True, {"bets": bet_dicts}
         )
-        if data["status"] != "ok":
-            self.logger.error("Failed to place bets")
-        else:
-            placed = len(data["data"]["placed"])
-            self.logger.info(f"Placed {placed} bets (user:{self.username})")
+        self.record_bets(bets, data)
 
     def execute_api_call(
             self,
@@ -160,26 +209,82 @@ class ApiConnection:
             method: str,
             authorization_required: bool = False,
             json_data: Optional[Dict[str, Any]] = None,
+            timeout: Optional[float] = None
     ) -> Dict[str, Any]:
         """
         Executes an API call
+        If the server rejects the API key, a new key is requested and
+        the call is replayed once.
         :param endpoint: The API endpoint
         :param method: The request method
         :param authorization_required: Whether authoirzation is required
         :param json_data: The JSON data to send
+        :param timeout: Overrides the default timeout for this call
         :return: The response JSON
         """
-        if authorization_required and endpoint != "authorize":
+        if not authorization_required:
+            return self.send_request(endpoint, method, None, json_data,
+                                     timeout)[1]
+
+        if endpoint != "authorize":
             logged_in = self.login()
             if not logged_in:
                 return {"status": "error"}
 
-        extras = {}
-        if authorization_required:
-            extras["headers"] = self.auth_headers
+        status_code, data = self.send_request(
+            endpoint, method, self.auth_headers, json_data, timeout
+        )
+        if self.key_rejected(status_code, data) and endpoint != "authorize":
+            self.logger.info("API key was rejected, logging in again")
+            if self.login(force=True):
+                status_code, data = self.send_request(
+                    endpoint, method, self.auth_headers, json_data, timeout
+                )
+        return data
+
+    def send_request(
+            self,
+            endpoint: str,
+            method: str,
+            headers: Optional[Dict[str, str]] = None,
+            json_data: Optional[Dict[str, Any]] = None,
+            timeout: Optional[float] = None
+    ) -> Tuple[int, Dict[str, Any]]:
+        """
+        Sends a single HTTP request to the API
+        Server errors and connection problems are retried with a jittered
+        exponential backoff if the request method is idempotent.
+        :param endpoint: The API endpoint
+        :param method: The request method
+        :param headers: The headers to send
+        :param json_data: The JSON data to send
+        :param timeout: Overrides the default timeout for this call
+        :return: The HTTP status code and the response JSON
+        """
+        extras: Dict[str, Any] = {}
+        if headers is not None:
+            extras["headers"] = headers
         if json_data is not None:
             extras["json"] = json_data
 
+        extras["timeout"] = self.timeout if timeout is None else timeout
+
         api_url = self.url + endpoint
-        resp = requests.request(method, api_url, **extras)  # type: ignore
-        return json.loads(resp.text)
+        retries = self.max_retries(method)
+        for attempt in range(retries + 1):
+            last_attempt = attempt == retries
+            try:
+                resp = self.session.request(method, api_url, **extras)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if last_attempt:
+                    raise e
+                self.logger.warning(f"{method} {endpoint} failed: {e}")
+            else:
+                if resp.status_code < 500 or last_attempt:
+                    return resp.status_code, json.loads(resp.text)
+                self.logger.warning(
+                    f"{method} {endpoint} failed: HTTP {resp.status_code}"
+                )
+            time.sleep(self.backoff_delay(attempt))
+
+        return 0, {"status": "error"}
@@ -0,0 +1,295 @@
+"""LICENSE
+Copyright 2020 Hermann Krumrey <hermann@krumreyh.com>
+
+This file is part of betbot.
+
+betbot is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+betbot is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with betbot.  If not, see <http://www.gnu.org/licenses/>.
+LICENSE"""
+
+import os
+import time
+import random
+import logging
+from math import isfinite
+from datetime import datetime, timezone
+from typing import List, Dict, Optional, Any, Tuple
+from base64 import b64encode
+from betbot.api.Bet import Bet
+from betbot.api.BetLedger import BetLedger
+from betbot.api.Match import Match
+
+
+class ApiConnectionBase:
+    """
+    Class that contains the parts of an API connection that do not depend
+    on how requests are sent: the API key handling, the parsing of
+    responses and the selection of bets to place.
+    Subclasses implement the transport.
+    """
+
+    RETRY_METHODS = {"GET", "HEAD", "OPTIONS", "DELETE"}
+    """
+    The request methods that are retried after server or connection
+    errors. Other methods, for example the one placing bets, are not
+    idempotent and are only sent once.
+    """
+
+    def __init__(
+            self,
+            username: str,
+            password: str,
+            url: str,
+            timeout: float = 30.0,
+            retries: int = 3,
+            backoff: float = 0.5,
+            key_lifetime: float = 60 * 60 * 24,
+            expiration_margin: float = 60.0,
+            ledger: Optional[BetLedger] = None
+    ):
+        """
+        Intitializes the API connection
+        :param username: The username on bundesliga-tippspiel
+        :param password: The password for that user
+        :param url: The base url to the bundesliga-tippspiel instance
+        :param timeout: The default timeout for API calls in seconds
+        :param retries: How often a failed API call is retried
+        :param backoff: The base delay between retries in seconds
+        :param key_lifetime: The assumed lifetime of an API key in seconds
+                             if the server does not provide an expiration
+        :param expiration_margin: Keys are renewed this many seconds
+                                  before they expire
+        :param ledger: If provided, only bets that differ from the ones
+                       recorded in this ledger are submitted
+        """
+        self.logger = logging.getLogger(self.__class__.__module__)
+        self.username = username
+        self.password = password
+        self.url = os.path.join(url, "api/v3") + "/"
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.key_lifetime = key_lifetime
+        self.expiration_margin = expiration_margin
+        self.ledger = ledger
+        self.api_key = ""
+        self.api_key_issued: Optional[float] = None
+        self.api_key_expiration: Optional[float] = None
+
+    @property
+    def credentials(self) -> Dict[str, str]:
+        """
+        :return: The credentials used to request an API key
+        """
+        return {"username": self.username, "password": self.password}
+
+    @property
+    def auth_headers(self) -> Dict[str, str]:
+        """
+        :return: Authorization headers for API calls
+        """
+        return {"Authorization": "Basic " + self.api_key}
+
+    @property
+    def key_valid(self) -> bool:
+        """
+        Checks locally whether the stored API key is still usable.
+        Keys are trusted until shortly before they expire, the server is
+        only consulted again once it rejects a request.
+        :return: True if the API key exists and has not expired yet
+        """
+        if self.api_key == "" or self.api_key_expiration is None:
+            return False
+        return time.time() < self.api_key_expiration - self.expiration_margin
+
+    def invalidate_key(self):
+        """
+        Forgets the stored API key, forcing a new login on the next call
+        :return: None
+        """
+        self.api_key = ""
+        self.api_key_issued = None
+        self.api_key_expiration = None
+
+    def store_key(self, data: Dict[str, Any]) -> bool:
+        """
+        Stores the API key of a login response
+        :param data: The response JSON of the login request
+        :return: True if the login was successful
+        """
+        if data["status"] != "ok":
+            self.logger.warning("Login attempt failed")
+            self.invalidate_key()
+            return False
+
+        api_key = data["data"]["api_key"]
+        encoded = b64encode(api_key.encode("utf-8"))
+        self.api_key = encoded.decode("utf-8")
+        self.api_key_issued = time.time()
+        self.api_key_expiration = self.parse_expiration(
+            data["data"].get("expiration"),
+            self.api_key_issued + self.key_lifetime
+        )
+        self.logger.info("Login successful")
+        return True
+
+    def parse_expiration(self, expiration: Any, default: float) -> float:
+        """
+        Parses the expiration of an API key. The server may provide it as
+        a UNIX timestamp or as an ISO 8601 date string.
+        :param expiration: The expiration provided by the server
+        :param default: The expiration to use if the provided one is
+                        missing, invalid or already over
+        :return: The expiration as a UNIX timestamp
+        """
+        if expiration is None:
+            return default
+        try:
+            parsed = float(expiration)
+        except (TypeError, ValueError):
+            try:
+                date = datetime.fromisoformat(str(expiration))
+            except ValueError:
+                date = None
+            if date is None:
+                self.logger.warning(f"Invalid key expiration: {expiration}")
+                return default
+            if date.tzinfo is None:
+                date = date.replace(tzinfo=timezone.utc)
+            parsed = date.timestamp()
+        if not isfinite(parsed) or parsed <= time.time():
+            self.logger.warning(f"Invalid key expiration: {expiration}")
+            return default
+        return parsed
+
+    # noinspection PyMethodMayBeStatic
+    def key_rejected(self, status_code: int, _: Dict[str, Any]) -> bool:
+        """
+        Checks whether the server rejected the API key of a request.
+        Other errors do not cause a new login, so that requests are not
+        replayed because of errors unrelated to the key.
+        :param status_code: The HTTP status code of the response
+        :param _: The response JSON
+        :return: True if the key was rejected
+        """
+        return status_code == 401
+
+    @staticmethod
+    def parse_leagues(data: Dict[str, Any]) -> List[Tuple[str, int]]:
+        """
+        Parses the response of the leagues endpoint
+        :param data: The response JSON
+        :return: A list of tuples of leagues and seasons of active leagues
+        """
+        leagues = data["data"]["leagues"]
+        newest_season = max([x[1] for x in leagues])
+        return [x for x in leagues if x[1] == newest_season]
+
+    @staticmethod
+    def parse_league_table(data: Dict[str, Any]) -> List[str]:
+        """
+        Parses the response of the league table endpoint
+        :param data: The response JSON
+        :return: The team abbreviations in order of their league rankings
+        """
+        return [x[1]["abbreviation"] for x in data["data"]["league_table"]]
+
+    @staticmethod
+    def parse_matches(data: Dict[str, Any]) -> List[Match]:
+        """
+        Parses the response of the matchday endpoint
+        :param data: The response JSON
+        :return: The list of matches
+        """
+        return [Match.from_json(x) for x in data["data"]["matches"]]
+
+    def select_bets(self, bets: List[Bet]) -> List[Bet]:
+        """
+        Selects the bets that have to be submitted. If a ledger is used,
+        bets that were already placed with the same score are left out.
+        :param bets: The bets to place
+        :return: The bets to submit
+        """
+        if self.ledger is not None:
+            bets = self.ledger.get_changed(self.username, bets)
+            if len(bets) == 0:
+                self.logger.info(f"No changed bets (user:{self.username})")
+                return []
+
+        for bet in bets:
+            self.logger.info(f"Placing bet: "
+                             f"{bet.match.home_team} VS {bet.match.away_team}:"
+                             f" {bet.home_score}:{bet.away_score}")
+        return bets
+
+    def record_bets(self, bets: List[Bet], data: Dict[str, Any]):
+        """
+        Handles the response of the place_bets endpoint. Only the bets
+        the server reports as placed are recorded in the ledger, rejected
+        bets are submitted again in the next cycle.
+        If the server does not report the placed bets in the format they
+        were sent in, the submitted bets are only recorded if all of them
+        were placed.
+        :param bets: The submitted bets
+        :param data: The response JSON
+        :return: None
+        """
+        if data["status"] != "ok":
+            self.logger.error("Failed to place bets")
+            return
+
+        entries = data.get("data", {}).get("placed", [])
+        try:
+            placed_keys = {self.bet_key(x) for x in entries}
+            placed = [
+                bet for bet in bets
+                if self.bet_key(bet.to_dict()) in placed_keys
+            ]
+        except (KeyError, TypeError):
+            placed = bets if len(entries) == len(bets) else []
+        self.logger.info(f"Placed {len(placed)} bets (user:{self.username})")
+        if len(placed) < len(bets):
+            self.logger.warning(
+                f"{len(bets) - len(placed)} bets were rejected "
+                f"(user:{self.username})"
+            )
+        if self.ledger is not None:
+            self.ledger.record(self.username, placed)
+
+    @staticmethod
+    def bet_key(bet: Dict[str, Any]) -> Tuple[str, ...]:
+        """
+        Identifies a bet by its match and score
+        :param bet: The bet as sent to or returned by the API
+        :return: The key of the bet
+        """
+        return tuple(str(bet[x]) for x in [
+            "league", "season", "matchday", "home_team", "away_team",
+            "home_score", "away_score"
+        ])
+
+    def max_retries(self, method: str) -> int:
+        """
+        Determines how often a failed request may be retried
+        :param method: The request method
+        :return: The maximum amount of retries
+        """
+        return self.retries if method.upper() in self.RETRY_METHODS else 0
+
+    def backoff_delay(self, attempt: int) -> float:
+        """
+        Calculates the delay before retrying a failed API call
+        :param attempt: The number of the failed attempt, starting at 0
+        :return: The delay in seconds
+        """
+        return self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
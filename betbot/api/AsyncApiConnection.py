@@ -0,0 +1,257 @@
+"""LICENSE
+Copyright 2020 Hermann Krumrey <hermann@krumreyh.com>
+
+This file is part of betbot.
+
+betbot is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+betbot is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with betbot.  If not, see <http://www.gnu.org/licenses/>.
+LICENSE"""
+
+import asyncio
+from typing import List, Dict, Optional, Any, Tuple
+from aiohttp import ClientSession, ClientTimeout, ClientConnectionError
+from betbot.api.Bet import Bet
+from betbot.api.BetLedger import BetLedger
+from betbot.api.Match import Match
+from betbot.api.ApiConnectionBase import ApiConnectionBase
+
+
+class AsyncApiConnection(ApiConnectionBase):
+    """
+    Class that handles API calls to the bundesliga-tippspiel instance
+    using asyncio. Mirrors the interface of the blocking ApiConnection,
+    with all API methods being coroutines.
+    """
+
+    def __init__(
+            self,
+            username: str,
+            password: str,
+            url: str,
+            session: ClientSession,
+            timeout: float = 30.0,
+            retries: int = 3,
+            backoff: float = 0.5,
+            key_lifetime: float = 60 * 60 * 24,
+            expiration_margin: float = 60.0,
+            ledger: Optional[BetLedger] = None
+    ):
+        """
+        Intitializes the API connection
+        Unlike the blocking ApiConnection, this does not log in yet,
+        the login coroutine has to be awaited explicitly.
+        :param username: The username on bundesliga-tippspiel
+        :param password: The password for that user
+        :param url: The base url to the bundesliga-tippspiel instance
+        :param session: The aiohttp session to use. Should be shared by
+                        all connections to the same host
+        :param timeout: The default timeout for API calls in seconds
+        :param retries: How often a failed API call is retried
+        :param backoff: The base delay between retries in seconds
+        :param key_lifetime: The assumed lifetime of an API key in seconds
+                             if the server does not provide an expiration
+        :param expiration_margin: Keys are renewed this many seconds
+                                  before they expire
+        :param ledger: If provided, only bets that differ from the ones
+                       recorded in this ledger are submitted
+        """
+        super().__init__(
+            username,
+            password,
+            url,
+            timeout,
+            retries,
+            backoff,
+            key_lifetime,
+            expiration_margin,
+            ledger
+        )
+        self.session = session
+        self.login_lock = asyncio.Lock()
+        self.logger.debug("Initialized")
+
+    async def login(self, force: bool = False) -> bool:
+        """
+        Retrieves an API Key using a username and password if no key
+        has been retrieved yet or if the existing key has expired
+        :param force: Requests a new API key even if the current one
+                      is still considered valid
+        :return: True if the login was successful
+        """
+        async with self.login_lock:
+            if not force and self.key_valid:
+                return True
+
+            self.logger.info("Requesting new API Key")
+            _, data = await self.send_request(
+                "key", "POST", json_data=self.credentials
+            )
+            return self.store_key(data)
+
+    async def authorized(self) -> bool:
+        """
+        Checks with the server if the stored API key is valid
+        :return: True if valid, False if not (for example because it expired)
+        """
+        self.logger.debug("Authorization Check")
+        data = await self.execute_api_call("authorize", "GET", True)
+        return data["status"] == "ok"
+
+    async def logout(self):
+        """
+        Logs out the bot by deleting the API key
+        :return: None
+        """
+        await self.execute_api_call(
+            "key", "DELETE", json_data={"api_key": self.api_key}
+        )
+        self.invalidate_key()
+        self.logger.info("Logging out.")
+
+    async def get_active_leagues(self) -> List[Tuple[str, int]]:
+        """
+        :return: A list of tuples of leagues and seasons of active leagues
+        """
+        return self.parse_leagues(
+            await self.execute_api_call("leagues", "GET", True)
+        )
+
+    async def get_league_table(self, league: str, season: int) -> List[str]:
+        """
+        Retrieves the current league table order
+        :param league: The league for which to retrieve the league table
+        :param season: The season for which to retrieve the league table
+        :return: The team abbreviations in order of their league rankings
+        """
+        return self.parse_league_table(await self.execute_api_call(
+            f"league_table/{league}/{season}", "GET", True
+        ))
+
+    async def get_current_matchday_matches(
+            self, league: str, season: int
+    ) -> List[Match]:
+        """
+        Retrieves a list of matches for the current matchday
+        :param league: The league to retrieve matches for
+        :param season: The season to retrieve matches for
+        :return: The list of matches
+        """
+        self.logger.debug("Getting current matches")
+        return self.parse_matches(await self.execute_api_call(
+            f"matchday/{league}/{season}", "GET", True
+        ))
+
+    async def place_bets(self, bets: List[Bet]):
+        """
+        Places a list of bets
+        :param bets: The bets to place
+        :return: None
+        """
+        bets = self.select_bets(bets)
+        if len(bets) == 0:
+            return
+
+        bet_dicts = [bet.to_dict() for bet in bets]
+        data = await self.execute_api_call(
+            "place_bets", "PUT", True, {"bets": bet_dicts}
+        )
+        self.record_bets(bets, data)
+
+    async def execute_api_call(
+            self,
+            endpoint: str,
+            method: str,
+            authorization_required: bool = False,
+            json_data: Optional[Dict[str, Any]] = None,
+            timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Executes an API call
+        If the server rejects the API key, a new key is requested and
+        the call is replayed once.
+        :param endpoint: The API endpoint
+        :param method: The request method
+        :param authorization_required: Whether authoirzation is required
+        :param json_data: The JSON data to send
+        :param timeout: Overrides the default timeout for this call
+        :return: The response JSON
+        """
+        if not authorization_required:
+            _, data = await self.send_request(
+                endpoint, method, None, json_data, timeout
+            )
+            return data
+
+        if endpoint != "authorize":
+            logged_in = await self.login()
+            if not logged_in:
+                return {"status": "error"}
+
+        status_code, data = await self.send_request(
+            endpoint, method, self.auth_headers, json_data, timeout
+        )
+        if self.key_rejected(status_code, data) and endpoint != "authorize":
+            self.logger.info("API key was rejected, logging in again")
+            if await self.login(force=True):
+                status_code, data = await self.send_request(
+                    endpoint, method, self.auth_headers, json_data, timeout
+                )
+        return data
+
+    async def send_request(
+            self,
+            endpoint: str,
+            method: str,
+            headers: Optional[Dict[str, str]] = None,
+            json_data: Optional[Dict[str, Any]] = None,
+            timeout: Optional[float] = None
+    ) -> Tuple[int, Dict[str, Any]]:
+        """
+        Sends a single HTTP request to the API
+        Server errors and connection problems are retried with a jittered
+        exponential backoff if the request method is idempotent.
+        :param endpoint: The API endpoint
+        :param method: The request method
+        :param headers: The headers to send
+        :param json_data: The JSON data to send
+        :param timeout: Overrides the default timeout for this call
+        :return: The HTTP status code and the response JSON
+        """
+        client_timeout = ClientTimeout(
+            total=self.timeout if timeout is None else timeout
+        )
+        api_url = self.url + endpoint
+        retries = self.max_retries(method)
+        for attempt in range(retries + 1):
+            last_attempt = attempt == retries
+            try:
+                async with self.session.request(
+                        method,
+                        api_url,
+                        headers=headers,
+                        json=json_data,
+                        timeout=client_timeout
+                ) as resp:
+                    if resp.status < 500 or last_attempt:
+                        data = await resp.json(content_type=None)
+                        return resp.status, data
+                    self.logger.warning(
+                        f"{method} {endpoint} failed: HTTP {resp.status}"
+                    )
+            except (ClientConnectionError, asyncio.TimeoutError) as e:
+                if last_attempt:
+                    raise e
+                self.logger.warning(f"{method} {endpoint} failed: {e}")
+            await asyncio.sleep(self.backoff_delay(attempt))
+
+        return 0, {"status": "error"}
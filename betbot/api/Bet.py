@@ -26,6 +26,8 @@ class Bet:
     Class that encapsulates Bet information
     """
 
+    __slots__ = ("match", "home_score", "away_score")
+
     def __init__(self, match: Match, home_score: int, away_score: int):
         """
         Initializes the Bet
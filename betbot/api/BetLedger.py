@@ -0,0 +1,104 @@
+"""LICENSE
+Copyright 2020 Hermann Krumrey <hermann@krumreyh.com>
+
+This file is part of betbot.
+
+betbot is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+betbot is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with betbot.  If not, see <http://www.gnu.org/licenses/>.
+LICENSE"""
+
+import os
+import sqlite3
+from threading import Lock
+from typing import List, Optional
+from betbot.api.Bet import Bet
+
+
+class BetLedger:
+    """
+    Class that keeps a persistent local record of the bets that were
+    placed for each user. Used to only submit bets that changed.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Initializes the ledger and creates its database if necessary
+        :param path: The path to the SQLite database file.
+                     Defaults to ~/.config/betbot/ledger.db
+        """
+        if path is None:
+            path = os.path.join(
+                os.path.expanduser("~"), ".config/betbot/ledger.db"
+            )
+        dirname = os.path.dirname(path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+
+        self.path = path
+        self.lock = Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS bets ("
+                "username TEXT NOT NULL, "
+                "league TEXT NOT NULL, "
+                "season INTEGER NOT NULL, "
+                "matchday INTEGER NOT NULL, "
+                "home_team TEXT NOT NULL, "
+                "away_team TEXT NOT NULL, "
+                "home_score INTEGER NOT NULL, "
+                "away_score INTEGER NOT NULL, "
+                "PRIMARY KEY (username, league, season, matchday, "
+                "home_team, away_team))"
+            )
+
+    def get_changed(self, username: str, bets: List[Bet]) -> List[Bet]:
+        """
+        Determines which bets differ from the ones placed previously
+        :param username: The user placing the bets
+        :param bets: The bets to check
+        :return: The bets that are new or have a different score
+        """
+        changed = []
+        with self.lock:
+            for bet in bets:
+                match = bet.match
+                row = self.connection.execute(
+                    "SELECT home_score, away_score FROM bets "
+                    "WHERE username=? AND league=? AND season=? "
+                    "AND matchday=? AND home_team=? AND away_team=?",
+                    (username, match.league, match.season, match.matchday,
+                     match.home_team, match.away_team)
+                ).fetchone()
+                if row is None or tuple(row) != \
+                        (bet.home_score, bet.away_score):
+                    changed.append(bet)
+        return changed
+
+    def record(self, username: str, bets: List[Bet]):
+        """
+        Stores bets that were successfully placed
+        :param username: The user that placed the bets
+        :param bets: The placed bets
+        :return: None
+        """
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO bets VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (username, bet.match.league, bet.match.season,
+                     bet.match.matchday, bet.match.home_team,
+                     bet.match.away_team, bet.home_score, bet.away_score)
+                    for bet in bets
+                ]
+            )
@@ -0,0 +1,153 @@
+"""LICENSE
+Copyright 2020 Hermann Krumrey <hermann@krumreyh.com>
+
+This file is part of betbot.
+
+betbot is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+betbot is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with betbot.  If not, see <http://www.gnu.org/licenses/>.
+LICENSE"""
+
+import asyncio
+from typing import List, Dict, Optional, Any, Tuple, Coroutine, TypeVar
+from betbot.api.Bet import Bet
+from betbot.api.Match import Match
+from betbot.api.AsyncApiConnection import AsyncApiConnection
+
+T = TypeVar("T")
+
+
+class BlockingApiConnection:
+    """
+    Blocking view of an AsyncApiConnection with the interface of the
+    blocking ApiConnection.
+    Allows predictors running in worker threads to use the API while the
+    actual requests are executed on the event loop of the async connection.
+    Must not be used from within the event loop's thread.
+    """
+
+    def __init__(
+            self,
+            api: AsyncApiConnection,
+            loop: asyncio.AbstractEventLoop
+    ):
+        """
+        Initializes the blocking API connection
+        :param api: The asynchronous API connection to wrap
+        :param loop: The event loop the asynchronous connection runs on
+        """
+        self.async_api = api
+        self.loop = loop
+
+    @property
+    def username(self) -> str:
+        """
+        :return: The username of the wrapped connection
+        """
+        return self.async_api.username
+
+    @property
+    def url(self) -> str:
+        """
+        :return: The API URL of the wrapped connection
+        """
+        return self.async_api.url
+
+    def run(self, coroutine: Coroutine[Any, Any, T]) -> T:
+        """
+        Runs a coroutine on the event loop and waits for its result
+        :param coroutine: The coroutine to run
+        :return: The result of the coroutine
+        """
+        return asyncio.run_coroutine_threadsafe(
+            coroutine, self.loop
+        ).result()
+
+    def login(self, force: bool = False) -> bool:
+        """
+        Logs in using the wrapped connection
+        :param force: Requests a new API key even if the current one
+                      is still considered valid
+        :return: True if the login was successful
+        """
+        return self.run(self.async_api.login(force))
+
+    def authorized(self) -> bool:
+        """
+        Checks with the server if the stored API key is valid
+        :return: True if valid, False if not (for example because it expired)
+        """
+        return self.run(self.async_api.authorized())
+
+    def logout(self):
+        """
+        Logs out the bot by deleting the API key
+        :return: None
+        """
+        self.run(self.async_api.logout())
+
+    def get_active_leagues(self) -> List[Tuple[str, int]]:
+        """
+        :return: A list of tuples of leagues and seasons of active leagues
+        """
+        return self.run(self.async_api.get_active_leagues())
+
+    def get_league_table(self, league: str, season: int) -> List[str]:
+        """
+        Retrieves the current league table order
+        :param league: The league for which to retrieve the league table
+        :param season: The season for which to retrieve the league table
+        :return: The team abbreviations in order of their league rankings
+        """
+        return self.run(self.async_api.get_league_table(league, season))
+
+    def get_current_matchday_matches(
+            self, league: str, season: int
+    ) -> List[Match]:
+        """
+        Retrieves a list of matches for the current matchday
+        :param league: The league to retrieve matches for
+        :param season: The season to retrieve matches for
+        :return: The list of matches
+        """
+        return self.run(
+            self.async_api.get_current_matchday_matches(league, season)
+        )
+
+    def place_bets(self, bets: List[Bet]):
+        """
+        Places a list of bets
+        :param bets: The bets to place
+        :return: None
+        """
+        self.run(self.async_api.place_bets(bets))
+
+    def execute_api_call(
+            self,
+            endpoint: str,
+            method: str,
+            authorization_required: bool = False,
+            json_data: Optional[Dict[str, Any]] = None,
+            timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Executes an API call on the event loop and waits for the result
+        :param endpoint: The API endpoint
+        :param method: The request method
+        :param authorization_required: Whether authoirzation is required
+        :param json_data: The JSON data to send
+        :param timeout: Overrides the default timeout for this call
+        :return: The response JSON
+        """
+        return self.run(self.async_api.execute_api_call(
+            endpoint, method, authorization_required, json_data, timeout
+        ))
@@ -17,7 +17,8 @@ You should have received a copy of the GNU General Public License
 along with betbot.  If not, see <http://www.gnu.org/licenses/>.
 LICENSE"""
 
-from typing import Dict, Any
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional
 
 
 class Match:
@@ -25,22 +26,42 @@ class Match:
     Class that encapsulates information about a Match
     """
 
+    __slots__ = (
+        "league",
+        "season",
+        "matchday",
+        "home_team",
+        "away_team",
+        "finished",
+        "kickoff",
+        "home_score",
+        "away_score"
+    )
+
     def __init__(
             self,
             league: str,
-            season: str,
+            season: int,
             matchday: int,
             home_team: str,
             away_team: str,
-            finished: bool
+            finished: bool,
+            kickoff: Optional[datetime] = None,
+            home_score: Optional[int] = None,
+            away_score: Optional[int] = None
     ):
         """
         Initializes the Match
-        :param _id: The ID of the match
+        :param league: The league of the match
+        :param season: The season of the match
         :param matchday: The matchday of the match
-        :param home_team: The name of the home team
-        :param away_team: The name of the away team
+        :param home_team: The abbreviation of the home team
+        :param away_team: The abbreviation of the away team
         :param finished: Whether the match is already finished or not
+        :param kickoff: The kickoff time of the match in UTC.
+                        Bets can be placed until this time.
+        :param home_score: The current goals of the home team, if known
+        :param away_score: The current goals of the away team, if known
         """
         self.league = league
         self.season = season
@@ -48,6 +69,9 @@ class Match:
         self.home_team = home_team
         self.away_team = away_team
         self.finished = finished
+        self.kickoff = kickoff
+        self.home_score = home_score
+        self.away_score = away_score
 
     @classmethod
     def from_json(
@@ -65,5 +89,28 @@ class Match:
             json_data["matchday"],
             json_data["home_team_abbreviation"],
             json_data["away_team_abbreviation"],
-            json_data["finished"]
+            json_data["finished"],
+            cls.parse_kickoff(json_data.get("kickoff")),
+            json_data.get("home_current_score"),
+            json_data.get("away_current_score")
         )
+
+    @staticmethod
+    def parse_kickoff(kickoff: Optional[str]) -> Optional[datetime]:
+        """
+        Parses a kickoff string as provided by the API
+        :param kickoff: The kickoff string, for example 2020-09-18:18-30-00
+        :return: The kickoff time in UTC or None if it could not be parsed
+        """
+        if kickoff is None:
+            return None
+        try:
+            parsed = datetime.strptime(kickoff, "%Y-%m-%d:%H-%M-%S")
+        except ValueError:
+            try:
+                parsed = datetime.fromisoformat(kickoff)
+            except ValueError:
+                return None
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed
@@ -0,0 +1,156 @@
+"""LICENSE
+Copyright 2020 Hermann Krumrey <hermann@krumreyh.com>
+
+This file is part of betbot.
+
+betbot is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+betbot is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with betbot.  If not, see <http://www.gnu.org/licenses/>.
+LICENSE"""
+
+from typing import List, Sequence, Iterator
+from numpy import ndarray, array, asarray, arange
+from betbot.api.Bet import Bet
+from betbot.api.Match import Match
+from betbot.data.TeamRegistry import TeamRegistry
+
+
+class MatchBatch:
+    """
+    Class that holds a collection of matches (for example a matchday)
+    as parallel arrays. Allows predictors to work on whole matchdays
+    at once instead of iterating over Match objects.
+    """
+
+    __slots__ = (
+        "league",
+        "season",
+        "matchday",
+        "home_team",
+        "away_team",
+        "home_team_id",
+        "away_team_id",
+        "finished",
+        "matches"
+    )
+
+    def __init__(
+            self,
+            league: ndarray,
+            season: ndarray,
+            matchday: ndarray,
+            home_team: ndarray,
+            away_team: ndarray,
+            home_team_id: ndarray,
+            away_team_id: ndarray,
+            finished: ndarray,
+            matches: Sequence[Match]
+    ):
+        """
+        Initializes the MatchBatch. All arrays must have the same length.
+        :param league: The leagues of the matches
+        :param season: The seasons of the matches
+        :param matchday: The matchdays of the matches
+        :param home_team: The abbreviations of the home teams
+        :param away_team: The abbreviations of the away teams
+        :param home_team_id: The team IDs of the home teams
+        :param away_team_id: The team IDs of the away teams
+        :param finished: Whether the matches are already finished or not
+        :param matches: The Match objects the arrays were created from.
+                        They are kept so that no match data is lost.
+        """
+        self.league = league
+        self.season = season
+        self.matchday = matchday
+        self.home_team = home_team
+        self.away_team = away_team
+        self.home_team_id = home_team_id
+        self.away_team_id = away_team_id
+        self.finished = finished
+        self.matches = matches
+
+    @classmethod
+    def from_matches(cls, matches: Sequence[Match]):
+        """
+        Generates a MatchBatch from Match objects.
+        Teams are resolved to their IDs in the team registry, unknown
+        teams are registered.
+        :param matches: The matches
+        :return: The generated MatchBatch
+        """
+        teams = TeamRegistry.get()
+        return cls(
+            array([x.league for x in matches], dtype=str),
+            array([x.season for x in matches], dtype=int),
+            array([x.matchday for x in matches], dtype=int),
+            array([x.home_team for x in matches], dtype=str),
+            array([x.away_team for x in matches], dtype=str),
+            array([teams.register(x.home_team) for x in matches], dtype=int),
+            array([teams.register(x.away_team) for x in matches], dtype=int),
+            array([x.finished for x in matches], dtype=bool),
+            matches
+        )
+
+    def __len__(self) -> int:
+        """
+        :return: The amount of matches in the batch
+        """
+        return len(self.home_team)
+
+    def __iter__(self) -> Iterator[Match]:
+        """
+        :return: An iterator over the matches as Match objects
+        """
+        return iter(self.to_matches())
+
+    def to_matches(self) -> List[Match]:
+        """
+        Converts the batch back into Match objects
+        :return: The matches
+        """
+        return list(self.matches)
+
+    def select(self, mask: ndarray):
+        """
+        Selects a subset of the matches
+        :param mask: A boolean mask or an index array
+        :return: A new MatchBatch containing the selected matches
+        """
+        indexes = arange(len(self))[mask].tolist()
+        matches = [self.matches[i] for i in indexes]
+        return MatchBatch(
+            self.league[mask],
+            self.season[mask],
+            self.matchday[mask],
+            self.home_team[mask],
+            self.away_team[mask],
+            self.home_team_id[mask],
+            self.away_team_id[mask],
+            self.finished[mask],
+            matches
+        )
+
+    def to_bets(self, home_scores: ndarray, away_scores: ndarray) \
+            -> List[Bet]:
+        """
+        Creates Bet objects for all matches in the batch
+        :param home_scores: The home scores to bet, one per match
+        :param away_scores: The away scores to bet, one per match
+        :return: The bets
+        """
+        return [
+            Bet(match, home, away) for match, home, away in zip(
+                self.to_matches(),
+                asarray(home_scores).tolist(),
+                asarray(away_scores).tolist()
+            )
+        ]
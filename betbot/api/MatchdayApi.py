@@ -0,0 +1,54 @@
+"""LICENSE
+Copyright 2020 Hermann Krumrey <hermann@krumreyh.com>
+
+This file is part of betbot.
+
+betbot is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+betbot is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with betbot.  If not, see <http://www.gnu.org/licenses/>.
+LICENSE"""
+
+from typing import List, Tuple, Protocol
+from betbot.api.Match import Match
+
+
+class MatchdayApi(Protocol):
+    """
+    The blocking API calls that are needed to predict a matchday.
+    Implemented by ApiConnection, BlockingApiConnection and the
+    BacktestApi used while replaying past seasons.
+    """
+
+    def get_active_leagues(self) -> List[Tuple[str, int]]:
+        """
+        :return: A list of tuples of leagues and seasons of active leagues
+        """
+        ...
+
+    def get_league_table(self, league: str, season: int) -> List[str]:
+        """
+        Retrieves the current league table order
+        :param league: The league for which to retrieve the league table
+        :param season: The season for which to retrieve the league table
+        :return: The team abbreviations in order of their league rankings
+        """
+        ...
+
+    def get_current_matchday_matches(self, league: str, season: int) \
+            -> List[Match]:
+        """
+        Retrieves a list of matches for the current matchday
+        :param league: The league to retrieve matches for
+        :param season: The season to retrieve matches for
+        :return: The list of matches
+        """
+        ...
@@ -0,0 +1,175 @@
+"""LICENSE
+Copyright 2020 Hermann Krumrey <hermann@krumreyh.com>
+
+This file is part of betbot.
+
+betbot is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+betbot is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with betbot.  If not, see <http://www.gnu.org/licenses/>.
+LICENSE"""
+
+import atexit
+import logging
+from threading import Lock, BoundedSemaphore
+from contextlib import contextmanager
+from typing import List, Dict, Iterator, Optional
+from selenium.webdriver import Firefox
+from selenium.webdriver.firefox.options import Options
+from selenium.common.exceptions import WebDriverException
+
+
+class BrowserPool:
+    """
+    Class that manages a pool of headless Firefox instances.
+    Browsers are started lazily, reused between scraping jobs, recycled
+    after a number of pages or if they crashed and shut down on exit.
+    """
+
+    instance: Optional["BrowserPool"] = None
+    """
+    The process-wide browser pool
+    """
+
+    instance_lock = Lock()
+    """
+    Lock that guards the creation of the process-wide browser pool
+    """
+
+    def __init__(self, size: int = 1, max_pages: int = 50):
+        """
+        Initializes the browser pool. No browser is started yet.
+        :param size: The maximum amount of browsers running at once
+        :param max_pages: The amount of pages after which a browser
+                          is replaced with a fresh one
+        """
+        self.logger = logging.getLogger(__name__)
+        self.max_pages = max_pages
+        self.lock = Lock()
+        self.semaphore = BoundedSemaphore(size)
+        self.idle: List[Firefox] = []
+        self.pages: Dict[int, int] = {}
+        atexit.register(self.shutdown)
+
+    @classmethod
+    def get(cls) -> "BrowserPool":
+        """
+        :return: The process-wide browser pool
+        """
+        with cls.instance_lock:
+            if cls.instance is None:
+                cls.instance = cls()
+            return cls.instance
+
+    @contextmanager
+    def browser(self) -> Iterator[Firefox]:
+        """
+        Borrows a browser from the pool. Blocks while all browsers are busy.
+        The browser counts as having loaded one page once it is returned.
+        Browsers that raised a WebDriverException are discarded.
+        :return: A context manager providing the browser
+        """
+        with self.semaphore:
+            driver = self.acquire()
+            crashed = False
+            try:
+                yield driver
+            except WebDriverException as e:
+                self.logger.warning(f"Discarding crashed browser: {e}")
+                crashed = True
+                raise e
+            finally:
+                if crashed:
+                    self.quit(driver)
+                else:
+                    self.release(driver)
+
+    def acquire(self) -> Firefox:
+        """
+        Retrieves a healthy idle browser or starts a new one
+        :return: The browser
+        """
+        while True:
+            with self.lock:
+                driver = self.idle.pop() if len(self.idle) > 0 else None
+            if driver is None:
+                return self.launch()
+            if self.healthy(driver):
+                return driver
+            self.logger.info("Replacing unresponsive browser")
+            self.quit(driver)
+
+    def release(self, driver: Firefox):
+        """
+        Returns a browser to the pool or quits it if it has been used
+        for too many pages
+        :param driver: The browser
+        :return: None
+        """
+        with self.lock:
+            pages = self.pages.get(id(driver), 0) + 1
+            self.pages[id(driver)] = pages
+            recycle = pages >= self.max_pages
+            if not recycle:
+                self.idle.append(driver)
+        if recycle:
+            self.logger.info(f"Recycling browser after {pages} pages")
+            self.quit(driver)
+
+    def launch(self) -> Firefox:
+        """
+        Starts a new headless browser
+        :return: The browser
+        """
+        self.logger.info("Starting headless Firefox")
+        options = Options()
+        options.add_argument("-headless")
+        driver = Firefox(options=options)
+        with self.lock:
+            self.pages[id(driver)] = 0
+        return driver
+
+    @staticmethod
+    def healthy(driver: Firefox) -> bool:
+        """
+        Checks whether a browser still responds
+        :param driver: The browser to check
+        :return: True if the browser responds, False otherwise
+        """
+        try:
+            _ = driver.current_url
+            return True
+        except WebDriverException:
+            return False
+
+    def quit(self, driver: Firefox):
+        """
+        Quits a browser
+        :param driver: The browser to quit
+        :return: None
+        """
+        with self.lock:
+            self.pages.pop(id(driver), None)
+        try:
+            driver.quit()
+        except WebDriverException:
+            pass
+
+    def shutdown(self):
+        """
+        Quits all idle browsers
+        :return: None
+        """
+        with self.lock:
+            drivers = self.idle
+            self.idle = []
+        for driver in drivers:
+            self.quit(driver)
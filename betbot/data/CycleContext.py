@@ -0,0 +1,199 @@
+"""LICENSE
+Copyright 2020 Hermann Krumrey <hermann@krumreyh.com>
+
+This file is part of betbot.
+
+betbot is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+betbot is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with betbot.  If not, see <http://www.gnu.org/licenses/>.
+LICENSE"""
+
+import os
+import asyncio
+import logging
+from threading import Lock
+from typing import List, Tuple, Dict, Optional
+from betbot.api.Match import Match
+from betbot.api.MatchdayApi import MatchdayApi
+from betbot.api.AsyncApiConnection import AsyncApiConnection
+from betbot.data.OddsAggregator import OddsAggregator, Odds
+
+
+class CycleContext:
+    """
+    Class that caches the data required during a single bot cycle.
+    Active leagues, matchday matches, league tables and betting odds are
+    only fetched once and then shared by all predictors and accounts.
+    A new context should be created for every cycle.
+    """
+
+    def __init__(
+            self,
+            data_path: Optional[str] = None,
+            aggregator: Optional[OddsAggregator] = None
+    ):
+        """
+        Initializes the context
+        :param data_path: The path in which football-data.co.uk files
+                          are stored
+        :param aggregator: The aggregator used to retrieve betting odds.
+                           Defaults to one querying all odds sources.
+        """
+        if data_path is None:
+            data_path = os.path.join(
+                os.path.expanduser("~"), ".config/betbot/history"
+            )
+        self.logger = logging.getLogger(__name__)
+        self.data_path = data_path
+        self.lock = Lock()
+        self.odds_lock = Lock()
+        self.odds_locks: Dict[str, Lock] = {}
+        self.prefetch_lock: Optional[asyncio.Lock] = None
+        self.leagues: Optional[List[Tuple[str, int]]] = None
+        self.matches: Dict[Tuple[str, int], Tuple[Match, ...]] = {}
+        self.league_tables: Dict[Tuple[str, int], Tuple[str, ...]] = {}
+        self.odds: Dict[str, Odds] = {}
+        if aggregator is None:
+            aggregator = OddsAggregator(data_path)
+        self.aggregator = aggregator
+
+    def get_active_leagues(self, api: MatchdayApi) -> List[Tuple[str, int]]:
+        """
+        Retrieves the active leagues
+        :param api: The API connection used if the leagues are not cached
+        :return: A list of tuples of leagues and seasons of active leagues
+        """
+        with self.lock:
+            if self.leagues is None:
+                self.leagues = api.get_active_leagues()
+            return list(self.leagues)
+
+    def get_matches(
+            self,
+            api: MatchdayApi,
+            league: str,
+            season: int
+    ) -> Tuple[Match, ...]:
+        """
+        Retrieves the matches of the current matchday
+        :param api: The API connection used if the matches are not cached
+        :param league: The league to retrieve matches for
+        :param season: The season to retrieve matches for
+        :return: The matches
+        """
+        with self.lock:
+            key = (league, season)
+            if key not in self.matches:
+                self.matches[key] = tuple(
+                    api.get_current_matchday_matches(league, season)
+                )
+            return self.matches[key]
+
+    def get_all_matches(self) -> List[Match]:
+        """
+        :return: All matches fetched during this cycle
+        """
+        with self.lock:
+            return [
+                match for matches in self.matches.values() for match in matches
+            ]
+
+    def get_all_odds(self) -> Dict[str, Odds]:
+        """
+        :return: The odds fetched during this cycle, mapped to their leagues
+        """
+        with self.odds_lock:
+            return dict(self.odds)
+
+    def get_league_table(
+            self,
+            api: MatchdayApi,
+            league: str,
+            season: int
+    ) -> List[str]:
+        """
+        Retrieves the current league table order
+        :param api: The API connection used if the table is not cached
+        :param league: The league for which to retrieve the league table
+        :param season: The season for which to retrieve the league table
+        :return: The team abbreviations in order of their league rankings
+        """
+        with self.lock:
+            key = (league, season)
+            if key not in self.league_tables:
+                self.league_tables[key] = tuple(
+                    api.get_league_table(league, season)
+                )
+            return list(self.league_tables[key])
+
+    def get_odds(self, league: str) -> Odds:
+        """
+        Retrieves current odds from all odds sources. The odds are merged
+        and shared by all predictors.
+        If the matches of the league were already fetched, the sources are
+        only waited for until all unfinished matches have odds.
+        Odds of different leagues are fetched concurrently.
+        :param league: The league for which to retrieve odds
+        :return: The current odds (home, draw, away) mapped to home/away teams
+        """
+        with self.odds_lock:
+            league_lock = self.odds_locks.setdefault(league, Lock())
+
+        with league_lock:
+            with self.odds_lock:
+                if league in self.odds:
+                    return self.odds[league]
+            with self.lock:
+                matches = [
+                    (match.home_team, match.away_team)
+                    for key, league_matches in self.matches.items()
+                    if key[0] == league
+                    for match in league_matches
+                    if not match.finished
+                ]
+            odds = self.aggregator.get_odds(
+                league, matches if len(matches) > 0 else None
+            )
+            with self.odds_lock:
+                self.odds[league] = odds
+            return odds
+
+    async def prefetch(self, api: AsyncApiConnection):
+        """
+        Asynchronously fetches the active leagues as well as their matches
+        and league tables. Only the first call does any work, so every
+        account of a cycle may call this.
+        :param api: The asynchronous API connection to use
+        :return: None
+        """
+        if self.prefetch_lock is None:
+            self.prefetch_lock = asyncio.Lock()
+
+        async with self.prefetch_lock:
+            if self.leagues is not None:
+                return
+            leagues = await api.get_active_leagues()
+            matches, tables = await asyncio.gather(
+                asyncio.gather(*[
+                    api.get_current_matchday_matches(league, season)
+                    for league, season in leagues
+                ]),
+                asyncio.gather(*[
+                    api.get_league_table(league, season)
+                    for league, season in leagues
+                ])
+            )
+            with self.lock:
+                for i, (league, season) in enumerate(leagues):
+                    self.matches[(league, season)] = tuple(matches[i])
+                    self.league_tables[(league, season)] = tuple(tables[i])
+                self.leagues = leagues
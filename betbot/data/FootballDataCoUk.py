@@ -19,9 +19,22 @@ LICENSE"""
 
 import os
 import csv
-from typing import Union, Dict, List, Tuple
+import json
+import time
+import hashlib
+import logging
+import tempfile
+from datetime import datetime
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor
+from typing import Union, Dict, List, Tuple, Optional, Any, Iterator, \
+    Iterable
 
 import requests
+from numpy import ndarray, dtype, concatenate, zeros, fromiter, isin, \
+    int64
+from betbot.data.HistoryStore import HistoryStore
+from betbot.data.TeamRegistry import TeamRegistry
 
 
 class FootballDataUk:
@@ -29,82 +42,368 @@ class FootballDataUk:
     Class that handles retrieving data from football-data.co.uk
     """
 
-    def __init__(self, data_path: str):
+    def __init__(
+            self,
+            data_path: str,
+            odds_ttl: float = 15 * 60,
+            odds_cache_path: Optional[str] = None
+    ):
         """
         Initializes the object
         :param data_path: The path in which to store the data files
+        :param odds_ttl: The time in seconds for which fetched odds are
+                         used before they are revalidated
+        :param odds_cache_path: If provided, fetched odds are also cached
+                                in this file so that other processes can
+                                use them
         """
+        self.logger = logging.getLogger(__name__)
         self.data_path = data_path
+        self.odds_ttl = odds_ttl
+        self.odds_cache_path = odds_cache_path
+        self.meta_path = os.path.join(data_path, "downloads.json")
+        self.store = HistoryStore(os.path.join(data_path, "cache"))
+        self.teams = TeamRegistry.get()
         os.makedirs(data_path, exist_ok=True)
 
-    TEAM_MAP = {
-        "Nurnberg": "FCN",
-        "Mainz": "M05",
-        "Leverkusen": "B04",
-        "Dortmund": "BVB",
-        "M'gladbach": "BMG",
-        "Ein Frankfurt": "SGE",
-        "Augsburg": "FCA",
-        "Bayern Munich": "FCB",
-        "Schalke 04": "S04",
-        "Fortuna Dusseldorf": "F95",
-        "Hannover": "H96",
-        "Hertha": "BSC",
-        "RB Leipzig": "RBL",
-        "Freiburg": "SCF",
-        "Hoffenheim": "TSG",
-        "Stuttgart": "VFB",
-        "Wolfsburg": "WOB",
-        "Werder Bremen": "BRE",
-        "Union Berlin": "FCU",
-        "Paderborn": "SCP",
-        "FC Koln": "KOE",
-        "Bielefeld": "DSC",
-        "Greuther Furth": "SGF",
-        "Bochum": "BOC",
-        "Heidenheim": "HDH",
-        "Erzgebirge Aue": "AUE",
-        "Hansa Rostock": "FCH",
-        "Ingolstadt": "FCI",
-        "St Pauli": "STP",
-        "Hamburg": "HSV",
-        "Holstein Kiel": "KIE",
-        "Regensburg": "SSV",
-        "Karlsruhe": "KSC",
-        "Dresden": "SGD",
-        "Darmstadt": "D98",
-        "Sandhausen": "SVS",
-    }
-
-    def download_history(self):
+    BASE_URL = "https://www.football-data.co.uk"
+    """
+    The base URL of football-data.co.uk
+    """
+
+    odds_cache: Optional[Dict[str, Any]] = None
+    """
+    The most recently fetched odds, shared process-wide. Contains the odds
+    as well as the time they were fetched and their ETag/Last-Modified
+    """
+
+    odds_lock = Lock()
+    """
+    Lock that guards fetching odds
+    """
+
+    HISTORY_COLUMNS = [
+        "Div", "Date", "HomeTeam", "AwayTeam", "FTHG", "FTAG",
+        "WHH", "WHD", "WHA"
+    ]
+    """
+    The columns of the football-data.co.uk files that are used
+    """
+
+    LEAGUES = ["D1", "D2"]
+    """
+    The football-data.co.uk leagues, indexed by the league codes of the
+    history columns
+    """
+
+    HISTORY_FIELDS: Tuple[str, ...] = (
+        "league", "season", "date", "home_team", "away_team",
+        "home_score", "away_score", "home_odds", "draw_odds", "away_odds"
+    )
+    """
+    The names of the columns of the cached history data
+    """
+
+    HISTORY_DTYPE = dtype([
+        ("league", "i1"),
+        ("season", "i2"),
+        ("date", "i4"),
+        ("home_team", "i2"),
+        ("away_team", "i2"),
+        ("home_score", "i1"),
+        ("away_score", "i1"),
+        ("home_odds", "f8"),
+        ("draw_odds", "f8"),
+        ("away_odds", "f8")
+    ])
+    """
+    The columns of the cached history data.
+    Dates are stored as days since 1970-01-01. Odds are kept at full
+    precision so that they are identical to the values in the CSV files.
+    """
+
+    @staticmethod
+    def current_season() -> int:
+        """
+        Determines the current season. Seasons start in July.
+        :return: The year in which the current season started
+        """
+        now = datetime.now()
+        return now.year if now.month >= 7 else now.year - 1
+
+    def download_history(self, first_season: int = 2000, workers: int = 8):
         """
         Download history for the first and second bundesliga
+        Files of finished seasons are only downloaded once, the current
+        season is revalidated using conditional requests.
+        :param first_season: The first season to download
+        :param workers: The amount of concurrent downloads
         :return: None
         """
-        for year in range(2000, 2021):
-            next_year = year + 1
-            year_string = str(year)[-2:] + str(next_year)[-2:]
-            for league in ["D1", "D2"]:
-                path = os.path.join(self.data_path, f"{league}-{year}.csv")
-                if os.path.isfile(path):
+        meta: Dict[str, Dict[str, Any]] = {}
+        if os.path.isfile(self.meta_path):
+            with open(self.meta_path, "r") as f:
+                meta = json.load(f)
+
+        jobs = []
+        for year in range(first_season, self.current_season() + 1):
+            for league in self.LEAGUES:
+                filename = f"{league}-{year}.csv"
+                path = os.path.join(self.data_path, filename)
+                file_meta = meta.get(filename)
+                finished = year < self.current_season() and (
+                    file_meta is None or file_meta.get("complete")
+                )
+                if os.path.isfile(path) and finished:
                     continue
-                url = f"https://www.football-data.co.uk/mmz4281/" \
-                      f"{year_string}/{league}.csv"
-                with open(path, "wb") as f:
-                    f.write(requests.get(url).content)
+                jobs.append((league, year, file_meta or {}))
+
+        with requests.Session() as session:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(
+                    lambda job: self.download_season(session, *job), jobs
+                ))
+
+        for (league, year, _), file_meta in zip(jobs, results):
+            if file_meta is not None:
+                meta[f"{league}-{year}.csv"] = file_meta
+        self.write_atomic(self.meta_path, json.dumps(meta).encode("utf-8"))
+
+    def download_season(
+            self,
+            session: requests.Session,
+            league: str,
+            year: int,
+            file_meta: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Downloads a single season file if it changed
+        :param session: The HTTP session to use
+        :param league: The league (D1 or D2)
+        :param year: The year in which the season started
+        :param file_meta: The metadata of the previous download
+                          of this file
+        :return: The updated metadata for the file or None if it is
+                 not available
+        """
+        year_string = str(year)[-2:] + str(year + 1)[-2:]
+        url = f"{self.BASE_URL}/mmz4281/{year_string}/{league}.csv"
+        path = os.path.join(self.data_path, f"{league}-{year}.csv")
+
+        headers = {}
+        if os.path.isfile(path):
+            if file_meta.get("etag"):
+                headers["If-None-Match"] = str(file_meta["etag"])
+            if file_meta.get("last_modified"):
+                headers["If-Modified-Since"] = str(file_meta["last_modified"])
+
+        try:
+            resp = session.get(url, headers=headers, timeout=60)
+        except requests.RequestException as e:
+            self.logger.warning(f"Failed to download {url}: {e}")
+            return None
+
+        if resp.status_code == 304:
+            self.logger.debug(f"{url} is unchanged")
+        elif resp.status_code == 200:
+            self.logger.info(f"Downloaded {url}")
+            self.write_atomic(path, resp.content)
+        else:
+            self.logger.warning(f"Failed to download {url}: "
+                                f"{resp.status_code}")
+            return None
+
+        return {
+            "etag": resp.headers.get("ETag", file_meta.get("etag")),
+            "last_modified": resp.headers.get(
+                "Last-Modified", file_meta.get("last_modified")
+            ),
+            "complete": year < self.current_season()
+        }
+
+    def write_atomic(self, path: str, content: bytes):
+        """
+        Writes a file atomically by writing to a temporary file first
+        and then renaming it
+        :param path: The path of the file to write
+        :param content: The content to write
+        :return: None
+        """
+        handle, tempfile_path = tempfile.mkstemp(
+            dir=os.path.dirname(path), suffix=".tmp"
+        )
+        try:
+            with os.fdopen(handle, "wb") as f:
+                f.write(content)
+            os.replace(tempfile_path, path)
+        except BaseException as e:
+            os.remove(tempfile_path)
+            raise e
 
     def get_history_matches(self) -> List[Dict[str, Union[str, int, float]]]:
         """
         Retrieves data on historical bundesliga and bundesliga 2 matches
         :return: A list of match dictionaries
         """
-        matches = []
-        for history_file in [
-            os.path.join(self.data_path, x)
-            for x in os.listdir(self.data_path)
-        ]:
-            matches += self.load_matches(history_file)
-        return matches
+        columns = self.get_history_columns()
+        return [
+            {
+                "home_team": self.teams.abbreviation(home),
+                "away_team": self.teams.abbreviation(away),
+                "home_score": home_score,
+                "away_score": away_score,
+                "home_odds": home_odds,
+                "away_odds": away_odds,
+                "draw_odds": draw_odds
+            }
+            for home, away, home_score, away_score,
+            home_odds, away_odds, draw_odds in zip(
+                columns["home_team"].tolist(),
+                columns["away_team"].tolist(),
+                columns["home_score"].tolist(),
+                columns["away_score"].tolist(),
+                columns["home_odds"].tolist(),
+                columns["away_odds"].tolist(),
+                columns["draw_odds"].tolist()
+            )
+        ]
+
+    def get_history_columns(self) -> Dict[str, ndarray]:
+        """
+        Retrieves data on historical matches as columns.
+        Every history file is only parsed once, afterwards its data is
+        memory-mapped from the history store.
+        Results ingested from the API are included unless the downloaded
+        files already contain them.
+        Teams are encoded as their IDs in the team registry,
+        leagues as indexes of LEAGUES.
+        :return: The columns of HISTORY_FIELDS, mapped to their names
+        """
+        downloaded = self.load_history_files(self.data_path)
+        ingested = self.load_history_files(self.ingested_path(self.data_path))
+        if len(downloaded) > 0 and len(ingested) > 0:
+            ingested = ingested[~isin(
+                self.match_keys(ingested), self.match_keys(downloaded)
+            )]
+        merged = concatenate([downloaded, ingested])
+        return {name: merged[name] for name in self.HISTORY_FIELDS}
+
+    def load_history_files(self, path: str) -> ndarray:
+        """
+        Loads the columnar data of all history files in a directory
+        :param path: The directory containing the CSV files
+        :return: The match data as an array of HISTORY_DTYPE
+        """
+        if not os.path.isdir(path):
+            return zeros(0, dtype=self.HISTORY_DTYPE)
+        history_files = sorted([
+            os.path.join(path, x)
+            for x in os.listdir(path)
+            if x.endswith(".csv")
+        ])
+        version = self.teams.version
+        data = [
+            self.store.get(
+                history_file,
+                self.HISTORY_DTYPE,
+                lambda: self.load_columns(history_file),
+                version
+            )
+            for history_file in history_files
+        ]
+        return concatenate(data) if len(data) > 0 \
+            else zeros(0, dtype=self.HISTORY_DTYPE)
+
+    def get_history_fingerprint(self) -> str:
+        """
+        Calculates a fingerprint of the history files, including the
+        results ingested from the API. The fingerprint changes whenever
+        a history file is added, removed or modified.
+        :return: The fingerprint
+        """
+        fingerprint = hashlib.sha256()
+        ingested_path = self.ingested_path(self.data_path)
+        for path in [self.data_path, ingested_path]:
+            if not os.path.isdir(path):
+                continue
+            for name in sorted(os.listdir(path)):
+                if not name.endswith(".csv"):
+                    continue
+                history_file = os.path.join(path, name)
+                relative = os.path.relpath(history_file, self.data_path)
+                stat = os.stat(history_file)
+                fingerprint.update(
+                    f"{relative}:{stat.st_size}:{stat.st_mtime_ns}\n"
+                    .encode("utf-8")
+                )
+        return fingerprint.hexdigest()
+
+    @staticmethod
+    def match_keys(data: Union[ndarray, Dict[str, ndarray]]) -> ndarray:
+        """
+        Calculates keys that identify matches by their league, season
+        and teams
+        :param data: The match data as an array of HISTORY_DTYPE
+                     or as columns
+        :return: The keys of the matches
+        """
+        key = data["league"].astype(int64) + 1
+        for column in ["season", "home_team", "away_team"]:
+            key = (key << 16) + data[column].astype(int64)
+        return key
+
+    @staticmethod
+    def ingested_path(data_path: str) -> str:
+        """
+        :param data_path: The path in which the history files are stored
+        :return: The path in which results ingested from the API are stored
+        """
+        return os.path.join(data_path, "ingested")
+
+    def load_columns(self, data_file: str) -> ndarray:
+        """
+        Parses a single CSV file into a structured array
+        :param data_file: The path to the CSV file
+        :return: The match data as an array of HISTORY_DTYPE
+        """
+        def rows() -> Iterator[Tuple]:
+            for match in self.iter_matches(data_file):
+                league = str(match["league"])
+                date = self.parse_date(str(match["date"]))
+                season = 0
+                days = 0
+                if date is not None:
+                    season = date.year if date.month >= 7 else date.year - 1
+                    days = (date - datetime(1970, 1, 1)).days
+                yield (
+                    self.LEAGUES.index(league)
+                    if league in self.LEAGUES else -1,
+                    season,
+                    days,
+                    self.teams.register(str(match["home_team"])),
+                    self.teams.register(str(match["away_team"])),
+                    match["home_score"],
+                    match["away_score"],
+                    match["home_odds"],
+                    match["draw_odds"],
+                    match["away_odds"]
+                )
+
+        return fromiter(rows(), dtype=self.HISTORY_DTYPE)
+
+    @staticmethod
+    def parse_date(date: str) -> Optional[datetime]:
+        """
+        Parses a date as used in the football-data.co.uk files
+        :param date: The date string, for example 18/09/20 or 18/09/2020
+        :return: The parsed date or None if it could not be parsed
+        """
+        for date_format in ["%d/%m/%y", "%d/%m/%Y"]:
+            try:
+                return datetime.strptime(date, date_format)
+            except ValueError:
+                pass
+        return None
 
     def load_matches(self, data_file: str) -> \
             List[Dict[str, Union[str, int, float]]]:
@@ -113,15 +412,37 @@ class FootballDataUk:
         :param data_file: The path to the CSV file
         :return: The match data
         """
-        matches: List[Dict[str, Union[str, int, float]]] = []
-        file_matches = self.load_history_file(data_file)
-        for match in file_matches:
-            home = self.TEAM_MAP.get(str(match["HomeTeam"]))
-            away = self.TEAM_MAP.get(str(match["AwayTeam"]))
+        return list(self.iter_matches(data_file))
+
+    def iter_matches(self, data_file: str) -> \
+            Iterator[Dict[str, Union[str, int, float]]]:
+        """
+        Lazily loads match data from a single CSV file.
+        Rows with unknown teams or invalid values are skipped.
+        :param data_file: The path to the CSV file
+        :return: A generator of the match data
+        """
+        return self.convert_matches(
+            self.load_history_file(data_file, self.HISTORY_COLUMNS)
+        )
+
+    def convert_matches(self, rows: Iterable[Dict[str, str]]) -> \
+            Iterator[Dict[str, Union[str, int, float]]]:
+        """
+        Converts raw CSV rows into match data.
+        Rows with unknown teams or invalid values are skipped.
+        :param rows: The raw rows
+        :return: A generator of the match data
+        """
+        for match in rows:
+            home = self.teams.resolve_abbreviation(match.get("HomeTeam", ""))
+            away = self.teams.resolve_abbreviation(match.get("AwayTeam", ""))
             if home is None or away is None:
                 continue
             try:
-                matches.append({
+                yield {
+                    "league": match.get("Div", ""),
+                    "date": match.get("Date", ""),
                     "home_team": home,
                     "away_team": away,
                     "home_score": int(match["FTHG"]),
@@ -129,48 +450,155 @@ class FootballDataUk:
                     "home_odds": float(match["WHH"]),
                     "away_odds": float(match["WHA"]),
                     "draw_odds": float(match["WHD"])
-                })
-            except ValueError:
+                }
+            except (KeyError, ValueError):
                 continue
-        return matches
 
-    @staticmethod
-    def load_history_file(history_file: str) -> List[Dict[str, str]]:
+    @classmethod
+    def load_history_file(
+            cls,
+            history_file: str,
+            columns: Optional[List[str]] = None
+    ) -> Iterator[Dict[str, str]]:
         """
-        Loads the contents of a history file
+        Lazily loads the contents of a history file.
         :param history_file: The history file to load
-        :return: A list of match dictionaries
+        :param columns: The columns to load. Defaults to all columns
+        :return: A generator of match dictionaries
         """
         with open(history_file, "r", encoding="latin1") as f:
-            lines = [x for x in csv.reader(f)]
-        header = lines.pop(0)
-        data: List[Dict[str, str]] = []
-        for line in lines:
-            item = {}
-            for i, key in enumerate(header):
-                if not key or i >= len(line):
-                    continue
-                item[key] = line[i]
-            data.append(item)
-        return data
+            yield from cls.read_history(f, columns)
+
+    @staticmethod
+    def read_history(
+            lines: Iterable[str],
+            columns: Optional[List[str]] = None
+    ) -> Iterator[Dict[str, str]]:
+        """
+        Lazily parses CSV history data.
+        The indexes of the requested columns are resolved from the header
+        once, every row is then projected onto those columns.
+        :param lines: The lines of CSV data
+        :param columns: The columns to load. Defaults to all columns
+        :return: A generator of match dictionaries
+        """
+        reader = csv.reader(lines)
+        header = next(reader, None)
+        if header is None:
+            return
+        if columns is None:
+            columns = [key for key in header if key]
+        indexes = [
+            (key, header.index(key)) for key in columns if key in header
+        ]
+        for line in reader:
+            yield {
+                key: line[i] for key, i in indexes if i < len(line)
+            }
 
     def get_odds(self) -> Dict[Tuple[str, str], Tuple[float, float, float]]:
         """
         Loads currently available odds
+        Odds are cached for the configured TTL. Afterwards, they are
+        revalidated using a conditional request.
+        Only matches of LEAGUES are used, since teams of other leagues
+        may be mistaken for known teams with similar names.
         :return: The current odds (home, draw, away) mapped to home/away teams
         """
-        path = "/tmp/fixtures.csv"
-        url = "https://www.football-data.co.uk/fixtures.csv"
-        with open(path, "wb") as f:
-            f.write(requests.get(url).content)
-
-        odds = {}
-        for match in self.load_matches(path):
-            match_tuple = (str(match["home_team"]), str(match["away_team"]))
-            odds_tuple = (
-                float(match["home_odds"]),
-                float(match["draw_odds"]),
-                float(match["away_odds"])
-            )
-            odds[match_tuple] = odds_tuple
-        return odds
+        with self.odds_lock:
+            cache = FootballDataUk.odds_cache
+            disk_cache = self.load_odds_cache()
+            if disk_cache is not None and (
+                    cache is None or disk_cache["fetched"] > cache["fetched"]
+            ):
+                cache = disk_cache
+
+            if cache is not None and \
+                    time.time() - cache["fetched"] < self.odds_ttl:
+                FootballDataUk.odds_cache = cache
+                return dict(cache["odds"])
+
+            headers = {}
+            if cache is not None:
+                if cache.get("etag"):
+                    headers["If-None-Match"] = cache["etag"]
+                if cache.get("last_modified"):
+                    headers["If-Modified-Since"] = cache["last_modified"]
+
+            url = f"{self.BASE_URL}/fixtures.csv"
+            try:
+                resp = requests.get(url, headers=headers, timeout=60)
+            except requests.RequestException as e:
+                if cache is None:
+                    raise e
+                self.logger.warning(f"Failed to fetch odds, using cache: {e}")
+                return dict(cache["odds"])
+
+            if resp.status_code == 304 and cache is not None:
+                self.logger.debug("Odds are unchanged")
+                cache = dict(cache, fetched=time.time())
+            elif resp.status_code == 200:
+                lines = resp.content.decode("latin1").splitlines()
+                rows = (
+                    row for row
+                    in self.read_history(lines, self.HISTORY_COLUMNS)
+                    if row.get("Div") in self.LEAGUES
+                )
+                odds = {}
+                for match in self.convert_matches(rows):
+                    match_tuple = \
+                        (str(match["home_team"]), str(match["away_team"]))
+                    odds[match_tuple] = (
+                        float(match["home_odds"]),
+                        float(match["draw_odds"]),
+                        float(match["away_odds"])
+                    )
+                cache = {
+                    "odds": odds,
+                    "fetched": time.time(),
+                    "etag": resp.headers.get("ETag"),
+                    "last_modified": resp.headers.get("Last-Modified")
+                }
+            else:
+                self.logger.warning(f"Failed to fetch odds: "
+                                    f"{resp.status_code}")
+                return {} if cache is None else dict(cache["odds"])
+
+            FootballDataUk.odds_cache = cache
+            self.save_odds_cache(cache)
+            return dict(cache["odds"])
+
+    def load_odds_cache(self) -> Optional[Dict[str, Any]]:
+        """
+        Loads the odds cache file, if configured
+        :return: The cached odds or None if no cache is available
+        """
+        if self.odds_cache_path is None or \
+                not os.path.isfile(self.odds_cache_path):
+            return None
+        try:
+            with open(self.odds_cache_path, "r") as f:
+                data = json.load(f)
+            data["odds"] = {
+                (home, away): (home_odds, draw_odds, away_odds)
+                for home, away, home_odds, draw_odds, away_odds
+                in data["odds"]
+            }
+            return data
+        except (ValueError, KeyError):
+            return None
+
+    def save_odds_cache(self, cache: Dict[str, Any]):
+        """
+        Writes the odds to the odds cache file, if configured
+        :param cache: The odds and their metadata
+        :return: None
+        """
+        if self.odds_cache_path is None:
+            return
+        data = dict(cache, odds=[
+            [home, away, *odds] for (home, away), odds in cache["odds"].items()
+        ])
+        self.write_atomic(
+            self.odds_cache_path, json.dumps(data).encode("utf-8")
+        )
@@ -0,0 +1,186 @@
+"""LICENSE
+Copyright 2020 Hermann Krumrey <hermann@krumreyh.com>
+
+This file is part of betbot.
+
+betbot is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+betbot is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with betbot.  If not, see <http://www.gnu.org/licenses/>.
+LICENSE"""
+
+import os
+import csv
+import json
+import logging
+import tempfile
+from datetime import datetime, timezone
+from threading import Lock
+from typing import Dict, List, Optional, Any, Iterable
+from betbot.api.Match import Match
+from betbot.data.OddsAggregator import Odds
+from betbot.data.FootballDataCoUk import FootballDataUk
+
+
+class HistoryIngester:
+    """
+    Class that appends the results of finished matches retrieved from the
+    API to the local match history.
+    Odds of unfinished matches are captured every cycle, so that the
+    results can be stored together with their pre-match odds. Results are
+    appended to football-data.co.uk style CSV files, one per league and
+    season. A high-water mark per league and season makes sure that every
+    result is only ingested once.
+    """
+
+    LEAGUES = {"bl1": "D1", "bl2": "D2"}
+    """
+    The football-data.co.uk league codes of the API leagues
+    """
+
+    def __init__(self, data_path: Optional[str] = None):
+        """
+        Initializes the ingester
+        :param data_path: The path in which football-data.co.uk files
+                          are stored
+        """
+        if data_path is None:
+            data_path = os.path.join(
+                os.path.expanduser("~"), ".config/betbot/history"
+            )
+        self.logger = logging.getLogger(__name__)
+        self.path = FootballDataUk.ingested_path(data_path)
+        self.state_path = os.path.join(self.path, "state.json")
+        self.lock = Lock()
+        os.makedirs(self.path, exist_ok=True)
+
+    def ingest(self, matches: Iterable[Match], odds: Dict[str, Odds]) -> int:
+        """
+        Captures the odds of unfinished matches and appends the results
+        of finished matches that were not ingested yet
+        :param matches: The matches retrieved from the API
+        :param odds: The odds retrieved during the cycle, mapped to leagues
+        :return: The amount of ingested results
+        """
+        with self.lock:
+            state = self.load_state()
+            captured: Dict[str, List[float]] = state.setdefault("odds", {})
+            marks: Dict[str, Dict[str, Any]] = state.setdefault("marks", {})
+            rows: Dict[str, List[List[str]]] = {}
+
+            for match in sorted(matches, key=lambda x: x.matchday):
+                key = f"{match.league}/{match.season}"
+                teams = f"{match.home_team}/{match.away_team}"
+                odds_key = f"{key}/{match.matchday}/{teams}"
+
+                if not match.finished:
+                    match_odds = odds.get(match.league, {}).get(
+                        (match.home_team, match.away_team)
+                    )
+                    if match_odds is not None:
+                        captured[odds_key] = list(match_odds)
+                    continue
+
+                mark = marks.get(key, {"matchday": 0, "matches": []})
+                if match.matchday < mark["matchday"] or (
+                        match.matchday == mark["matchday"]
+                        and teams in mark["matches"]
+                ):
+                    continue
+
+                if match.home_score is None or match.away_score is None:
+                    continue
+                captured_odds = captured.pop(odds_key, None)
+                if captured_odds is None:
+                    self.logger.debug(f"No pre-match odds for {odds_key}")
+                    continue
+
+                if match.matchday > mark["matchday"]:
+                    mark = {"matchday": match.matchday, "matches": []}
+                mark["matches"].append(teams)
+                marks[key] = mark
+                rows.setdefault(key, []).append(
+                    self.to_row(match, captured_odds)
+                )
+
+            for odds_key in list(captured):
+                league, season, matchday, _, _ = odds_key.split("/")
+                season_mark = marks.get(f"{league}/{season}")
+                if season_mark is not None \
+                        and int(matchday) < season_mark["matchday"]:
+                    del captured[odds_key]
+
+            for key, league_rows in rows.items():
+                self.append(key.replace("/", "-"), league_rows)
+            self.save_state(state)
+
+        count = sum(len(x) for x in rows.values())
+        if count > 0:
+            self.logger.info(f"Ingested {count} finished matches")
+        return count
+
+    def to_row(self, match: Match, odds: List[float]) -> List[str]:
+        """
+        Converts a finished match into a football-data.co.uk style row
+        :param match: The finished match
+        :param odds: The pre-match odds (home, draw, away)
+        :return: The row, with the columns of HISTORY_COLUMNS
+        """
+        kickoff = match.kickoff if match.kickoff is not None \
+            else datetime.now(timezone.utc)
+        home_odds, draw_odds, away_odds = odds
+        return [
+            self.LEAGUES.get(match.league, match.league),
+            kickoff.strftime("%d/%m/%Y"),
+            match.home_team,
+            match.away_team,
+            str(match.home_score),
+            str(match.away_score),
+            str(home_odds),
+            str(draw_odds),
+            str(away_odds)
+        ]
+
+    def append(self, name: str, rows: List[List[str]]):
+        """
+        Appends rows to the history file of a league and season
+        :param name: The league and season, for example bl1-2020
+        :param rows: The rows to append
+        :return: None
+        """
+        path = os.path.join(self.path, f"api-{name}.csv")
+        new = not os.path.isfile(path)
+        with open(path, "a", encoding="latin1", newline="") as f:
+            writer = csv.writer(f)
+            if new:
+                writer.writerow(FootballDataUk.HISTORY_COLUMNS)
+            writer.writerows(rows)
+
+    def load_state(self) -> Dict[str, Any]:
+        """
+        Loads the captured odds and the high-water marks
+        :return: The state
+        """
+        if not os.path.isfile(self.state_path):
+            return {}
+        with open(self.state_path, "r") as f:
+            return json.load(f)
+
+    def save_state(self, state: Dict[str, Any]):
+        """
+        Atomically stores the captured odds and the high-water marks
+        :param state: The state to store
+        :return: None
+        """
+        handle, tempfile_path = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        with os.fdopen(handle, "w") as f:
+            json.dump(state, f)
+        os.replace(tempfile_path, self.state_path)
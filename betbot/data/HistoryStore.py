@@ -0,0 +1,98 @@
+"""LICENSE
+Copyright 2020 Hermann Krumrey <hermann@krumreyh.com>
+
+This file is part of betbot.
+
+betbot is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+betbot is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with betbot.  If not, see <http://www.gnu.org/licenses/>.
+LICENSE"""
+
+import os
+import glob
+import tempfile
+from typing import Callable
+from numpy import ndarray, dtype, load, save
+
+
+class HistoryStore:
+    """
+    Class that caches parsed history files in a binary columnar format.
+    Every source file is stored as a structured NumPy array that is
+    memory-mapped when loaded. Cached files are keyed by the size and
+    modification time of their source file as well as an optional
+    version and are rebuilt once either changes.
+    """
+
+    def __init__(self, cache_path: str):
+        """
+        Initializes the history store
+        :param cache_path: The directory in which to store cached files
+        """
+        self.cache_path = cache_path
+        os.makedirs(cache_path, exist_ok=True)
+
+    def get(
+            self,
+            source: str,
+            data_type: dtype,
+            build: Callable[[], ndarray],
+            version: str = ""
+    ) -> ndarray:
+        """
+        Retrieves the columnar data for a source file
+        :param source: The path to the source file
+        :param data_type: The structured data type of the data
+        :param build: Parses the source file if no valid cache exists
+        :param version: Identifies everything else the parsed data depends
+                        on. Cached files of other versions are rebuilt
+        :return: The data as a (read-only) structured array
+        """
+        stat = os.stat(source)
+        name = os.path.basename(source)
+        key = f"{stat.st_size}-{stat.st_mtime_ns}"
+        if version:
+            key += f"-{version}"
+        path = os.path.join(self.cache_path, f"{name}.{key}.npy")
+
+        if os.path.isfile(path):
+            data = self.load(path)
+            if data.dtype == data_type:
+                return data
+
+        data = build().astype(data_type, copy=False)
+        for stale in glob.glob(os.path.join(self.cache_path, f"{name}.*.npy")):
+            os.remove(stale)
+
+        handle, tempfile_path = tempfile.mkstemp(
+            dir=self.cache_path, suffix=".tmp"
+        )
+        try:
+            with os.fdopen(handle, "wb") as f:
+                save(f, data)
+            os.replace(tempfile_path, path)
+        except BaseException as e:
+            os.remove(tempfile_path)
+            raise e
+        return self.load(path)
+
+    @staticmethod
+    def load(path: str) -> ndarray:
+        """
+        Loads a cached file, memory-mapping it if possible
+        :param path: The path to the cached file
+        :return: The loaded data
+        """
+        try:
+            return load(path, mmap_mode="r")
+        except ValueError:  # Empty arrays can not be memory-mapped
+            return load(path)
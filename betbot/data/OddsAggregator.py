@@ -0,0 +1,339 @@
+"""LICENSE
+Copyright 2020 Hermann Krumrey <hermann@krumreyh.com>
+
+This file is part of betbot.
+
+betbot is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+betbot is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with betbot.  If not, see <http://www.gnu.org/licenses/>.
+LICENSE"""
+
+import os
+import time
+import logging
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor, Future, wait, \
+    FIRST_COMPLETED
+from typing import Dict, Tuple, Callable, Optional, Set, Iterable
+from betbot.data.OddsPortal import OddsPortal
+from betbot.data.FootballDataCoUk import FootballDataUk
+
+Odds = Dict[Tuple[str, str], Tuple[float, float, float]]
+"""
+Odds (home, draw, away) mapped to home/away teams
+"""
+
+
+class OddsAggregator:
+    """
+    Class that queries several sources of betting odds and merges their
+    results.
+    Sources are started in order, the next one only once the previous
+    ones answered without covering the requested matches or did not
+    answer within the hedge delay. A query returns as soon as the
+    results gathered so far cover the requested matches or once the
+    latency budget is spent. Sources that were not started by then are
+    skipped, queued ones are cancelled. Sources that are already running
+    can not be interrupted, they finish in the background, bounded by
+    their own timeouts, and are recorded as timeouts.
+    """
+
+    STRATEGIES = ["freshest", "average"]
+    """
+    The supported strategies to merge odds for the same match
+    """
+
+    executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="odds")
+    """
+    The thread pool in which sources are queried
+    """
+
+    stats: Dict[str, Dict[str, float]] = {}
+    """
+    Process-wide statistics for every source
+    """
+
+    stats_lock = Lock()
+    """
+    Lock that guards the source statistics
+    """
+
+    def __init__(
+            self,
+            data_path: str,
+            sources: Optional[
+                Dict[str, Callable[[str], Tuple[Odds, float]]]
+            ] = None,
+            budget: float = 30.0,
+            strategy: str = "freshest",
+            hedge: float = 5.0
+    ):
+        """
+        Initializes the aggregator
+        :param data_path: The path in which football-data.co.uk files
+                          are stored
+        :param sources: The sources to query, mapped to their names.
+                        A source is called with the league and returns
+                        its odds as well as the timestamp at which they
+                        were fetched. Sources are queried in order, so
+                        faster sources should come first.
+                        Defaults to football-data.co.uk and
+                        oddsportal.com.
+        :param budget: The maximum amount of seconds a query may take
+        :param strategy: How odds for the same match are merged.
+                         'freshest' uses the most recently fetched odds,
+                         'average' averages the odds of all sources.
+        :param hedge: The amount of seconds to wait for the running
+                      sources before starting the next one
+        """
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Invalid merge strategy: {strategy}")
+        self.logger = logging.getLogger(__name__)
+        self.data_path = data_path
+        self.budget = budget
+        self.strategy = strategy
+        self.hedge = hedge
+        if sources is None:
+            sources = {
+                "football-data": self.query_football_data,
+                "oddsportal": self.query_oddsportal
+            }
+        self.sources = sources
+
+    def query_football_data(self, _: str) -> Tuple[Odds, float]:
+        """
+        Retrieves the current odds from football-data.co.uk
+        The fixtures file contains all leagues, so the league is ignored.
+        :param _: The league for which to retrieve odds
+        :return: The odds and the time at which they were fetched
+        """
+        fetcher = FootballDataUk(
+            self.data_path,
+            odds_cache_path=os.path.join(self.data_path, "odds.json")
+        )
+        odds = fetcher.get_odds()
+        cache = FootballDataUk.odds_cache
+        fetched = time.time() if cache is None else cache["fetched"]
+        return odds, fetched
+
+    # noinspection PyMethodMayBeStatic
+    def query_oddsportal(self, league: str) -> Tuple[Odds, float]:
+        """
+        Retrieves the current odds from oddsportal.com
+        :param league: The league for which to retrieve odds
+        :return: The odds and the time at which they were fetched
+        """
+        portal = OddsPortal(timeout=self.budget)
+        return portal.get_odds(league), time.time()
+
+    def get_odds(
+            self,
+            league: str,
+            matches: Optional[Iterable[Tuple[str, str]]] = None,
+            min_matches: int = 9
+    ) -> Odds:
+        """
+        Queries the sources in order and merges their odds
+        :param league: The league for which to retrieve odds
+        :param matches: The home/away teams of the matches that require
+                        odds. If provided, the query finishes once all of
+                        them are covered.
+        :param min_matches: The amount of matches after which the odds are
+                            considered sufficient if no matches are provided
+        :return: The merged odds
+        """
+        wanted = None if matches is None else set(matches)
+        start = time.monotonic()
+        deadline = start + self.budget
+        queued = list(self.sources.items())
+        futures: Dict[Future, str] = {}
+        pending: Set[Future] = set()
+        next_start = start
+
+        results: Dict[str, Tuple[Odds, float]] = {}
+        merged: Odds = {}
+        while True:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            if len(queued) > 0 and (len(pending) == 0 or now >= next_start):
+                name, source = queued.pop(0)
+                future = self.executor.submit(
+                    self.query, name, source, league, wanted, deadline
+                )
+                futures[future] = name
+                pending.add(future)
+                next_start = now + self.hedge
+                continue
+            if len(pending) == 0:
+                break
+
+            timeout = deadline - now
+            if len(queued) > 0:
+                timeout = min(timeout, next_start - now)
+            done, pending = wait(
+                pending, timeout=timeout, return_when=FIRST_COMPLETED
+            )
+            for future in done:
+                result = future.result()
+                if result is not None:
+                    results[futures[future]] = result
+            merged = self.merge(list(results.values()))
+            if self.sufficient(merged, wanted, min_matches):
+                break
+
+        for future in pending:
+            future.cancel()
+        skipped = [name for name, _ in queued]
+        if len(skipped) > 0:
+            self.logger.debug(f"Skipped odds sources {skipped}")
+
+        self.logger.debug(
+            f"Aggregated {len(merged)} odds for {league} from "
+            f"{sorted(results)} in {time.monotonic() - start:.2f}s"
+        )
+        return merged
+
+    def query(
+            self,
+            name: str,
+            source: Callable[[str], Tuple[Odds, float]],
+            league: str,
+            wanted: Optional[Set[Tuple[str, str]]],
+            deadline: float
+    ) -> Optional[Tuple[Odds, float]]:
+        """
+        Queries a single source and records its latency and hit rate
+        :param name: The name of the source
+        :param source: The source to query
+        :param league: The league for which to retrieve odds
+        :param wanted: The matches that require odds
+        :param deadline: The monotonic time after which the query counts
+                         as timed out
+        :return: The odds and the time at which they were fetched,
+                 or None if the source failed
+        """
+        start = time.monotonic()
+        try:
+            odds, fetched = source(league)
+        except Exception as e:
+            self.logger.warning(f"Failed to fetch odds from {name}: {e}")
+            self.record(name, "failures", time.monotonic() - start)
+            return None
+
+        end = time.monotonic()
+        if end > deadline:
+            outcome = "timeouts"
+        elif wanted is None:
+            outcome = "hits" if len(odds) > 0 else "misses"
+        else:
+            outcome = "hits" if len(wanted.intersection(odds)) > 0 \
+                else "misses"
+        self.record(name, outcome, end - start)
+        return odds, fetched
+
+    def merge(self, results: Iterable[Tuple[Odds, float]]) -> Odds:
+        """
+        Merges the odds of several sources
+        :param results: The odds of each source and when they were fetched
+        :return: The merged odds
+        """
+        if self.strategy == "freshest":
+            merged: Odds = {}
+            for odds, _ in sorted(results, key=lambda x: x[1]):
+                merged.update(odds)
+            return merged
+
+        collected: Dict[Tuple[str, str], list] = {}
+        for odds, _ in results:
+            for match, match_odds in odds.items():
+                collected.setdefault(match, []).append(match_odds)
+        return {
+            match: (
+                sum(x[0] for x in values) / len(values),
+                sum(x[1] for x in values) / len(values),
+                sum(x[2] for x in values) / len(values)
+            )
+            for match, values in collected.items()
+        }
+
+    @staticmethod
+    def sufficient(
+            odds: Odds,
+            wanted: Optional[Set[Tuple[str, str]]],
+            min_matches: int
+    ) -> bool:
+        """
+        Checks whether odds cover the required matches
+        :param odds: The odds to check
+        :param wanted: The matches that require odds
+        :param min_matches: The amount of matches required if no matches
+                            are provided
+        :return: True if the odds are sufficient, False otherwise
+        """
+        if wanted is None:
+            return len(odds) >= min_matches
+        return wanted.issubset(odds)
+
+    @classmethod
+    def record(cls, name: str, outcome: str, latency: float = 0.0):
+        """
+        Records the outcome of a query
+        :param name: The name of the source
+        :param outcome: One of 'hits', 'misses', 'failures' or 'timeouts'
+        :param latency: The time the query took in seconds
+        :return: None
+        """
+        with cls.stats_lock:
+            stats = cls.stats.setdefault(name, {
+                "hits": 0, "misses": 0, "failures": 0, "timeouts": 0,
+                "latency": 0.0
+            })
+            stats[outcome] += 1
+            stats["latency"] += latency
+
+    @classmethod
+    def get_stats(cls) -> Dict[str, Dict[str, float]]:
+        """
+        Summarizes the statistics of every finished query of each source
+        :return: The hit rate, mean latency and amount of queries,
+                 failures and timeouts of each source
+        """
+        summary = {}
+        with cls.stats_lock:
+            for name, stats in cls.stats.items():
+                queries = stats["hits"] + stats["misses"] + \
+                    stats["failures"] + stats["timeouts"]
+                summary[name] = {
+                    "queries": queries,
+                    "hit_rate": stats["hits"] / queries if queries else 0.0,
+                    "mean_latency":
+                        stats["latency"] / queries if queries else 0.0,
+                    "failures": stats["failures"],
+                    "timeouts": stats["timeouts"]
+                }
+        return summary
+
+    @classmethod
+    def log_stats(cls):
+        """
+        Logs the statistics of every odds source
+        :return: None
+        """
+        logger = logging.getLogger(__name__)
+        for name, stats in sorted(cls.get_stats().items()):
+            logger.info(
+                f"Odds source {name}: {stats['queries']} queries, "
+                f"{stats['hit_rate']:.0%} hit rate, "
+                f"{stats['mean_latency']:.2f}s mean latency, "
+                f"{stats['failures']} failures, {stats['timeouts']} timeouts"
+            )
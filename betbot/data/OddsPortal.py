@@ -17,101 +17,165 @@ You should have received a copy of the GNU General Public License
 along with betbot.  If not, see <http://www.gnu.org/licenses/>.
 LICENSE"""
 
-from selenium.webdriver import Firefox
-from selenium.webdriver.firefox.options import Options
-from typing import Dict, Tuple
+import logging
+import requests
+from bs4 import BeautifulSoup
+from selenium.common.exceptions import TimeoutException
+from typing import Dict, Tuple, Optional, Set
+from betbot.data.BrowserPool import BrowserPool
+from betbot.data.TeamRegistry import TeamRegistry
 
 
 class OddsPortal:
     """
     Class that handles retrieving bet data using oddsportal.com
+    Pages are first fetched with a plain HTTP request. This only yields
+    odds if the server renders the tournament table itself. Pages that
+    render the table using JavaScript are remembered and fetched using
+    a headless browser right away afterwards.
     """
 
-    TEAM_MAP = {
-        "Nurnberg": "FCN",
-        "Mainz": "M05",
-        "Bayer Leverkusen": "B04",
-        "Dortmund": "BVB",
-        "B. Monchengladbach": "BMG",
-        "Eintracht Frankfurt": "SGE",
-        "Augsburg": "FCA",
-        "Bayern Munich": "FCB",
-        "Schalke": "S04",
-        "Dusseldorf": "F95",
-        "Hannover": "H96",
-        "Hertha Berlin": "BSC",
-        "RB Leipzig": "RBL",
-        "Freiburg": "SCF",
-        "Hoffenheim": "TSG",
-        "Stuttgart": "VFB",
-        "Wolfsburg": "WOB",
-        "Werder Bremen": "BRE",
-        "Union Berlin": "FCU",
-        "Paderborn": "SCP",
-        "FC Koln": "KOE",
-        "Arminia Bielefeld": "DSC",
-        "Greuther Furth": "SGF",
-        "Bochum": "BOC",
-        "Heidenheim": "HDH",
-        "Aue": "AUE",
-        "Hansa Rostock": "FCH",
-        "Ingolstadt": "FCI",
-        "St. Pauli": "STP",
-        "Hamburger SV": "HSV",
-        "Holstein Kiel": "KIE",
-        "Regensburg": "SSV",
-        "Karlsruher": "KSC",
-        "SG Dynamo Dresden": "SGD",
-        "Darmstadt": "D98",
-        "Sandhausen": "SVS",
+    browser_only: Set[str] = set()
+    """
+    The URLs whose HTTP responses did not contain a tournament table
+    """
+
+    BASE_URL = "https://www.oddsportal.com/soccer/"
+    """
+    The base URL for football odds on oddsportal.com
+    """
+
+    ENDPOINTS = {
+        "bl1": "germany/bundesliga/",
+        "bl2": "germany/2-bundesliga/"
     }
+    """
+    The oddsportal.com pages of the supported leagues
+    """
 
-    def __init__(self):
+    def __init__(
+            self,
+            pool: Optional[BrowserPool] = None,
+            use_browser: bool = True,
+            timeout: float = 30.0
+    ):
         """
         Initializes the oddsportal scraper
+        :param pool: The browser pool to use.
+                     Defaults to the process-wide browser pool
+        :param use_browser: Whether or not to fall back to a headless
+                            browser if the page can not be parsed directly
+        :param timeout: The maximum amount of seconds to wait for a page,
+                        both for plain requests and in the browser
         """
-        options = Options()
-        options.headless = True
-        self.driver = Firefox(options=options)
+        self.logger = logging.getLogger(__name__)
+        self.pool = pool
+        self.use_browser = use_browser
+        self.timeout = timeout
+        self.teams = TeamRegistry.get()
 
     def get_odds(self, league: str) \
             -> Dict[Tuple[str, str], Tuple[float, float, float]]:
         """
         Retrieves the odds for upcoming matches from oddsportal.com
+        The page is first fetched and parsed without a browser, unless a
+        previous response showed that the page is rendered using
+        JavaScript. If that yields no odds, the page is rendered in a
+        headless browser.
         :param league: The league to search for
         :return: Odds for the matches (home, draw, odds)
         """
-        matches: Dict[Tuple[str, str], Tuple[float, float, float]] = {}
-        base_url = "https://www.oddsportal.com/soccer/"
-        endpoint = {
-            "bl1": "germany/bundesliga/",
-            "bl2": "germany/2-bundesliga/"
-        }.get(league)
+        endpoint = self.ENDPOINTS.get(league)
         if endpoint is None:
+            return {}
+
+        url = self.BASE_URL + endpoint
+        matches: Dict[Tuple[str, str], Tuple[float, float, float]] = {}
+        if url not in self.browser_only or not self.use_browser:
+            matches = self.get_odds_http(url)
+        if len(matches) == 0 and self.use_browser:
+            self.logger.info("Falling back to headless browser")
+            matches = self.get_odds_browser(url)
+        return matches
+
+    def get_odds_http(self, url: str) \
+            -> Dict[Tuple[str, str], Tuple[float, float, float]]:
+        """
+        Retrieves odds by fetching a page using a plain HTTP request.
+        Only works for pages whose tournament table is rendered by the
+        server.
+        :param url: The URL of the page
+        :return: Odds for the matches (home, draw, odds)
+        """
+        try:
+            resp = requests.get(
+                url,
+                headers={"User-Agent": "Mozilla/5.0"},
+                timeout=self.timeout
+            )
+        except requests.RequestException as e:
+            self.logger.warning(f"Failed to fetch {url}: {e}")
+            return {}
+        if resp.status_code != 200:
+            return {}
+        if "tournamentTable" not in resp.text:
+            self.logger.debug(f"{url} is not rendered by the server")
+            self.browser_only.add(url)
+            return {}
+        return self.parse_odds(resp.text)
+
+    def get_odds_browser(self, url: str) \
+            -> Dict[Tuple[str, str], Tuple[float, float, float]]:
+        """
+        Retrieves odds by rendering a page in a headless browser
+        :param url: The URL of the page
+        :return: Odds for the matches (home, draw, odds)
+        """
+        pool = self.pool if self.pool is not None else BrowserPool.get()
+        with pool.browser() as driver:
+            driver.set_page_load_timeout(self.timeout)
+            try:
+                driver.get(url)
+            except TimeoutException:
+                self.logger.warning(f"Timed out while loading {url}")
+                return {}
+            html = driver.page_source
+        return self.parse_odds(html)
+
+    def parse_odds(self, html: str) \
+            -> Dict[Tuple[str, str], Tuple[float, float, float]]:
+        """
+        Parses the odds from the tournament table of a page
+        :param html: The HTML of the page
+        :return: Odds for the matches (home, draw, odds)
+        """
+        matches: Dict[Tuple[str, str], Tuple[float, float, float]] = {}
+        soup = BeautifulSoup(html, "html.parser")
+        table = soup.find(id="tournamentTable")
+        if table is None:
             return matches
 
-        self.driver.get(base_url + endpoint)
-        table = self.driver.find_element_by_id("tournamentTable")
-        for row in table.find_elements_by_tag_name("tr"):
-            participant_tag = \
-                row.find_elements_by_class_name("table-participant")
-            if len(participant_tag) == 0:
+        for row in table.find_all("tr"):
+            participant_tag = row.find(class_="table-participant")
+            if participant_tag is None:
                 continue
 
-            home_team, away_team = participant_tag[0].text.split(" - ")
-            home_abbrv = self.TEAM_MAP.get(home_team)
-            away_abbrv = self.TEAM_MAP.get(away_team)
+            teams = participant_tag.get_text().strip().split(" - ")
+            if len(teams) != 2:
+                continue
+            home_abbrv = self.teams.resolve_abbreviation(teams[0])
+            away_abbrv = self.teams.resolve_abbreviation(teams[1])
             if home_abbrv is None or away_abbrv is None:
                 continue
             match_tuple = (home_abbrv, away_abbrv)
-            odds = row.find_elements_by_class_name("odds-nowrp")
+            odds = row.find_all(class_="odds-nowrp")
             try:
                 matches[match_tuple] = (
-                    float(odds[0].text),
-                    float(odds[1].text),
-                    float(odds[2].text)
+                    float(odds[0].get_text().strip()),
+                    float(odds[1].get_text().strip()),
+                    float(odds[2].get_text().strip())
                 )
-            except ValueError:
+            except (ValueError, IndexError):
                 continue
 
         return matches
@@ -0,0 +1,313 @@
+"""LICENSE
+Copyright 2020 Hermann Krumrey <hermann@krumreyh.com>
+
+This file is part of betbot.
+
+betbot is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+betbot is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with betbot.  If not, see <http://www.gnu.org/licenses/>.
+LICENSE"""
+
+import os
+import json
+import hashlib
+import logging
+import difflib
+import tempfile
+import unicodedata
+from threading import Lock
+from typing import Dict, List, Optional, Set
+
+
+class TeamRegistry:
+    """
+    Class that maps team names from every data source to stable,
+    small integer team IDs. IDs are the positions of the teams in TEAMS,
+    followed by teams that were registered later on.
+    """
+
+    TEAMS: Dict[str, List[str]] = {
+        "AUE": ["Erzgebirge Aue", "Aue"],
+        "B04": ["Leverkusen", "Bayer Leverkusen"],
+        "BMG": ["M'gladbach", "B. Monchengladbach"],
+        "BOC": ["Bochum"],
+        "BRE": ["Werder Bremen"],
+        "BSC": ["Hertha", "Hertha Berlin"],
+        "BVB": ["Dortmund"],
+        "D98": ["Darmstadt"],
+        "DSC": ["Bielefeld", "Arminia Bielefeld"],
+        "F95": ["Fortuna Dusseldorf", "Dusseldorf"],
+        "FCA": ["Augsburg"],
+        "FCB": ["Bayern Munich"],
+        "FCH": ["Hansa Rostock"],
+        "FCI": ["Ingolstadt"],
+        "FCN": ["Nurnberg"],
+        "FCU": ["Union Berlin"],
+        "H96": ["Hannover"],
+        "HDH": ["Heidenheim"],
+        "HSV": ["Hamburg", "Hamburger SV"],
+        "KIE": ["Holstein Kiel"],
+        "KOE": ["FC Koln"],
+        "KSC": ["Karlsruhe", "Karlsruher"],
+        "M05": ["Mainz"],
+        "RBL": ["RB Leipzig"],
+        "S04": ["Schalke 04", "Schalke"],
+        "SCF": ["Freiburg"],
+        "SCP": ["Paderborn"],
+        "SGD": ["Dresden", "SG Dynamo Dresden"],
+        "SGE": ["Ein Frankfurt", "Eintracht Frankfurt"],
+        "SGF": ["Greuther Furth"],
+        "SSV": ["Regensburg"],
+        "STP": ["St Pauli", "St. Pauli"],
+        "SVS": ["Sandhausen"],
+        "TSG": ["Hoffenheim"],
+        "VFB": ["Stuttgart"],
+        "WOB": ["Wolfsburg"]
+    }
+    """
+    The known teams and their aliases in the different data sources.
+    The order defines the team IDs, new teams must be appended.
+    """
+
+    SQUAD_MARKERS = {"ii", "b", "u19", "u21", "u23", "women", "frauen"}
+    """
+    Name parts that identify reserve, youth or women's squads
+    """
+
+    instance: Optional["TeamRegistry"] = None
+    """
+    The process-wide team registry
+    """
+
+    instance_lock = Lock()
+    """
+    Lock that guards the creation of the process-wide team registry
+    """
+
+    def __init__(
+            self,
+            path: Optional[str] = None,
+            fuzzy: bool = True,
+            cutoff: float = 0.85
+    ):
+        """
+        Initializes the team registry
+        :param path: The file in which aliases and registered teams are
+                     persisted. Nothing is persisted if None
+        :param fuzzy: Whether or not unknown names are matched to known
+                      aliases using fuzzy string matching
+        :param cutoff: The minimum similarity (0-1) of fuzzy matches
+        """
+        self.logger = logging.getLogger(__name__)
+        self.path = path
+        self.fuzzy = fuzzy
+        self.cutoff = cutoff
+        self.lock = Lock()
+        self.abbreviations: List[str] = []
+        self.ids: Dict[str, int] = {}
+        self.aliases: Dict[str, int] = {}
+        self.learned: Dict[str, str] = {}
+        self.unknown: Set[str] = set()
+
+        for abbreviation, aliases in self.TEAMS.items():
+            self.add_team(abbreviation, aliases)
+
+        if path is not None and os.path.isfile(path):
+            with open(path, "r") as f:
+                data = json.load(f)
+            for abbreviation in data.get("teams", []):
+                self.add_team(abbreviation, [])
+            for alias, abbreviation in data.get("aliases", {}).items():
+                self.learned[alias] = abbreviation
+                self.aliases[alias] = self.add_team(abbreviation, [])
+
+    @classmethod
+    def get(cls) -> "TeamRegistry":
+        """
+        :return: The process-wide team registry, persisted in
+                 ~/.config/betbot/teams.json
+        """
+        with cls.instance_lock:
+            if cls.instance is None:
+                cls.instance = cls(os.path.join(
+                    os.path.expanduser("~"), ".config/betbot/teams.json"
+                ))
+            return cls.instance
+
+    @staticmethod
+    def normalize(name: str) -> str:
+        """
+        Normalizes a team name by removing accents, punctuation,
+        case and redundant whitespace
+        :param name: The name to normalize
+        :return: The normalized name
+        """
+        decomposed = unicodedata.normalize("NFKD", name)
+        stripped = "".join(
+            x for x in decomposed if not unicodedata.combining(x)
+        )
+        cleaned = "".join(
+            x if x.isalnum() else " " for x in stripped.lower()
+        )
+        return " ".join(cleaned.split())
+
+    def __len__(self) -> int:
+        """
+        :return: The amount of registered teams
+        """
+        return len(self.abbreviations)
+
+    @property
+    def version(self) -> str:
+        """
+        Identifies the team IDs and persisted aliases of the registry.
+        Data that contains team IDs is only valid for the same version.
+        :return: The version
+        """
+        with self.lock:
+            data = json.dumps(
+                [self.abbreviations, sorted(self.learned.items())]
+            )
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()[:16]
+
+    def add_team(self, abbreviation: str, aliases: List[str]) -> int:
+        """
+        Adds a team and its aliases if it is not registered yet
+        :param abbreviation: The abbreviation of the team
+        :param aliases: The aliases of the team
+        :return: The ID of the team
+        """
+        team_id = self.ids.get(abbreviation)
+        if team_id is None:
+            team_id = len(self.abbreviations)
+            self.abbreviations.append(abbreviation)
+            self.ids[abbreviation] = team_id
+        for alias in [abbreviation] + aliases:
+            self.aliases.setdefault(self.normalize(alias), team_id)
+        return team_id
+
+    def team_id(self, abbreviation: str) -> Optional[int]:
+        """
+        Looks up the ID of a team abbreviation
+        :param abbreviation: The abbreviation
+        :return: The ID or None if the team is unknown
+        """
+        return self.ids.get(abbreviation)
+
+    def register(self, abbreviation: str) -> int:
+        """
+        Looks up the ID of a team abbreviation, registering the team if
+        it is unknown
+        :param abbreviation: The abbreviation
+        :return: The ID of the team
+        """
+        team_id = self.ids.get(abbreviation)
+        if team_id is not None:
+            return team_id
+        with self.lock:
+            known = len(self.abbreviations)
+            team_id = self.add_team(abbreviation, [])
+            if team_id >= known:
+                self.logger.info(f"Registered new team {abbreviation}")
+                self.save()
+        return team_id
+
+    def abbreviation(self, team_id: int) -> str:
+        """
+        :param team_id: The ID of a team
+        :return: The abbreviation of the team
+        """
+        return self.abbreviations[team_id]
+
+    def resolve(self, name: str) -> Optional[int]:
+        """
+        Resolves a team name from any data source to a team ID.
+        Unknown names are matched using fuzzy matching if enabled. Fuzzy
+        matches are only remembered by this process and logged, so that
+        they can be reviewed before adding them as aliases.
+        :param name: The team name
+        :return: The team ID or None if the name could not be resolved
+        """
+        key = self.normalize(name)
+        team_id = self.aliases.get(key)
+        if team_id is not None or not key:
+            return team_id
+
+        with self.lock:
+            if key in self.unknown:
+                return None
+            if self.fuzzy:
+                team_id = self.fuzzy_match(key)
+                if team_id is not None:
+                    self.logger.warning(
+                        f"Matched unknown team {name} to "
+                        f"{self.abbreviations[team_id]}. Add it to the "
+                        f"aliases if this is correct"
+                    )
+                    self.aliases[key] = team_id
+                    return team_id
+            self.logger.warning(f"Unknown team: {name}")
+            self.unknown.add(key)
+            return None
+
+    def fuzzy_match(self, key: str) -> Optional[int]:
+        """
+        Finds the team whose aliases are similar to a normalized name.
+        The match has to be unambiguous: if aliases of other teams are
+        similar as well, no team is matched. Reserve and youth squads are
+        not matched to their first teams.
+        Similar aliases also have to contain a word of the name, so that
+        clubs with similarly spelled names, for example Wolfsberg and
+        Wolfsburg, are not matched.
+        :param key: The normalized name
+        :return: The team ID or None if no unambiguous match was found
+        """
+        matches = difflib.get_close_matches(
+            key, list(self.aliases), 5, self.cutoff
+        )
+        markers = self.SQUAD_MARKERS.intersection(key.split())
+        words = {x for x in key.split() if len(x) > 2} - markers
+        team_ids = {
+            self.aliases[x] for x in matches
+            if markers.issubset(x.split()) and words.intersection(x.split())
+        }
+        if len(team_ids) != 1:
+            return None
+        return team_ids.pop()
+
+    def resolve_abbreviation(self, name: str) -> Optional[str]:
+        """
+        Resolves a team name from any data source to a team abbreviation
+        :param name: The team name
+        :return: The abbreviation or None if the name could not be resolved
+        """
+        team_id = self.resolve(name)
+        return None if team_id is None else self.abbreviations[team_id]
+
+    def save(self):
+        """
+        Persists registered teams and the aliases read from the registry
+        file. Must be called while holding the lock.
+        :return: None
+        """
+        if self.path is None:
+            return
+        data = {
+            "teams": self.abbreviations[len(self.TEAMS):],
+            "aliases": self.learned
+        }
+        dirname = os.path.dirname(self.path) or "."
+        os.makedirs(dirname, exist_ok=True)
+        handle, tempfile_path = tempfile.mkstemp(dir=dirname, suffix=".tmp")
+        with os.fdopen(handle, "w") as f:
+            json.dump(data, f)
+        os.replace(tempfile_path, self.path)
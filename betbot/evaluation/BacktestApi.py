@@ -0,0 +1,100 @@
+"""LICENSE
+Copyright 2020 Hermann Krumrey <hermann@krumreyh.com>
+
+This file is part of betbot.
+
+betbot is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+betbot is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with betbot.  If not, see <http://www.gnu.org/licenses/>.
+LICENSE"""
+
+from typing import Dict, List, Tuple
+from numpy import ndarray, bincount, lexsort, unique, concatenate
+from betbot.api.Match import Match
+from betbot.data.TeamRegistry import TeamRegistry
+
+
+class BacktestApi:
+    """
+    Class that stands in for the bundesliga-tippspiel API while past
+    seasons are replayed.
+    League tables are calculated from the historical results that were
+    known before the replayed matchday.
+    """
+
+    def __init__(self, columns: Dict[str, ndarray]):
+        """
+        Initializes the API
+        :param columns: The history columns of the replayed league and
+                        season
+        """
+        self.columns = columns
+        self.teams = TeamRegistry.get()
+        self.cutoff = 0
+        self.matches: List[Match] = []
+
+    def get_active_leagues(self) -> List[Tuple[str, int]]:
+        """
+        :return: The leagues and seasons of the replayed matches
+        """
+        return sorted({
+            (match.league, int(match.season)) for match in self.matches
+        })
+
+    def get_current_matchday_matches(self, league: str, season: int) \
+            -> List[Match]:
+        """
+        Retrieves the matches of the replayed matchday
+        :param league: The league to retrieve matches for
+        :param season: The season to retrieve matches for
+        :return: The list of matches
+        """
+        return [
+            match for match in self.matches
+            if match.league == league and int(match.season) == season
+        ]
+
+    # noinspection PyUnusedLocal
+    def get_league_table(self, league: str, season: int) -> List[str]:
+        """
+        Calculates the league table from the results before the replayed
+        matchday. Teams are ranked by points, goal difference and goals.
+        :param league: The league for which to retrieve the league table
+        :param season: The season for which to retrieve the league table
+        :return: The team abbreviations in order of their league rankings
+        """
+        home = self.columns["home_team"].astype(int)
+        away = self.columns["away_team"].astype(int)
+        home_score = self.columns["home_score"].astype(int)
+        away_score = self.columns["away_score"].astype(int)
+        played = self.columns["date"] < self.cutoff
+        size = max(home.max(initial=0), away.max(initial=0)) + 1
+
+        def total(home_values: ndarray, away_values: ndarray) -> ndarray:
+            return bincount(
+                home[played], home_values[played], minlength=size
+            ) + bincount(away[played], away_values[played], minlength=size)
+
+        points = total(
+            3 * (home_score > away_score) + (home_score == away_score),
+            3 * (away_score > home_score) + (home_score == away_score)
+        )
+        goals = total(home_score, away_score)
+        conceded = total(away_score, home_score)
+
+        team_ids = unique(concatenate((home, away)))
+        order = lexsort((
+            -goals[team_ids],
+            conceded[team_ids] - goals[team_ids],
+            -points[team_ids]
+        ))
+        return [self.teams.abbreviation(x) for x in team_ids[order].tolist()]
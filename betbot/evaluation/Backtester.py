@@ -0,0 +1,356 @@
+"""LICENSE
+Copyright 2020 Hermann Krumrey <hermann@krumreyh.com>
+
+This file is part of betbot.
+
+betbot is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+betbot is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with betbot.  If not, see <http://www.gnu.org/licenses/>.
+LICENSE"""
+
+import os
+import time
+import logging
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Optional, Type, Tuple
+from numpy import ndarray, unique, argsort, zeros, flatnonzero, array
+from betbot.api.Match import Match
+from betbot.data.CycleContext import CycleContext
+from betbot.data.FootballDataCoUk import FootballDataUk
+from betbot.data.HistoryIngester import HistoryIngester
+from betbot.data.OddsAggregator import OddsAggregator
+from betbot.data.TeamRegistry import TeamRegistry
+from betbot.evaluation.BacktestApi import BacktestApi
+from betbot.evaluation.Scoring import Scoring
+from betbot.prediction.Predictor import Predictor
+from betbot.prediction.SKLearnPredictor import SKLearnPredictor
+from betbot.prediction.PoissonPredictor import PoissonPredictor
+
+
+class Backtester:
+    """
+    Class that replays past seasons of the match history through
+    predictors and scores their bets.
+    Seasons are replayed matchday by matchday. Predictors only know the
+    matches played before the replayed matchday: they are fitted on the
+    matches before the season started (or before every matchday if
+    refitting is enabled), league tables only contain earlier results
+    and odds are only available for the replayed matches.
+    Every predictor and season is replayed in a separate process.
+    """
+
+    LEAGUES = {
+        FootballDataUk.LEAGUES.index(code): league
+        for league, code in HistoryIngester.LEAGUES.items()
+    }
+    """
+    The API leagues, mapped to the league codes of the history columns
+    """
+
+    def __init__(
+            self,
+            predictor_classes: List[Type[Predictor]],
+            seasons: Optional[List[int]] = None,
+            workers: Optional[int] = None,
+            refit: bool = False,
+            data_path: Optional[str] = None
+    ):
+        """
+        Initializes the backtester
+        :param predictor_classes: The predictors to replay
+        :param seasons: The seasons to replay. Defaults to every season
+                        after the first one in the history
+        :param workers: The amount of worker processes.
+                        Defaults to the amount of CPUs
+        :param refit: Whether predictors are fitted before every matchday
+                      instead of once per season
+        :param data_path: The path in which football-data.co.uk files
+                          are stored
+        """
+        if data_path is None:
+            data_path = os.path.join(
+                os.path.expanduser("~"), ".config/betbot/history"
+            )
+        self.logger = logging.getLogger(__name__)
+        self.predictor_classes = predictor_classes
+        self.seasons = seasons
+        self.workers = workers
+        self.refit = refit
+        self.data_path = data_path
+
+    def run(self) -> List[Dict[str, Any]]:
+        """
+        Replays all seasons through all predictors
+        :return: The results of the predictors, best predictor first.
+                 Contains the name of the predictor, the points per match,
+                 the total points and matches, the points per match of
+                 every season and the time spent
+        """
+        fetcher = FootballDataUk(self.data_path)
+        fetcher.download_history()
+        seasons = self.seasons
+        if seasons is None:
+            season = fetcher.get_history_columns()["season"]
+            seasons = unique(season[season > 0]).tolist()[1:]
+        if len(seasons) == 0:
+            raise ValueError("No seasons to replay")
+
+        self.logger.info(
+            f"Replaying {len(seasons)} seasons through "
+            f"{len(self.predictor_classes)} predictors"
+        )
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            jobs = {
+                (predictor_cls, season): executor.submit(
+                    self.replay,
+                    predictor_cls,
+                    season,
+                    self.data_path,
+                    self.refit
+                )
+                for predictor_cls in self.predictor_classes
+                for season in seasons
+            }
+            scores = {key: job.result() for key, job in jobs.items()}
+
+        results = []
+        for predictor_cls in self.predictor_classes:
+            season_scores = [scores[(predictor_cls, x)] for x in seasons]
+            points = sum(x[0] for x in season_scores)
+            matches = sum(x[1] for x in season_scores)
+            results.append({
+                "predictor": predictor_cls.name(),
+                "points_per_match": points / matches if matches else 0.0,
+                "points": points,
+                "matches": matches,
+                "season_points": {
+                    season: x[0] / x[1] if x[1] else 0.0
+                    for season, x in zip(seasons, season_scores)
+                },
+                "seconds": sum(x[2] for x in season_scores)
+            })
+        return sorted(results, key=lambda x: -x["points_per_match"])
+
+    @classmethod
+    def replay(
+            cls,
+            predictor_cls: Type[Predictor],
+            season: int,
+            data_path: str,
+            refit: bool
+    ) -> Tuple[int, int, float]:
+        """
+        Replays a single season through a predictor and scores its bets.
+        Runs in a worker process.
+        :param predictor_cls: The predictor to replay
+        :param season: The season to replay
+        :param data_path: The path in which football-data.co.uk files
+                          are stored
+        :param refit: Whether the predictor is fitted before every
+                      matchday instead of once per season
+        :return: The points, the amount of scored matches, the time spent
+        """
+        start = time.time()
+        columns = FootballDataUk(data_path).get_history_columns()
+        in_season = (columns["season"] == season) & \
+            (columns["league"] >= 0)
+        if not in_season.any():
+            return 0, 0, time.time() - start
+
+        kwargs: Dict[str, Any] = {}
+        if issubclass(predictor_cls, (SKLearnPredictor, PoissonPredictor)):
+            kwargs["load_model"] = False
+        predictor = predictor_cls(None, "", season, **kwargs)
+        if not refit:
+            cutoff = columns["date"][in_season].min()
+            predictor.fit_history(cls.before(columns, cutoff))
+
+        bet_home: List[int] = []
+        bet_away: List[int] = []
+        scored: List[ndarray] = []
+        for league_index, league in cls.LEAGUES.items():
+            indexes = flatnonzero(
+                in_season & (columns["league"] == league_index)
+            )
+            if len(indexes) == 0:
+                continue
+            league_columns = {
+                name: column[indexes] for name, column in columns.items()
+            }
+            api = BacktestApi(league_columns)
+            predictor.api = api
+            predictor.league = league
+
+            matchdays = cls.split_matchdays(league_columns)
+            for matchday, rows in enumerate(matchdays):
+                cutoff = league_columns["date"][rows].min()
+                if refit:
+                    predictor.fit_history(cls.before(columns, cutoff))
+                api.cutoff = cutoff
+                api.matches = cls.create_matches(
+                    league_columns, rows, league, season, matchday + 1
+                )
+                predictor.context = cls.create_context(
+                    league_columns, rows, league, data_path
+                )
+                positions = {
+                    id(match): row
+                    for match, row in zip(api.matches, indexes[rows])
+                }
+                for bet in predictor.predict(api.matches):
+                    bet_home.append(bet.home_score)
+                    bet_away.append(bet.away_score)
+                    scored.append(positions[id(bet.match)])
+
+        scored_rows = array(scored, dtype=int)
+        points = Scoring.evaluate(
+            array(bet_home, dtype=int),
+            array(bet_away, dtype=int),
+            columns["home_score"][scored_rows].astype(int),
+            columns["away_score"][scored_rows].astype(int)
+        )
+        return int(points.sum()), len(scored_rows), time.time() - start
+
+    @staticmethod
+    def split_matchdays(columns: Dict[str, ndarray]) -> List[ndarray]:
+        """
+        Groups the matches of a league and season into matchdays.
+        The history does not contain matchdays, so every match is assigned
+        to the matchday after the last one its teams played on.
+        Rescheduled matches therefore belong to the matchday on which
+        they were actually played.
+        :param columns: The history columns of the league and season
+        :return: The indexes of the matches of every matchday, in order
+        """
+        order = argsort(columns["date"], kind="stable")
+        home = columns["home_team"].astype(int)
+        away = columns["away_team"].astype(int)
+        played = zeros(max(home.max(), away.max()) + 1, dtype=int)
+        matchdays = zeros(len(order), dtype=int)
+        for index in order.tolist():
+            matchday = max(played[home[index]], played[away[index]])
+            matchdays[index] = matchday
+            played[home[index]] = played[away[index]] = matchday + 1
+        return [
+            order[matchdays[order] == matchday]
+            for matchday in range(matchdays.max(initial=-1) + 1)
+        ]
+
+    @staticmethod
+    def create_matches(
+            columns: Dict[str, ndarray],
+            rows: ndarray,
+            league: str,
+            season: int,
+            matchday: int
+    ) -> List[Match]:
+        """
+        Creates unfinished matches for historical matches
+        :param columns: The history columns of the league and season
+        :param rows: The indexes of the matches
+        :param league: The league of the matches
+        :param season: The season of the matches
+        :param matchday: The matchday of the matches
+        :return: The matches
+        """
+        teams = TeamRegistry.get()
+        epoch = datetime(1970, 1, 1)
+        return [
+            Match(
+                league,
+                season,
+                matchday,
+                teams.abbreviation(home),
+                teams.abbreviation(away),
+                False,
+                epoch + timedelta(days=date)
+            )
+            for home, away, date in zip(
+                columns["home_team"][rows].tolist(),
+                columns["away_team"][rows].tolist(),
+                columns["date"][rows].tolist()
+            )
+        ]
+
+    @staticmethod
+    def create_context(
+            columns: Dict[str, ndarray],
+            rows: ndarray,
+            league: str,
+            data_path: str
+    ) -> CycleContext:
+        """
+        Creates a cycle context that only knows the historical odds of
+        the replayed matches. No odds sources are queried.
+        :param columns: The history columns of the league and season
+        :param rows: The indexes of the replayed matches
+        :param league: The league of the matches
+        :param data_path: The path in which football-data.co.uk files
+                          are stored
+        :return: The cycle context
+        """
+        teams = TeamRegistry.get()
+        context = CycleContext(
+            data_path, OddsAggregator(data_path, sources={})
+        )
+        context.odds[league] = {
+            (teams.abbreviation(home), teams.abbreviation(away)):
+                (home_odds, draw_odds, away_odds)
+            for home, away, home_odds, draw_odds, away_odds in zip(
+                columns["home_team"][rows].tolist(),
+                columns["away_team"][rows].tolist(),
+                columns["home_odds"][rows].tolist(),
+                columns["draw_odds"][rows].tolist(),
+                columns["away_odds"][rows].tolist()
+            )
+        }
+        return context
+
+    @staticmethod
+    def before(columns: Dict[str, ndarray], cutoff: int) \
+            -> Dict[str, ndarray]:
+        """
+        Selects the matches played before a date
+        :param columns: The history columns
+        :param cutoff: The date as days since 1970-01-01
+        :return: The history columns of the selected matches
+        """
+        selected = flatnonzero(columns["date"] < cutoff)
+        return {name: column[selected] for name, column in columns.items()}
+
+    @staticmethod
+    def format_results(results: List[Dict[str, Any]]) -> str:
+        """
+        Formats backtesting results as a comparison table
+        :param results: The results
+        :return: The formatted table
+        """
+        lines = [
+            f"{'Points/Match':>12}  {'Points':>8}  {'Matches':>7}  "
+            f"{'Best':>11}  {'Worst':>11}  {'Seconds':>8}  Predictor"
+        ]
+        for result in results:
+            seasons = sorted(
+                result["season_points"].items(), key=lambda x: x[1]
+            )
+            worst, best = seasons[0], seasons[-1]
+            lines.append(
+                f"{result['points_per_match']:>12.3f}  "
+                f"{result['points']:>8}  "
+                f"{result['matches']:>7}  "
+                f"{best[1]:>5.2f} ({best[0]})  "
+                f"{worst[1]:>5.2f} ({worst[0]})  "
+                f"{result['seconds']:>8.1f}  "
+                f"{result['predictor']}"
+            )
+        return "\n".join(lines)
@@ -0,0 +1,296 @@
+"""LICENSE
+Copyright 2020 Hermann Krumrey <hermann@krumreyh.com>
+
+This file is part of betbot.
+
+betbot is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+betbot is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with betbot.  If not, see <http://www.gnu.org/licenses/>.
+LICENSE"""
+
+import os
+import glob
+import json
+import time
+import logging
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Optional, Type, Tuple
+from joblib import load, dump
+from numpy import ndarray, unique, flatnonzero
+from betbot.evaluation.Scoring import Scoring
+from betbot.prediction.ModelRegistry import ModelRegistry
+from betbot.prediction.SKLearnPredictor import SKLearnPredictor
+
+
+class ModelSelection:
+    """
+    Class that selects the regressor and hyperparameters of a
+    scikit-learn based predictor.
+    Candidates are evaluated using forward-chaining cross-validation over
+    seasons: every fold trains on all seasons before the validation
+    season, including the team vectorizer that builds the features.
+    Candidates are scored by the tippspiel points their bets would have
+    earned. The folds are evaluated in parallel processes.
+    """
+
+    CANDIDATES: List[Dict[str, Any]] = [
+        {"regressor": "MLPRegressor",
+         "params": {"hidden_layer_sizes": [64]}},
+        {"regressor": "MLPRegressor",
+         "params": {"hidden_layer_sizes": [32]}},
+        {"regressor": "MLPRegressor",
+         "params": {"hidden_layer_sizes": [128, 32]}},
+        {"regressor": "MLPRegressor",
+         "params": {"hidden_layer_sizes": [64], "alpha": 0.01}},
+        {"regressor": "Ridge",
+         "params": {"alpha": 1.0}},
+        {"regressor": "Ridge",
+         "params": {"alpha": 10.0}},
+        {"regressor": "RandomForestRegressor",
+         "params": {"n_estimators": 100, "max_depth": 8,
+                    "min_samples_leaf": 5}}
+    ]
+    """
+    The default candidate configurations
+    """
+
+    loaded_folds: Dict[str, Dict[str, Any]] = {}
+    """
+    The fold data loaded by the current process, mapped to its path
+    """
+
+    def __init__(
+            self,
+            predictor_cls: Type[SKLearnPredictor],
+            candidates: Optional[List[Dict[str, Any]]] = None,
+            folds: int = 3,
+            workers: Optional[int] = None,
+            cache_path: Optional[str] = None
+    ):
+        """
+        Initializes the model selection
+        :param predictor_cls: The predictor for which to select a model
+        :param candidates: The candidate configurations.
+                           Defaults to CANDIDATES
+        :param folds: The amount of validation seasons
+        :param workers: The amount of worker processes.
+                        Defaults to the amount of CPUs
+        :param cache_path: The directory in which the feature matrices
+                           are cached. Defaults to ~/.config/betbot/folds
+        """
+        if cache_path is None:
+            cache_path = os.path.join(
+                os.path.expanduser("~"), ".config/betbot/folds"
+            )
+        self.logger = logging.getLogger(__name__)
+        self.predictor_cls = predictor_cls
+        self.predictor = predictor_cls(None, "", 0, load_model=False)
+        self.candidates = candidates if candidates is not None \
+            else self.CANDIDATES
+        self.folds = folds
+        self.workers = workers
+        self.cache_path = cache_path
+        os.makedirs(cache_path, exist_ok=True)
+
+    def prepare(self) -> str:
+        """
+        Builds the feature matrices of every season fold. They are cached
+        until the history changes.
+        :return: The path of the cached fold data
+        """
+        fetcher = self.predictor.fetcher
+        fetcher.download_history()
+        fingerprint = fetcher.get_history_fingerprint()
+        name = self.predictor_cls.name()
+        path = os.path.join(self.cache_path, f"{name}.{fingerprint}.folds")
+        if os.path.isfile(path):
+            return path
+
+        self.logger.info("Building fold feature matrices")
+        columns = fetcher.get_history_columns()
+        season = columns["season"]
+        seasons = unique(season[season > 0]).tolist()
+        validation = [x for x in seasons[-self.folds:] if x > seasons[0]]
+        data = {
+            "seasons": validation,
+            "folds": [
+                self.build_fold(
+                    columns,
+                    flatnonzero((season > 0) & (season < x)),
+                    flatnonzero(season == x)
+                )
+                for x in validation
+            ]
+        }
+
+        for stale in glob.glob(os.path.join(self.cache_path, f"{name}.*")):
+            os.remove(stale)
+        handle, tempfile_path = tempfile.mkstemp(
+            dir=self.cache_path, suffix=".tmp"
+        )
+        os.close(handle)
+        dump(data, tempfile_path)
+        os.replace(tempfile_path, path)
+        return path
+
+    def build_fold(
+            self,
+            columns: Dict[str, ndarray],
+            train: ndarray,
+            validation: ndarray
+    ) -> Dict[str, Any]:
+        """
+        Builds the feature matrices of a fold. The team vectorizer is
+        only fitted on the training seasons, so teams that only appear
+        in the validation season are unknown, just like new teams
+        during actual predictions.
+        :param columns: The history columns
+        :param train: The rows of the training seasons
+        :param validation: The rows of the validation season
+        :return: The training inputs and outputs, the validation inputs
+                 and the actual scores of the validation matches
+        """
+        train_columns = {
+            name: column[train] for name, column in columns.items()
+        }
+        validation_columns = {
+            name: column[validation] for name, column in columns.items()
+        }
+        team_matrix = self.predictor.create_team_matrix({
+            "team_vectorizer":
+                self.predictor.fit_team_vectorizer(train_columns)
+        })
+        train_inputs, train_outputs = self.predictor.build_training_data(
+            train_columns, team_matrix
+        )
+        validation_inputs, _ = self.predictor.build_training_data(
+            validation_columns, team_matrix
+        )
+        return {
+            "train_inputs": train_inputs,
+            "train_outputs": train_outputs,
+            "validation_inputs": validation_inputs,
+            "home_score": validation_columns["home_score"].astype(int),
+            "away_score": validation_columns["away_score"].astype(int)
+        }
+
+    def run(self) -> List[Dict[str, Any]]:
+        """
+        Evaluates all candidates on all folds
+        :return: The results of the candidates, best candidate first.
+                 Contains the configuration, the points per match, the
+                 total points and matches, the points per match of every
+                 validation season and the time spent
+        """
+        path = self.prepare()
+        seasons = self.load_folds(path)["seasons"]
+        if len(seasons) == 0:
+            raise ValueError("Not enough seasons for cross-validation")
+
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            jobs = {
+                (i, fold): executor.submit(
+                    self.evaluate, self.predictor_cls, path, fold, candidate
+                )
+                for i, candidate in enumerate(self.candidates)
+                for fold in range(len(seasons))
+            }
+            scores = {key: job.result() for key, job in jobs.items()}
+
+        results = []
+        for i, candidate in enumerate(self.candidates):
+            fold_scores = [scores[(i, fold)] for fold in range(len(seasons))]
+            points = sum(x[0] for x in fold_scores)
+            matches = sum(x[1] for x in fold_scores)
+            results.append({
+                "config": candidate,
+                "points_per_match": points / matches if matches else 0.0,
+                "points": points,
+                "matches": matches,
+                "season_points": {
+                    season: x[0] / x[1] if x[1] else 0.0
+                    for season, x in zip(seasons, fold_scores)
+                },
+                "seconds": sum(x[2] for x in fold_scores)
+            })
+        return sorted(results, key=lambda x: -x["points_per_match"])
+
+    def select(self) -> List[Dict[str, Any]]:
+        """
+        Evaluates all candidates and stores the configuration of the best
+        one in the model registry. The predictor's model is retrained with
+        that configuration the next time it is used.
+        :return: The results of the candidates, best candidate first
+        """
+        results = self.run()
+        winner = results[0]["config"]
+        self.logger.info(f"Selected {json.dumps(winner)}")
+        ModelRegistry.get().set_config(self.predictor_cls.name(), winner)
+        return results
+
+    @classmethod
+    def evaluate(
+            cls,
+            predictor_cls: Type[SKLearnPredictor],
+            path: str,
+            fold: int,
+            config: Dict[str, Any]
+    ) -> Tuple[int, int, float]:
+        """
+        Trains a candidate on the training seasons of a fold and scores
+        its bets for the validation season. Runs in a worker process.
+        :param predictor_cls: The predictor for which to select a model
+        :param path: The path of the cached fold data
+        :param fold: The index of the fold
+        :param config: The candidate configuration
+        :return: The points, the amount of matches, the time spent
+        """
+        start = time.time()
+        data = cls.load_folds(path)["folds"][fold]
+        regressor = predictor_cls.create_regressor(config)
+        regressor.fit(data["train_inputs"], data["train_outputs"])
+        home, away = predictor_cls.interpret_batch(
+            regressor.predict(data["validation_inputs"])
+        )
+        points = Scoring.evaluate(
+            home, away, data["home_score"], data["away_score"]
+        )
+        return int(points.sum()), len(points), time.time() - start
+
+    @classmethod
+    def load_folds(cls, path: str) -> Dict[str, Any]:
+        """
+        Loads the cached fold data. Every process only loads it once.
+        :param path: The path of the cached fold data
+        :return: The fold data
+        """
+        if path not in cls.loaded_folds:
+            cls.loaded_folds.clear()
+            cls.loaded_folds[path] = load(path)
+        return cls.loaded_folds[path]
+
+    @staticmethod
+    def format_results(results: List[Dict[str, Any]]) -> str:
+        """
+        Formats model selection results as a table
+        :param results: The results
+        :return: The formatted table
+        """
+        lines = [f"{'Points/Match':>12}  {'Seconds':>8}  Configuration"]
+        for result in results:
+            lines.append(
+                f"{result['points_per_match']:>12.3f}  "
+                f"{result['seconds']:>8.1f}  "
+                f"{json.dumps(result['config'])}"
+            )
+        return "\n".join(lines)
@@ -0,0 +1,70 @@
+"""LICENSE
+Copyright 2020 Hermann Krumrey <hermann@krumreyh.com>
+
+This file is part of betbot.
+
+betbot is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+betbot is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with betbot.  If not, see <http://www.gnu.org/licenses/>.
+LICENSE"""
+
+from numpy import ndarray, sign, asarray
+
+
+class Scoring:
+    """
+    Class that awards bundesliga-tippspiel points to bets.
+    Points are awarded for the correct tendency, the correct goal
+    difference and the correct goals of each team.
+    """
+
+    TENDENCY = 7
+    """
+    The points for predicting the winner or a draw
+    """
+
+    GOAL_DIFFERENCE = 5
+    """
+    The points for predicting the goal difference
+    """
+
+    TEAM_GOALS = 3
+    """
+    The points for predicting the goals of one of the teams
+    """
+
+    @classmethod
+    def evaluate(
+            cls,
+            bet_home: ndarray,
+            bet_away: ndarray,
+            home: ndarray,
+            away: ndarray
+    ) -> ndarray:
+        """
+        Calculates the points of many bets at once
+        :param bet_home: The bet home goals
+        :param bet_away: The bet away goals
+        :param home: The actual home goals
+        :param away: The actual away goals
+        :return: The points of every bet
+        """
+        bet_home, bet_away = asarray(bet_home), asarray(bet_away)
+        home, away = asarray(home), asarray(away)
+        bet_difference = bet_home - bet_away
+        difference = home - away
+        return (
+            cls.TENDENCY * (sign(bet_difference) == sign(difference))
+            + cls.GOAL_DIFFERENCE * (bet_difference == difference)
+            + cls.TEAM_GOALS * (bet_home == home)
+            + cls.TEAM_GOALS * (bet_away == away)
+        )
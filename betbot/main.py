@@ -18,11 +18,19 @@ You should have received a copy of the GNU General Public License
 along with bundesliga-tippspiel.  If not, see <http://www.gnu.org/licenses/>.
 LICENSE"""
 
-import time
+import asyncio
 import logging
-from typing import List, Tuple
+from typing import List, Tuple, Optional
+from aiohttp import ClientSession, TCPConnector
+from betbot.api.BetLedger import BetLedger
 from betbot.api.ApiConnection import ApiConnection
+from betbot.api.AsyncApiConnection import AsyncApiConnection
+from betbot.api.BlockingApiConnection import BlockingApiConnection
+from betbot.data.CycleContext import CycleContext
+from betbot.data.OddsAggregator import OddsAggregator
+from betbot.data.HistoryIngester import HistoryIngester
 from betbot.prediction import predictors
+from betbot.scheduling.Scheduler import Scheduler
 
 
 def main(
@@ -30,7 +38,11 @@ def main(
         username: str,
         password: str,
         url: str,
-        loop: bool = False
+        loop: bool = False,
+        context: Optional[CycleContext] = None,
+        ledger: Optional[BetLedger] = None,
+        scheduler: Optional[Scheduler] = None,
+        ingester: Optional[HistoryIngester] = None
 ):
     """
     The main function of the betbot
@@ -39,33 +51,50 @@ def main(
     :param username: The username for bundesliga-tippspiel
     :param password: The password for bundesliga-tippspiel
     :param url: The base URL for the bundesliga-tippspiel instance
-    :param loop: If true will place new bets once an hour
+    :param loop: If true will keep placing bets, scheduled according to
+                 the kickoff times of the open matches
+    :param context: Data of the current cycle shared with other accounts.
+                    If not provided, a new context is used for every cycle
+    :param ledger: The ledger of placed bets. Only changed bets are placed
+    :param scheduler: Decides when to run the next cycle while looping
+    :param ingester: Stores finished matches in the match history.
+                     Only used if no context is provided
     :return: None
     """
     logging.info(f"Starting betbot for predictor {predictor_name} "
                  f"and user {username}@{url}")
 
-    api = ApiConnection(username, password, url)
+    if ledger is None:
+        ledger = BetLedger()
+    api = ApiConnection(username, password, url, ledger=ledger)
 
-    if not api.authorized():
+    if not api.login():
         return
 
     predictor_map = {
         x.name(): x for x in predictors
     }
     predictor_cls = predictor_map[predictor_name]
+    if scheduler is None:
+        scheduler = Scheduler()
 
     while True:
-        leagues = api.get_active_leagues()
+        cycle = context if context is not None else CycleContext()
+        leagues = cycle.get_active_leagues(api)
         for league, season in leagues:
             logging.info(f"Placing bets for league {league}/{season}")
-            predictor = predictor_cls(api, league, season)
-            matches = api.get_current_matchday_matches(league, season)
+            predictor = predictor_cls(api, league, season, cycle)
+            matches = cycle.get_matches(api, league, season)
             bets = predictor.predict(matches)
             api.place_bets(bets)
 
+        if context is None:
+            if ingester is None:
+                ingester = HistoryIngester()
+            ingester.ingest(cycle.get_all_matches(), cycle.get_all_odds())
+
         if loop:
-            time.sleep(60 * 60)
+            scheduler.wait(scheduler.next_delay(cycle.get_all_matches()))
         else:
             break
 
@@ -75,19 +104,161 @@ def main(
 def multi_main(
         url: str,
         config: List[Tuple[str, str, str]],
-        loop: bool = False
+        loop: bool = False,
+        scheduler: Optional[Scheduler] = None,
+        ledger: Optional[BetLedger] = None,
+        ingester: Optional[HistoryIngester] = None,
+        data_path: Optional[str] = None
 ):
     """
     Predicts using multiple procedures simultaneously
     :param url: The base URL for the bundesliga-tippspiel site
     :param config: The predictor names and credentials for the API
-    :param loop: Whether or not to loop this once an hour
+    :param loop: Whether or not to keep placing bets
+    :param scheduler: Decides when to run the next cycle while looping
+    :param ledger: The ledger of placed bets. Only changed bets are placed
+    :param ingester: Stores finished matches in the match history
+    :param data_path: The path in which football-data.co.uk files are
+                      stored. Defaults to ~/.config/betbot/history
     :return: None
     """
+    if scheduler is None:
+        scheduler = Scheduler()
+    if ledger is None:
+        ledger = BetLedger()
+    if ingester is None:
+        ingester = HistoryIngester(data_path)
     while True:
+        context = CycleContext(data_path)
         for predictor_name, user, password in config:
-            main(predictor_name, user, password, url, False)
+            main(predictor_name, user, password, url, False, context, ledger)
+        ingester.ingest(context.get_all_matches(), context.get_all_odds())
+        OddsAggregator.log_stats()
         if loop:
-            time.sleep(60 * 60)
+            scheduler.wait(scheduler.next_delay(context.get_all_matches()))
         else:
             break
+
+
+async def async_main(
+        predictor_name: str,
+        username: str,
+        password: str,
+        url: str,
+        session: ClientSession,
+        context: CycleContext,
+        ledger: BetLedger
+):
+    """
+    Asynchronous variant of the main function. Runs a single bot cycle.
+    The API calls are performed on the event loop while the (blocking)
+    predictions are run in worker threads.
+    :param predictor_name: The name of the predictor to use
+    :param username: The username for bundesliga-tippspiel
+    :param password: The password for bundesliga-tippspiel
+    :param url: The base URL for the bundesliga-tippspiel instance
+    :param session: The shared aiohttp session
+    :param context: The data of the current cycle shared with other accounts
+    :param ledger: The ledger of placed bets. Only changed bets are placed
+    :return: None
+    """
+    logging.info(f"Starting betbot for predictor {predictor_name} "
+                 f"and user {username}@{url}")
+
+    api = AsyncApiConnection(username, password, url, session, ledger=ledger)
+    if not await api.login():
+        return
+
+    predictor_map = {
+        x.name(): x for x in predictors
+    }
+    predictor_cls = predictor_map[predictor_name]
+
+    loop = asyncio.get_running_loop()
+    blocking_api = BlockingApiConnection(api, loop)
+
+    await context.prefetch(api)
+    for league, season in context.get_active_leagues(blocking_api):
+        logging.info(f"Placing bets for league {league}/{season} "
+                     f"(user: {username})")
+        matches = context.get_matches(blocking_api, league, season)
+        predictor = await loop.run_in_executor(
+            None, predictor_cls, blocking_api, league, season, context
+        )
+        bets = await loop.run_in_executor(None, predictor.predict, matches)
+        await api.place_bets(bets)
+
+    await api.logout()
+
+
+async def async_multi_main(
+        url: str,
+        config: List[Tuple[str, str, str]],
+        loop: bool = False,
+        concurrency: int = 8,
+        scheduler: Optional[Scheduler] = None,
+        ledger: Optional[BetLedger] = None,
+        ingester: Optional[HistoryIngester] = None,
+        data_path: Optional[str] = None
+):
+    """
+    Predicts using multiple procedures concurrently
+    :param url: The base URL for the bundesliga-tippspiel site
+    :param config: The predictor names and credentials for the API
+    :param loop: Whether or not to keep placing bets
+    :param concurrency: The maximum amount of accounts handled at once
+    :param scheduler: Decides when to run the next cycle while looping
+    :param ledger: The ledger of placed bets. Only changed bets are placed
+    :param ingester: Stores finished matches in the match history
+    :param data_path: The path in which football-data.co.uk files are
+                      stored. Defaults to ~/.config/betbot/history
+    :return: None
+    """
+    if scheduler is None:
+        scheduler = Scheduler()
+    if ledger is None:
+        ledger = BetLedger()
+    if ingester is None:
+        ingester = HistoryIngester(data_path)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(
+            predictor_name: str,
+            user: str,
+            password: str,
+            context: CycleContext
+    ):
+        async with semaphore:
+            try:
+                await async_main(
+                    predictor_name,
+                    user,
+                    password,
+                    url,
+                    session,
+                    context,
+                    ledger
+                )
+            except Exception as e:
+                logging.exception(f"Bot cycle failed for user {user}: {e}")
+
+    connector = TCPConnector(limit=concurrency * 2)
+    async with ClientSession(connector=connector) as session:
+        while True:
+            context = CycleContext(data_path)
+            await asyncio.gather(*[
+                run(predictor_name, user, password, context)
+                for predictor_name, user, password in config
+            ])
+            await asyncio.get_running_loop().run_in_executor(
+                None,
+                ingester.ingest,
+                context.get_all_matches(),
+                context.get_all_odds()
+            )
+            OddsAggregator.log_stats()
+            if loop:
+                delay = scheduler.next_delay(context.get_all_matches())
+                await scheduler.async_wait(delay)
+            else:
+                break
@@ -18,10 +18,9 @@ along with betbot.  If not, see <http://www.gnu.org/licenses/>.
 LICENSE"""
 
 from math import sqrt
-from typing import List, Tuple
+from typing import List, Tuple, Sequence
 from betbot.api.Bet import Bet
 from betbot.api.Match import Match
-from betbot.data.OddsPortal import OddsPortal
 from betbot.prediction.Predictor import Predictor
 
 
@@ -37,15 +36,14 @@ class BettingOddsPredictor(Predictor):
         """
         return "betting-odds"
 
-    def predict(self, matches: List[Match]) -> List[Bet]:
+    def predict(self, matches: Sequence[Match]) -> List[Bet]:
         """
         Performs the prediction
         :param matches: The matches to predict
         :return: The predictions as Bet objects
         """
         bets = []
-        oddsportal = OddsPortal()
-        odds = oddsportal.get_odds(self.league)
+        odds = self.context.get_odds(self.league)
         for match in matches:
             match_tuple = (match.home_team, match.away_team)
             match_odds = odds.get(match_tuple)
@@ -18,7 +18,7 @@ along with betbot.  If not, see <http://www.gnu.org/licenses/>.
 LICENSE"""
 
 import random
-from typing import List
+from typing import List, Sequence
 from betbot.api.Bet import Bet
 from betbot.api.Match import Match
 from betbot.prediction.Predictor import Predictor
@@ -36,7 +36,7 @@ class DrawPredictor(Predictor):
         """
         return "draw"
 
-    def predict(self, matches: List[Match]) -> List[Bet]:
+    def predict(self, matches: Sequence[Match]) -> List[Bet]:
         """
         Performs the prediction
         :param matches: The matches to predict
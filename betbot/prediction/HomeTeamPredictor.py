@@ -17,7 +17,7 @@ You should have received a copy of the GNU General Public License
 along with betbot.  If not, see <http://www.gnu.org/licenses/>.
 LICENSE"""
 
-from typing import List
+from typing import List, Sequence
 from betbot.api.Bet import Bet
 from betbot.api.Match import Match
 from betbot.prediction.Predictor import Predictor
@@ -35,7 +35,7 @@ class HomeTeamPredictor(Predictor):
         """
         return "home-team"
 
-    def predict(self, matches: List[Match]) -> List[Bet]:
+    def predict(self, matches: Sequence[Match]) -> List[Bet]:
         """
         Performs the prediction
         :param matches: The matches to predict
@@ -17,7 +17,7 @@ You should have received a copy of the GNU General Public License
 along with betbot.  If not, see <http://www.gnu.org/licenses/>.
 LICENSE"""
 
-from typing import List
+from typing import List, Sequence
 from betbot.api.Bet import Bet
 from betbot.api.Match import Match
 from betbot.prediction.Predictor import Predictor
@@ -35,13 +35,18 @@ class LeagueTablePredictor(Predictor):
         """
         return "league-table"
 
-    def predict(self, matches: List[Match]) -> List[Bet]:
+    def predict(self, matches: Sequence[Match]) -> List[Bet]:
         """
         Performs the prediction
         :param matches: The matches to predict
         :return: The predictions as Bet objects
         """
-        league_table = self.api.get_league_table(self.league, self.season)
+        if self.api is None:
+            self.logger.warning("No API connection, skipping")
+            return []
+        league_table = self.context.get_league_table(
+            self.api, self.league, self.season
+        )
         bets = []
         for match in matches:
             home_team_index = league_table.index(match.home_team)
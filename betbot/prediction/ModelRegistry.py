@@ -0,0 +1,435 @@
+"""LICENSE
+Copyright 2020 Hermann Krumrey <hermann@krumreyh.com>
+
+This file is part of betbot.
+
+betbot is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+betbot is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with betbot.  If not, see <http://www.gnu.org/licenses/>.
+LICENSE"""
+
+import os
+import json
+import time
+import logging
+import tempfile
+import sklearn
+from datetime import datetime, timezone
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+from importlib.metadata import version, PackageNotFoundError
+from typing import Dict, Any, Optional, Callable, Tuple
+from joblib import load, dump
+
+
+class ModelRegistry:
+    """
+    Class that keeps track of the trained models of the predictors.
+    Every model version is stored together with the fingerprint of the
+    data it was trained on, its feature schema and the code versions used
+    to train it.
+    Stale models keep being used while a new version is trained in a
+    background worker. Models with an incompatible feature schema or
+    scikit-learn version are never used. New versions replace the
+    current version atomically once they are ready.
+    """
+
+    instance: Optional["ModelRegistry"] = None
+    """
+    The process-wide model registry
+    """
+
+    instance_lock = Lock()
+    """
+    Lock that guards the creation of the process-wide model registry
+    """
+
+    def __init__(
+            self,
+            path: Optional[str] = None,
+            max_age: float = 7 * 86400,
+            keep: int = 3
+    ):
+        """
+        Initializes the model registry
+        :param path: The directory in which models are stored.
+                     Defaults to ~/.config/betbot/models
+        :param max_age: The age in seconds after which a model is
+                        retrained even if its training data did not change
+        :param keep: The amount of model versions to keep per predictor
+        """
+        if path is None:
+            path = os.path.join(
+                os.path.expanduser("~"), ".config/betbot/models"
+            )
+        self.logger = logging.getLogger(__name__)
+        self.path = path
+        self.index_path = os.path.join(path, "registry.json")
+        self.max_age = max_age
+        self.keep = keep
+        self.lock = Lock()
+        self.executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="training"
+        )
+        self.jobs: Dict[str, Future] = {}
+        self.loaded: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        os.makedirs(path, exist_ok=True)
+
+    @classmethod
+    def get(cls) -> "ModelRegistry":
+        """
+        :return: The process-wide model registry
+        """
+        with cls.instance_lock:
+            if cls.instance is None:
+                cls.instance = cls()
+            return cls.instance
+
+    @staticmethod
+    def code_version() -> Dict[str, str]:
+        """
+        :return: The versions of betbot and scikit-learn
+        """
+        try:
+            betbot_version = version("betbot")
+        except PackageNotFoundError:
+            betbot_version = "unknown"
+        return {"betbot": betbot_version, "sklearn": sklearn.__version__}
+
+    def get_model(
+            self,
+            name: str,
+            schema: str,
+            fingerprint: str,
+            train: Callable[[], Tuple[Dict[str, Any], str]],
+            legacy_path: Optional[str] = None,
+            update: Optional[Callable[
+                [Dict[str, Any]], Optional[Tuple[Dict[str, Any], str]]
+            ]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Retrieves the current model of a predictor. If the model is
+        missing, stale or incompatible, a new model is trained in the
+        background. If only the training data changed, the model is
+        updated incrementally instead, if possible. Full retraining
+        still happens once the model is older than the maximum age.
+        This never blocks on training.
+        :param name: The name of the predictor
+        :param schema: The feature schema the predictor expects
+        :param fingerprint: The fingerprint of the current training data
+        :param train: Trains a new model, returning the model as well as
+                      the fingerprint of the data it was trained on
+        :param legacy_path: The path of a model file from before the
+                            registry existed. It is imported, but never
+                            used, since the scikit-learn version that
+                            created it is unknown.
+        :param update: Incrementally updates a model with the current
+                       training data, returning the updated model and the
+                       fingerprint of the data, or None if not possible
+        :return: The current model or None if no compatible model exists
+        """
+        with self.lock:
+            index = self.load_index()
+        if name not in index and legacy_path is not None \
+                and os.path.isfile(legacy_path):
+            self.import_legacy(name, schema, legacy_path)
+
+        with self.lock:
+            entry = self.load_index().get(name, {})
+            current = entry.get("current")
+            meta = entry.get("versions", {}).get(current)
+
+        if meta is not None and not self.compatible(meta, schema):
+            self.logger.warning(f"Model {name}/{current} is incompatible")
+            meta = None
+
+        model = None
+        if meta is not None:
+            model = self.load_model(name, current)
+
+        if model is None:
+            self.schedule(name, schema, train)
+        elif self.stale(name, meta, fingerprint):
+            if not self.updatable(name, meta):
+                update = None
+            self.schedule(name, schema, train, update, model, meta)
+        return model
+
+    def compatible(self, meta: Dict[str, Any], schema: str) -> bool:
+        """
+        Checks whether a model can be used by the current code
+        :param meta: The metadata of the model version
+        :param schema: The feature schema the predictor expects
+        :return: True if the model is compatible, False otherwise
+        """
+        sklearn_version = meta["code_version"].get("sklearn")
+        return meta["schema"] == schema and \
+            sklearn_version == self.code_version()["sklearn"]
+
+    def stale(self, name: str, meta: Dict[str, Any], fingerprint: str) \
+            -> bool:
+        """
+        Checks whether a model should be retrained
+        :param name: The name of the predictor
+        :param meta: The metadata of the model version
+        :param fingerprint: The fingerprint of the current training data
+        :return: True if the model is stale, False otherwise
+        """
+        return meta["fingerprint"] != fingerprint \
+            or meta["code_version"] != self.code_version() \
+            or meta.get("config") != self.get_config(name) \
+            or time.time() - meta["trained"] > self.max_age
+
+    def updatable(self, name: str, meta: Dict[str, Any]) -> bool:
+        """
+        Checks whether a stale model may be updated incrementally instead
+        of being retrained, which is the case if only its training data
+        changed
+        :param name: The name of the predictor
+        :param meta: The metadata of the model version
+        :return: True if the model may be updated, False otherwise
+        """
+        return meta["fingerprint"] is not None \
+            and meta["code_version"] == self.code_version() \
+            and meta.get("config") == self.get_config(name) \
+            and time.time() - meta["trained"] <= self.max_age
+
+    def load_model(self, name: str, model_id: str) \
+            -> Optional[Dict[str, Any]]:
+        """
+        Loads a model version. The model of the current version is only
+        loaded from disk once.
+        :param name: The name of the predictor
+        :param model_id: The ID of the model version
+        :return: The model or None if it could not be loaded
+        """
+        with self.lock:
+            cached = self.loaded.get(name)
+            if cached is not None and cached[0] == model_id:
+                return cached[1]
+            try:
+                model = load(self.model_path(name, model_id))
+            except Exception as e:
+                self.logger.warning(f"Failed to load {name}/{model_id}: {e}")
+                return None
+            self.loaded[name] = (model_id, model)
+            return model
+
+    def schedule(
+            self,
+            name: str,
+            schema: str,
+            train: Callable[[], Tuple[Dict[str, Any], str]],
+            update: Optional[Callable[
+                [Dict[str, Any]], Optional[Tuple[Dict[str, Any], str]]
+            ]] = None,
+            model: Optional[Dict[str, Any]] = None,
+            meta: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Trains or updates a model in the background, unless the
+        predictor is already being trained
+        :param name: The name of the predictor
+        :param schema: The feature schema of the model
+        :param train: Trains a new model
+        :param update: Incrementally updates the current model.
+                       If it returns None, a new model is trained instead.
+        :param model: The current model
+        :param meta: The metadata of the current model version
+        :return: None
+        """
+        with self.lock:
+            job = self.jobs.get(name)
+            if job is not None and not job.done():
+                return
+            self.logger.info(f"Refreshing model {name} in the background")
+            self.jobs[name] = self.executor.submit(
+                self.run_training, name, schema, train, update, model, meta
+            )
+
+    def run_training(
+            self,
+            name: str,
+            schema: str,
+            train: Callable[[], Tuple[Dict[str, Any], str]],
+            update: Optional[Callable[
+                [Dict[str, Any]], Optional[Tuple[Dict[str, Any], str]]
+            ]] = None,
+            model: Optional[Dict[str, Any]] = None,
+            meta: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Trains or updates a model and makes it the current version
+        :param name: The name of the predictor
+        :param schema: The feature schema of the model
+        :param train: Trains a new model
+        :param update: Incrementally updates the current model
+        :param model: The current model
+        :param meta: The metadata of the current model version
+        :return: None
+        """
+        try:
+            start = time.time()
+            result = None
+            if update is not None and model is not None and meta is not None:
+                result = update(model)
+                if result is None:
+                    self.logger.info(f"Can not update {name}, retraining")
+
+            if result is not None and meta is not None:
+                new_model, fingerprint = result
+                new_meta = dict(
+                    meta, fingerprint=fingerprint, updated=time.time()
+                )
+            else:
+                new_model, fingerprint = train()
+                new_meta = {
+                    "fingerprint": fingerprint,
+                    "schema": schema,
+                    "code_version": self.code_version(),
+                    "config": self.get_config(name),
+                    "trained": time.time()
+                }
+
+            self.store(name, new_model, new_meta)
+            self.logger.info(
+                f"Refreshed model {name} in {time.time() - start:.3f}s"
+            )
+        except Exception as e:
+            self.logger.exception(f"Failed to train model {name}: {e}")
+
+    def store(self, name: str, model: Dict[str, Any], meta: Dict[str, Any]):
+        """
+        Stores a new model version and makes it the current version.
+        The model file is written before the index is updated, so readers
+        either use the old or the new version.
+        :param name: The name of the predictor
+        :param model: The model to store
+        :param meta: The metadata of the model version
+        :return: None
+        """
+        model_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        path = self.model_path(name, model_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handle, tempfile_path = tempfile.mkstemp(
+            dir=os.path.dirname(path), suffix=".tmp"
+        )
+        os.close(handle)
+        dump(model, tempfile_path)
+        os.replace(tempfile_path, path)
+
+        with self.lock:
+            index = self.load_index()
+            entry = index.setdefault(name, {"current": None, "versions": {}})
+            entry["versions"][model_id] = meta
+            entry["current"] = model_id
+
+            for old_id in sorted(entry["versions"])[:-self.keep]:
+                entry["versions"].pop(old_id)
+                old_path = self.model_path(name, old_id)
+                if os.path.isfile(old_path):
+                    os.remove(old_path)
+
+            self.save_index(index)
+            self.loaded[name] = (model_id, model)
+
+    def import_legacy(self, name: str, schema: str, legacy_path: str):
+        """
+        Imports a model file from before the registry existed. Its
+        training data and the scikit-learn version that pickled it are
+        unknown, so it is incompatible and retrained right away.
+        :param name: The name of the predictor
+        :param schema: The feature schema of the model
+        :param legacy_path: The path of the model file
+        :return: None
+        """
+        try:
+            model = load(legacy_path)
+        except Exception as e:
+            self.logger.warning(f"Failed to import {legacy_path}: {e}")
+            return
+        self.logger.info(f"Importing model {legacy_path}")
+        self.store(name, model, {
+            "fingerprint": None,
+            "schema": schema,
+            "code_version": {"betbot": "legacy", "sklearn": "unknown"},
+            "trained": os.path.getmtime(legacy_path)
+        })
+        os.remove(legacy_path)
+
+    def get_config(self, name: str) -> Optional[Dict[str, Any]]:
+        """
+        Retrieves the regressor configuration of a predictor
+        :param name: The name of the predictor
+        :return: The configuration or None if the default is used
+        """
+        with self.lock:
+            return self.load_index().get(name, {}).get("config")
+
+    def set_config(self, name: str, config: Optional[Dict[str, Any]]):
+        """
+        Sets the regressor configuration of a predictor, for example the
+        winner of a model selection. The current model becomes stale and
+        is retrained with the new configuration the next time it is used.
+        :param name: The name of the predictor
+        :param config: The configuration or None to use the default
+        :return: None
+        """
+        with self.lock:
+            index = self.load_index()
+            entry = index.setdefault(name, {"current": None, "versions": {}})
+            entry["config"] = config
+            self.save_index(index)
+
+    def wait(self, name: Optional[str] = None):
+        """
+        Waits for background training to finish
+        :param name: The predictor to wait for. Defaults to all predictors
+        :return: None
+        """
+        with self.lock:
+            jobs = [
+                job for job_name, job in self.jobs.items()
+                if name is None or job_name == name
+            ]
+        wait(jobs)
+
+    def model_path(self, name: str, model_id: str) -> str:
+        """
+        :param name: The name of the predictor
+        :param model_id: The ID of the model version
+        :return: The path of the model file
+        """
+        return os.path.join(self.path, name, f"{model_id}.model")
+
+    def load_index(self) -> Dict[str, Any]:
+        """
+        Loads the index of all model versions. Must be called while
+        holding the lock.
+        :return: The index
+        """
+        if not os.path.isfile(self.index_path):
+            return {}
+        with open(self.index_path, "r") as f:
+            return json.load(f)
+
+    def save_index(self, index: Dict[str, Any]):
+        """
+        Atomically stores the index of all model versions. Must be called
+        while holding the lock.
+        :param index: The index to store
+        :return: None
+        """
+        handle, tempfile_path = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        with os.fdopen(handle, "w") as f:
+            json.dump(index, f, indent=4)
+        os.replace(tempfile_path, self.index_path)
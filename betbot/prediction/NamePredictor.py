@@ -17,10 +17,9 @@ You should have received a copy of the GNU General Public License
 along with betbot.  If not, see <http://www.gnu.org/licenses/>.
 LICENSE"""
 
-from betbot.api.Match import Match
-from numpy import concatenate, ndarray, array
-from sklearn.feature_extraction.text import CountVectorizer
-from typing import Dict, Union, Optional, Tuple
+from numpy import ndarray
+from typing import Tuple, Optional
+from scipy.sparse import csr_matrix, hstack as sparse_hstack
 from betbot.prediction.SKLearnPredictor import SKLearnPredictor
 
 
@@ -36,52 +35,47 @@ class NamePredictor(SKLearnPredictor):
         """
         return "name-only"
 
-    # noinspection PyMethodMayBeStatic
-    def interpret_results(self, home_result: float, away_result: float) -> \
-            Tuple[int, int]:
+    uses_odds = False
+    """
+    Whether the model uses betting odds
+    """
+
+    @classmethod
+    def interpret_batch(cls, results: ndarray) -> Tuple[ndarray, ndarray]:
         """
-        Interprets the raw results
-        :param home_result: The home goals result
-        :param away_result: The away goals result
+        Interprets the raw results of many matches at once.
+        Draws are avoided by adding a goal to the team with the
+        better result.
+        :param results: The raw results, one row (home, away) per match
         :return: The home goals, the away goals
         """
-        home_converted = (1 / home_result) - 1
-        away_converted = (1 / away_result) - 1
-        min_score = min([home_converted, away_converted])
-        normer = round(min_score)
-        home_score = round(home_converted - min_score + normer)
-        away_score = round(away_converted - min_score + normer)
-        if home_score == away_score:
-            if min_score == home_converted:
-                away_score += 1
-            else:
-                home_score += 1
-
+        home_score, away_score = super().interpret_batch(results)
+        converted = cls.decode_batch(results)
+        draws = home_score == away_score
+        home_min = converted[:, 0] <= converted[:, 1]
+        away_score += draws & home_min
+        home_score += draws & ~home_min
         return home_score, away_score
 
-    def vectorize(self, match_data: Dict[str, Union[str, float]]) -> ndarray:
-        """
-        Defines how a match is vectorized
-        :param match_data: The match data to vectorize
-        :return: The vector for the match
-        """
-        team_vectorizer: CountVectorizer = self.model["team_vectorizer"]
-        home, away = team_vectorizer.transform([
-            match_data["home_team"], match_data["away_team"]
-        ]).toarray()
-        return concatenate((home, away))
-
-    def predict_match(self, match: Match) -> Optional[Tuple[int, int]]:
+    def vectorize_batch(
+            self,
+            home_ids: ndarray,
+            away_ids: ndarray,
+            odds: ndarray,
+            team_matrix: Optional[csr_matrix] = None
+    ) -> csr_matrix:
         """
-        Predicts the result of a single match using the trained model
-        :param match: The match to predict
-        :return: The home goals and away goals or None
-                 if no prediction took place
+        Vectorizes many matches at once using only the teams
+        :param home_ids: The team IDs of the home teams
+        :param away_ids: The team IDs of the away teams
+        :param odds: The odds of the matches, which are ignored
+        :param team_matrix: The team vectors to use.
+                            Defaults to those of the current model
+        :return: The vectors for the matches as a sparse matrix,
+                 one row per match
         """
-        match_data: Dict[str, Union[str, float]] = {
-            "home_team": match.home_team,
-            "away_team": match.away_team
-        }
-        vector = array([self.vectorize(match_data)])
-        results = self.model["regressor"].predict(vector)[0]
-        return self.interpret_results(*results)
+        if team_matrix is None:
+            team_matrix = self.get_team_matrix()
+        return sparse_hstack(
+            (team_matrix[home_ids], team_matrix[away_ids]), format="csr"
+        )
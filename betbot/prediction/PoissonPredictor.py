@@ -0,0 +1,420 @@
+"""LICENSE
+Copyright 2020 Hermann Krumrey <hermann@krumreyh.com>
+
+This file is part of betbot.
+
+betbot is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+betbot is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with betbot.  If not, see <http://www.gnu.org/licenses/>.
+LICENSE"""
+
+import os
+from typing import List, Tuple, Dict, Optional, Any, Sequence
+from numpy import ndarray, exp, log, zeros, ones_like, unique, concatenate, \
+    bincount, arange, maximum, indices, argmax, where, select, \
+    divmod as array_divmod
+from scipy.optimize import minimize, minimize_scalar
+from scipy.stats import poisson
+from betbot.api.Bet import Bet
+from betbot.api.Match import Match
+from betbot.api.MatchBatch import MatchBatch
+from betbot.api.MatchdayApi import MatchdayApi
+from betbot.data.CycleContext import CycleContext
+from betbot.data.FootballDataCoUk import FootballDataUk
+from betbot.data.TeamRegistry import TeamRegistry
+from betbot.evaluation.Scoring import Scoring
+from betbot.prediction.Predictor import Predictor
+from betbot.prediction.ModelRegistry import ModelRegistry
+
+
+class PoissonPredictor(Predictor):
+    """
+    Class that models the goals of both teams as independent Poisson
+    distributions whose rates depend on the attack and defence strengths
+    of the teams and on the home advantage.
+    The Dixon-Coles correction adjusts the probabilities of the low
+    scoring results 0:0, 1:0, 0:1 and 1:1. Older matches are weighted
+    down exponentially.
+    The bet for a match is the result with the highest expected amount
+    of tippspiel points.
+    """
+
+    max_goals = 10
+    """
+    The maximum amount of goals considered for a team
+    """
+
+    half_life = 365.0
+    """
+    The amount of days after which the weight of a match is halved.
+    Matches are weighted equally if this is None.
+    """
+
+    dixon_coles = True
+    """
+    Whether the Dixon-Coles correction is applied
+    """
+
+    regularization = 1.0
+    """
+    The strength of the L2 penalty on the team strengths. Keeps the
+    strengths of teams with few matches close to the average.
+    """
+
+    def __init__(
+            self,
+            api: Optional[MatchdayApi],
+            league: str,
+            season: int,
+            context: Optional[CycleContext] = None,
+            load_model: bool = True
+    ):
+        """
+        Initializes the model
+        :param api: The bundesliga-tippspiel API connection
+        :param league: The league for which to predict matches
+        :param season: The season for which to predict matches
+        :param context: The data of the current bot cycle
+        :param load_model: Whether to retrieve the model from the model
+                           registry
+        """
+        super().__init__(api, league, season, context)
+        self.history_path = os.path.join(self.model_dir, "history")
+        self.fetcher = FootballDataUk(self.history_path)
+        self.registry = ModelRegistry.get()
+        os.makedirs(self.history_path, exist_ok=True)
+
+        self.model: Optional[Dict[str, Any]] = None
+        if load_model:
+            self.model = self.load_model()
+
+    @classmethod
+    def name(cls) -> str:
+        """
+        :return: The name of the predictor
+        """
+        return "poisson"
+
+    @classmethod
+    def feature_schema(cls) -> str:
+        """
+        Identifies the parameters of the model. Models with different
+        parameters can not be used. The team strengths are indexed by
+        team ID, so models fitted using a different version of the team
+        registry can not be used either.
+        :return: The feature schema
+        """
+        parameters = "attack,defence,home,rho" if cls.dixon_coles \
+            else "attack,defence,home"
+        return f"{parameters};teams={TeamRegistry.get().version}"
+
+    def load_model(self) -> Optional[Dict[str, Any]]:
+        """
+        Retrieves the model from the model registry. Training only takes
+        a moment, so a missing model is trained right away. Training may
+        register new teams, which changes the feature schema, so the
+        model is trained again once if that happened.
+        :return: The model or None if no model could be trained
+        """
+        def get_model() -> Optional[Dict[str, Any]]:
+            return self.registry.get_model(
+                self.name(),
+                self.feature_schema(),
+                self.fetcher.get_history_fingerprint(),
+                self.train
+            )
+
+        model = get_model()
+        for _ in range(2):
+            if model is not None:
+                break
+            self.registry.wait(self.name())
+            model = get_model()
+        return model
+
+    def train(self) -> Tuple[Dict[str, Any], str]:
+        """
+        Fits a new model. The model currently in use is not modified.
+        :return: The model and the fingerprint of the training data
+        """
+        self.fetcher.download_history()
+        fingerprint = self.fetcher.get_history_fingerprint()
+        return self.fit(self.fetcher.get_history_columns()), fingerprint
+
+    def fit_history(self, columns: Dict[str, ndarray]):
+        """
+        Replaces the model with one fitted on the given matches only
+        :param columns: The history columns of the matches to fit
+        :return: None
+        """
+        self.model = self.fit(columns)
+
+    def fit(self, columns: Dict[str, ndarray]) -> Dict[str, Any]:
+        """
+        Fits the team strengths and the home advantage by maximizing the
+        weighted Poisson likelihood of the historical results. The
+        Dixon-Coles parameter is fitted afterwards, using the fitted
+        scoring rates.
+        :param columns: The history columns of the matches to fit
+        :return: The model
+        """
+        home_goals = columns["home_score"].astype(float)
+        away_goals = columns["away_score"].astype(float)
+        weights = self.weights(columns["date"].astype(float))
+        team_ids, teams = unique(
+            concatenate((columns["home_team"], columns["away_team"]))
+            .astype(int),
+            return_inverse=True
+        )
+        home, away = teams[:len(home_goals)], teams[len(home_goals):]
+        size = len(team_ids)
+
+        def objective(params: ndarray) -> Tuple[float, ndarray]:
+            attack, defence = params[:size], params[size:2 * size]
+            home_log, away_log = self.log_rates(
+                params[-2], params[-1], attack[home] - defence[away],
+                attack[away] - defence[home]
+            )
+            home_rate, away_rate = exp(home_log), exp(away_log)
+            likelihood = (weights * (
+                home_goals * home_log - home_rate
+                + away_goals * away_log - away_rate
+            )).sum() - 0.5 * self.regularization * (
+                attack @ attack + defence @ defence
+            )
+            home_residual = weights * (home_goals - home_rate)
+            away_residual = weights * (away_goals - away_rate)
+            gradient = concatenate((
+                bincount(home, home_residual, size)
+                + bincount(away, away_residual, size)
+                - self.regularization * attack,
+                -bincount(away, home_residual, size)
+                - bincount(home, away_residual, size)
+                - self.regularization * defence,
+                [
+                    home_residual.sum() + away_residual.sum(),
+                    home_residual.sum()
+                ]
+            ))
+            return -likelihood, -gradient
+
+        params = minimize(
+            objective, zeros(2 * size + 2), jac=True, method="L-BFGS-B"
+        ).x
+        length = team_ids.max(initial=-1) + 1
+        model: Dict[str, Any] = {
+            "attack": zeros(length),
+            "defence": zeros(length),
+            "intercept": float(params[-2]),
+            "home": float(params[-1]),
+            "rho": 0.0
+        }
+        model["attack"][team_ids] = params[:size]
+        model["defence"][team_ids] = params[size:2 * size]
+
+        if self.dixon_coles:
+            attack, defence = params[:size], params[size:2 * size]
+            home_log, away_log = self.log_rates(
+                model["intercept"], model["home"],
+                attack[home] - defence[away], attack[away] - defence[home]
+            )
+            model["rho"] = self.fit_rho(
+                home_goals, away_goals, exp(home_log), exp(away_log),
+                weights
+            )
+        return model
+
+    def weights(self, dates: ndarray) -> ndarray:
+        """
+        Calculates the weights of matches based on their age
+        :param dates: The dates of the matches as days since 1970-01-01
+        :return: The weights, 1 for the most recent match
+        """
+        if self.half_life is None or len(dates) == 0:
+            return ones_like(dates)
+        return exp(-log(2) * (dates.max() - dates) / self.half_life)
+
+    @staticmethod
+    def log_rates(
+            intercept: float,
+            home_advantage: float,
+            home_strength: ndarray,
+            away_strength: ndarray
+    ) -> Tuple[ndarray, ndarray]:
+        """
+        Calculates the logarithms of the scoring rates
+        :param intercept: The logarithm of the average scoring rate
+        :param home_advantage: The home advantage
+        :param home_strength: The attack strength of the home teams minus
+                              the defence strength of the away teams
+        :param away_strength: The attack strength of the away teams minus
+                              the defence strength of the home teams
+        :return: The logarithms of the home and away scoring rates
+        """
+        return intercept + home_advantage + home_strength, \
+            intercept + away_strength
+
+    @classmethod
+    def fit_rho(
+            cls,
+            home_goals: ndarray,
+            away_goals: ndarray,
+            home_rate: ndarray,
+            away_rate: ndarray,
+            weights: ndarray
+    ) -> float:
+        """
+        Fits the Dixon-Coles parameter by maximizing the weighted
+        likelihood of the low scoring results
+        :param home_goals: The home goals of the matches
+        :param away_goals: The away goals of the matches
+        :param home_rate: The home scoring rates of the matches
+        :param away_rate: The away scoring rates of the matches
+        :param weights: The weights of the matches
+        :return: The Dixon-Coles parameter
+        """
+        low = (home_goals <= 1) & (away_goals <= 1)
+        home_goals, away_goals = home_goals[low], away_goals[low]
+        home_rate, away_rate = home_rate[low], away_rate[low]
+        weights = weights[low]
+
+        def objective(rho: float) -> float:
+            correction = cls.correction(
+                home_goals, away_goals, home_rate, away_rate, rho
+            )
+            return -(weights * log(maximum(correction, 1e-10))).sum()
+
+        return float(minimize_scalar(
+            objective, bounds=(-0.2, 0.2), method="bounded"
+        ).x)
+
+    @staticmethod
+    def correction(
+            home_goals: ndarray,
+            away_goals: ndarray,
+            home_rate: ndarray,
+            away_rate: ndarray,
+            rho: float
+    ) -> ndarray:
+        """
+        Calculates the Dixon-Coles correction factors of results.
+        For lopsided matches with high scoring rates, a factor may become
+        negative, so the factors are clipped at 0.
+        :param home_goals: The home goals
+        :param away_goals: The away goals
+        :param home_rate: The home scoring rates
+        :param away_rate: The away scoring rates
+        :param rho: The Dixon-Coles parameter
+        :return: The factors by which the probabilities are multiplied
+        """
+        return maximum(select(
+            [
+                (home_goals == 0) & (away_goals == 0),
+                (home_goals == 0) & (away_goals == 1),
+                (home_goals == 1) & (away_goals == 0),
+                (home_goals == 1) & (away_goals == 1)
+            ],
+            [
+                1 - home_rate * away_rate * rho,
+                1 + home_rate * rho,
+                1 + away_rate * rho,
+                1 - rho + 0 * home_rate
+            ],
+            1.0
+        ), 0.0)
+
+    def rates(self, home_ids: ndarray, away_ids: ndarray) \
+            -> Tuple[ndarray, ndarray]:
+        """
+        Calculates the scoring rates of matches.
+        Teams without historical matches are assumed to be average.
+        :param home_ids: The team IDs of the home teams
+        :param away_ids: The team IDs of the away teams
+        :return: The home and away scoring rates
+        """
+        model = self.model
+        assert model is not None
+        known = len(model["attack"])
+        attack: ndarray = concatenate((model["attack"], zeros(1)))
+        defence: ndarray = concatenate((model["defence"], zeros(1)))
+        home_ids = where(home_ids < known, home_ids, known)
+        away_ids = where(away_ids < known, away_ids, known)
+        home_log, away_log = self.log_rates(
+            model["intercept"], model["home"],
+            attack[home_ids] - defence[away_ids],
+            attack[away_ids] - defence[home_ids]
+        )
+        return exp(home_log), exp(away_log)
+
+    def probabilities(self, home_ids: ndarray, away_ids: ndarray) \
+            -> ndarray:
+        """
+        Calculates the probabilities of all results of many matches at
+        once. Results with more than max_goals goals for a team are left
+        out, the remaining probabilities are normalized.
+        :param home_ids: The team IDs of the home teams
+        :param away_ids: The team IDs of the away teams
+        :return: The probabilities, indexed by match, home goals and
+                 away goals
+        """
+        assert self.model is not None
+        home_rate, away_rate = self.rates(home_ids, away_ids)
+        goals = arange(self.max_goals + 1)
+        matrix = poisson.pmf(goals, home_rate[:, None])[:, :, None] * \
+            poisson.pmf(goals, away_rate[:, None])[:, None, :]
+        home_goals, away_goals = indices(matrix.shape[1:])
+        matrix *= self.correction(
+            home_goals, away_goals, home_rate[:, None, None],
+            away_rate[:, None, None], self.model["rho"]
+        )
+        return matrix / matrix.sum(axis=(1, 2), keepdims=True)
+
+    @classmethod
+    def expected_points(cls, probabilities: ndarray) -> ndarray:
+        """
+        Calculates the expected tippspiel points of every possible bet
+        :param probabilities: The probabilities of the results, indexed by
+                              match, home goals and away goals
+        :return: The expected points, indexed by match, bet home goals and
+                 bet away goals
+        """
+        grid: ndarray = indices(probabilities.shape[1:])
+        home_goals, away_goals = grid[0].ravel(), grid[1].ravel()
+        points = Scoring.evaluate(
+            home_goals[:, None], away_goals[:, None],
+            home_goals[None, :], away_goals[None, :]
+        )
+        flat = probabilities.reshape(len(probabilities), -1)
+        return (flat @ points.T).reshape(probabilities.shape)
+
+    def predict(self, matches: Sequence[Match]) -> List[Bet]:
+        """
+        Performs the prediction
+        The result probabilities of all matches are calculated at once.
+        Every match is bet on the result with the highest expected
+        amount of points.
+        :param matches: The matches to predict
+        :return: The predictions as Bet objects
+        """
+        if self.model is None:
+            self.logger.warning("No model available yet, skipping")
+            return []
+        batch = MatchBatch.from_matches(matches)
+        if len(batch) == 0:
+            return []
+
+        expected = self.expected_points(self.probabilities(
+            batch.home_team_id, batch.away_team_id
+        ))
+        best: ndarray = argmax(expected.reshape(len(batch), -1), axis=1)
+        home_scores, away_scores = array_divmod(best, self.max_goals + 1)
+        return batch.to_bets(home_scores, away_scores)
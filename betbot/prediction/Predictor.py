@@ -19,10 +19,12 @@ LICENSE"""
 
 import os
 import logging
-from typing import List
-from betbot.api.ApiConnection import ApiConnection
+from typing import List, Optional, Sequence, Dict
+from numpy import ndarray
+from betbot.api.MatchdayApi import MatchdayApi
 from betbot.api.Match import Match
 from betbot.api.Bet import Bet
+from betbot.data.CycleContext import CycleContext
 
 
 class Predictor:
@@ -30,14 +32,26 @@ class Predictor:
     Class that specifies required methods for predictor objects
     """
 
-    def __init__(self, api: ApiConnection, league: str, season: int):
+    def __init__(
+            self,
+            api: Optional[MatchdayApi],
+            league: str,
+            season: int,
+            context: Optional[CycleContext] = None
+    ):
         """
         Initializes the model directory if it does not exist
-        :param api: The bundesliga-tippspiel API connection
+        :param api: The bundesliga-tippspiel API connection.
+                    None if the predictor does not use the API, for
+                    example while selecting a model
         :param league: The league for which to predict matches
         :param season: The season for which to predict matches
+        :param context: The data of the current bot cycle, shared with
+                        other predictors. If not provided, a new context
+                        is used by this predictor alone
         """
         self.api = api
+        self.context = context if context is not None else CycleContext()
         self.league = league
         self.season = season
         self.logger = logging.getLogger(self.__class__.__name__)
@@ -55,10 +69,21 @@ class Predictor:
         """
         raise NotImplementedError()
 
-    def predict(self, matches: List[Match]) -> List[Bet]:
+    def predict(self, matches: Sequence[Match]) -> List[Bet]:
         """
         Performs the prediction
         :param matches: The matches to predict
         :return: The predictions as Bet objects
         """
         raise NotImplementedError()
+
+    def fit_history(self, columns: Dict[str, ndarray]):
+        """
+        Fits the predictor to historical matches. This is used when
+        replaying past seasons, where only matches before the replayed
+        ones may be known. Predictors that do not learn from the match
+        history ignore this.
+        :param columns: The history columns of the matches to fit
+        :return: None
+        """
+        pass
@@ -18,17 +18,27 @@ along with betbot.  If not, see <http://www.gnu.org/licenses/>.
 LICENSE"""
 
 import os
-from typing import List, Tuple, Dict, Union, Optional, Any
+from copy import deepcopy
+from typing import List, Tuple, Dict, Union, Optional, Any, \
+    Sequence, Type
 
-from betbot.data.OddsPortal import OddsPortal
-from joblib import load, dump
-from numpy import ndarray, array, concatenate
+from numpy import ndarray, array, full, nan, isnan, rint, unique, \
+    column_stack, concatenate, isin, flatnonzero, clip
+from numpy.random import default_rng
+from scipy.sparse import csr_matrix, hstack as sparse_hstack
 from betbot.api.Bet import Bet
 from betbot.api.Match import Match
-from betbot.api.ApiConnection import ApiConnection
+from betbot.api.MatchBatch import MatchBatch
+from betbot.api.MatchdayApi import MatchdayApi
+from betbot.data.CycleContext import CycleContext
 from betbot.prediction.Predictor import Predictor
+from betbot.prediction.ModelRegistry import ModelRegistry
 from betbot.data.FootballDataCoUk import FootballDataUk
+from betbot.data.TeamRegistry import TeamRegistry
 from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.base import RegressorMixin
+from sklearn.linear_model import Ridge
+from sklearn.ensemble import RandomForestRegressor
 from sklearn.neural_network import MLPRegressor
 
 
@@ -39,92 +49,355 @@ class SKLearnPredictor(Predictor):
     should operate
     """
 
-    def __init__(self, api: ApiConnection, league: str, season: int):
+    REGRESSORS: Dict[str, Type[RegressorMixin]] = {
+        "MLPRegressor": MLPRegressor,
+        "Ridge": Ridge,
+        "RandomForestRegressor": RandomForestRegressor
+    }
+    """
+    The regressors that can be configured. They must accept sparse
+    input and predict multiple outputs.
+    """
+
+    max_goals = 10
+    """
+    The maximum amount of goals predicted for a team
+    """
+
+    uses_odds = True
+    """
+    Whether the model uses betting odds. Matches without odds are only
+    predicted if the odds are not used.
+    """
+
+    def __init__(
+            self,
+            api: Optional[MatchdayApi],
+            league: str,
+            season: int,
+            context: Optional[CycleContext] = None,
+            load_model: bool = True
+    ):
         """
         Initializes the scikit-learn model
         :param api: The bundesliga-tippspiel API connection
         :param league: The league for which to predict matches
         :param season: The season for which to predict matches
+        :param context: The data of the current bot cycle
+        :param load_model: Whether to retrieve the model from the model
+                           registry. If not, the predictor can only be
+                           used to build features, for example during
+                           model selection
         """
-        super().__init__(api, league, season)
-        self.__odds: \
-            Optional[Dict[Tuple[str, str], Tuple[float, float, float]]] = None
-        self.model_path = os.path.join(self.model_dir, self.name() + ".model")
+        super().__init__(api, league, season, context)
         self.history_path = os.path.join(self.model_dir, "history")
         self.fetcher = FootballDataUk(self.history_path)
+        self.teams = TeamRegistry.get()
+        self.team_matrix: Optional[csr_matrix] = None
+        self.registry = ModelRegistry.get()
         os.makedirs(self.history_path, exist_ok=True)
 
-        if not os.path.isfile(self.model_path):
-            self.model: Dict[str, Any] = {}
-            self.logger.info("Training model")
-            self.train()
-            dump(self.model, self.model_path)
-        else:
-            self.model = load(self.model_path)
+        self.model: Optional[Dict[str, Any]] = None
+        if load_model:
+            self.model = self.load_model()
+
+    def load_model(self) -> Optional[Dict[str, Any]]:
+        """
+        Retrieves the model from the model registry. Stale models are
+        refreshed in the background, but if no compatible model exists
+        yet, for example on a fresh install, this waits for the first
+        training, since no match could be predicted otherwise.
+        :return: The model or None if no model could be trained
+        """
+        def get_model() -> Optional[Dict[str, Any]]:
+            return self.registry.get_model(
+                self.name(),
+                self.feature_schema(),
+                self.fetcher.get_history_fingerprint(),
+                self.train,
+                legacy_path=os.path.join(
+                    self.model_dir, self.name() + ".model"
+                ),
+                update=self.update
+            )
+
+        model = get_model()
+        if model is None:
+            self.logger.info(f"Waiting for the first {self.name()} model")
+            self.registry.wait(self.name())
+            model = get_model()
+        return model
+
+    @classmethod
+    def feature_schema(cls) -> str:
+        """
+        Identifies the layout of the feature vectors. Models trained
+        with a different layout can not be used.
+        :return: The feature schema
+        """
+        return "teams,odds" if cls.uses_odds else "teams"
 
     @property
     def odds(self) -> Dict[Tuple[str, str], Tuple[float, float, float]]:
         """
-        Retrieves current odds using a mix of football-data.co.uk and
-        oddsportal.com
+        Retrieves the current odds merged from all odds sources
         :return: The odds for each match in the selected league
         """
-        if self.__odds is None:
-            self.__odds = self.fetcher.get_odds()
-            if len(self.__odds) < 9:
-                oddsportal = OddsPortal()
-                self.__odds.update(oddsportal.get_odds(self.league))
-        return self.__odds
+        return self.context.get_odds(self.league)
 
     @classmethod
-    def regressor(cls) -> MLPRegressor:
+    def regressor(cls) -> RegressorMixin:
         """
-        Defines the regressor used during the prediction process
+        Defines the regressor used during the prediction process.
+        Uses the configuration stored in the model registry, for example
+        by the model selection, if there is one.
         :return: The predictor
         """
-        return MLPRegressor(hidden_layer_sizes=(64,))
+        config = ModelRegistry.get().get_config(cls.name())
+        if config is None:
+            return MLPRegressor(hidden_layer_sizes=(64,))
+        return cls.create_regressor(config)
 
-    def train(self):
+    @classmethod
+    def create_regressor(cls, config: Dict[str, Any]) -> RegressorMixin:
         """
-        Trains the prediction model
+        Creates a regressor from a configuration
+        :param config: The name of the regressor in REGRESSORS and
+                       its parameters
+        :return: The regressor
+        """
+        regressor_cls = cls.REGRESSORS[config["regressor"]]
+        params = dict(config.get("params", {}))
+        if "hidden_layer_sizes" in params:
+            params["hidden_layer_sizes"] = tuple(params["hidden_layer_sizes"])
+        return regressor_cls(**params)
+
+    def train(self) -> Tuple[Dict[str, Any], str]:
+        """
+        Trains a new prediction model. The model currently in use
+        is not modified.
+        :return: The model and the fingerprint of the training data
         """
         self.fetcher.download_history()
-        matches = self.fetcher.get_history_matches()
+        fingerprint = self.fetcher.get_history_fingerprint()
+        columns = self.fetcher.get_history_columns()
+        return self.fit(columns), fingerprint
+
+    def fit(self, columns: Dict[str, ndarray]) -> Dict[str, Any]:
+        """
+        Trains a new prediction model on historical matches
+        :param columns: The history columns of the matches to train on
+        :return: The model
+        """
+        model: Dict[str, Any] = {
+            "team_vectorizer": self.fit_team_vectorizer(columns)
+        }
+        inputs, outputs = self.build_training_data(
+            columns, self.create_team_matrix(model)
+        )
+        regressor = self.regressor()
+        regressor.fit(inputs, outputs)
+        model["regressor"] = regressor
+        model["trained_keys"] = FootballDataUk.match_keys(columns)
+        return model
+
+    def fit_history(self, columns: Dict[str, ndarray]):
+        """
+        Replaces the model with one trained on the given matches only
+        :param columns: The history columns of the matches to train on
+        :return: None
+        """
+        self.model = self.fit(columns)
+        self.team_matrix = None
+
+    def update(
+            self,
+            model: Dict[str, Any],
+            replay_ratio: int = 4,
+            epochs: int = 10
+    ) -> Optional[Tuple[Dict[str, Any], str]]:
+        """
+        Incrementally updates a model with historical matches it was not
+        trained on yet, for example newly ingested results.
+        The new matches are mixed with a random sample of already known
+        matches (the replay buffer) to limit drift. The model itself is
+        not modified.
+        :param model: The model to update
+        :param replay_ratio: The amount of known matches replayed per
+                             new match
+        :param epochs: The amount of passes over the new data
+        :return: The updated model and the fingerprint of the data or
+                 None if the model can not be updated incrementally
+        """
+        if "trained_keys" not in model or \
+                not hasattr(model["regressor"], "partial_fit"):
+            return None
+
+        fingerprint = self.fetcher.get_history_fingerprint()
+        columns = self.fetcher.get_history_columns()
+        keys = FootballDataUk.match_keys(columns)
+        new = ~isin(keys, model["trained_keys"])
+        new_indexes = flatnonzero(new)
+        if len(new_indexes) == 0:
+            return model, fingerprint
+
+        team_matrix = self.create_team_matrix(model)
+        teams = concatenate((
+            columns["home_team"][new_indexes],
+            columns["away_team"][new_indexes]
+        )).astype(int)
+        if (team_matrix[teams].getnnz(axis=1) == 0).any():
+            self.logger.info("New teams require retraining the model")
+            return None
+
+        known_indexes = flatnonzero(~new)
+        replay_size = min(len(known_indexes), replay_ratio * len(new_indexes))
+        replay_indexes = default_rng().choice(
+            known_indexes, replay_size, replace=False
+        )
+        indexes = concatenate((new_indexes, replay_indexes))
+        inputs, outputs = self.build_training_data(
+            {name: column[indexes] for name, column in columns.items()},
+            team_matrix
+        )
+
+        regressor = deepcopy(model["regressor"])
+        for _ in range(epochs):
+            regressor.partial_fit(inputs, outputs)
+        updated = dict(model, regressor=regressor)
+        updated["trained_keys"] = concatenate((
+            model["trained_keys"], keys[new_indexes]
+        ))
+        self.logger.info(f"Updated model with {len(new_indexes)} matches")
+        return updated, fingerprint
+
+    def fit_team_vectorizer(self, columns: Dict[str, ndarray]) \
+            -> CountVectorizer:
+        """
+        Fits the team vectorizer on all teams of the historical matches
+        :param columns: The history columns
+        :return: The fitted team vectorizer
+        """
         team_vectorizer = CountVectorizer(binary=True)
         team_vectorizer.fit([
-            " ".join([x["home_team"] for x in matches]),
-            " ".join([x["away_team"] for x in matches])
+            " ".join([
+                self.teams.abbreviation(x)
+                for x in unique(columns["home_team"]).tolist()
+            ]),
+            " ".join([
+                self.teams.abbreviation(x)
+                for x in unique(columns["away_team"]).tolist()
+            ])
         ])
-        self.model["team_vectorizer"] = team_vectorizer
-
-        regressor = self.regressor()
+        return team_vectorizer
 
-        inputs = []
-        outputs = []
-        for match in matches:
-            inputs.append(self.vectorize(match))
-            outputs.append(
-                self.encode_result(match["home_score"], match["away_score"])
-            )
-        regressor.fit(array(inputs), array(outputs))
-        self.model["regressor"] = regressor
+    def build_training_data(
+            self,
+            columns: Dict[str, ndarray],
+            team_matrix: Optional[csr_matrix] = None
+    ) -> Tuple[csr_matrix, ndarray]:
+        """
+        Builds the input and output matrices for all historical matches
+        at once. Every row is identical to the vector generated by
+        vectorize and encode_result for the same match.
+        :param columns: The history columns
+        :param team_matrix: The team vectors to use.
+                            Defaults to those of the current model
+        :return: The inputs as a sparse matrix, the outputs
+        """
+        odds = column_stack((
+            columns["home_odds"], columns["draw_odds"], columns["away_odds"]
+        ))
+        inputs = self.vectorize_batch(
+            columns["home_team"].astype(int), columns["away_team"].astype(int),
+            odds, team_matrix
+        )
+        outputs = self.encode_batch(
+            columns["home_score"], columns["away_score"]
+        )
+        return inputs, outputs
 
-    def vectorize(self, match_data: Dict[str, Union[str, float]]) -> ndarray:
+    def vectorize(self, match_data: Dict[str, Union[str, float]]) \
+            -> csr_matrix:
         """
-        Defines how a match is vectorized
+        Defines how a single match is vectorized
         :param match_data: The match data to vectorize
-        :return: The vector for the match
-        """
-        team_vectorizer: CountVectorizer = self.model["team_vectorizer"]
-        home, away = team_vectorizer.transform([
-            match_data["home_team"], match_data["away_team"]
-        ]).toarray()
-        odds = array([
-            1 / float(match_data["home_odds"]),
-            1 / float(match_data["draw_odds"]),
-            1 / float(match_data["away_odds"]),
-        ])
-        return concatenate((home, away, odds))
+        :return: The vector for the match as a sparse row
+        """
+        odds = array([[
+            float(match_data.get("home_odds", nan)),
+            float(match_data.get("draw_odds", nan)),
+            float(match_data.get("away_odds", nan))
+        ]])
+        return self.vectorize_batch(
+            array([self.teams.register(str(match_data["home_team"]))]),
+            array([self.teams.register(str(match_data["away_team"]))]),
+            odds
+        )
+
+    def vectorize_batch(
+            self,
+            home_ids: ndarray,
+            away_ids: ndarray,
+            odds: ndarray,
+            team_matrix: Optional[csr_matrix] = None
+    ) -> csr_matrix:
+        """
+        Vectorizes many matches at once.
+        The one-hot team blocks stay sparse, only the odds block is dense.
+        :param home_ids: The team IDs of the home teams
+        :param away_ids: The team IDs of the away teams
+        :param odds: The odds (home, draw, away) of the matches, one row
+                     per match
+        :param team_matrix: The team vectors to use.
+                            Defaults to those of the current model
+        :return: The vectors for the matches as a sparse matrix,
+                 one row per match
+        """
+        if team_matrix is None:
+            team_matrix = self.get_team_matrix()
+        return sparse_hstack((
+            team_matrix[home_ids],
+            team_matrix[away_ids],
+            csr_matrix(1 / odds)
+        ), format="csr")
+
+    def encode_teams(self, home_team: str, away_team: str) \
+            -> Tuple[csr_matrix, csr_matrix]:
+        """
+        Encodes two teams as one-hot vectors using their team IDs
+        :param home_team: The abbreviation of the home team
+        :param away_team: The abbreviation of the away team
+        :return: The home team vector, the away team vector as sparse rows
+        """
+        home_id = self.teams.register(home_team)
+        away_id = self.teams.register(away_team)
+        team_matrix = self.get_team_matrix()
+        return team_matrix[home_id], team_matrix[away_id]
+
+    def get_team_matrix(self) -> csr_matrix:
+        """
+        Retrieves the one-hot vectors of all registered teams, indexed by
+        their team IDs.
+        The vectors are computed using the team vectorizer once, so they
+        are identical to the vectorizer's output.
+        :return: The team vectors as a sparse matrix, one row per team
+        """
+        if self.team_matrix is None or \
+                self.team_matrix.shape[0] < len(self.teams):
+            assert self.model is not None
+            self.team_matrix = self.create_team_matrix(self.model)
+        return self.team_matrix
+
+    def create_team_matrix(self, model: Dict[str, Any]) -> csr_matrix:
+        """
+        Vectorizes all registered teams using the team vectorizer
+        of a model
+        :param model: The model
+        :return: The team vectors as a sparse matrix, one row per team
+        """
+        team_vectorizer: CountVectorizer = model["team_vectorizer"]
+        return csr_matrix(team_vectorizer.transform(self.teams.abbreviations))
 
     def predict_match(self, match: Match) -> Optional[Tuple[int, int]]:
         """
@@ -133,26 +406,10 @@ class SKLearnPredictor(Predictor):
         :return: The home goals and away goals or None
                  if no prediction took place
         """
-        match_tuple = (match.home_team, match.away_team)
-        odds = self.odds.get(match_tuple)
-        if odds is None:
+        bets = self.predict([match])
+        if len(bets) == 0:
             return None
-
-        match_data: Dict[str, Union[str, float]] = {
-            "home_team": match.home_team,
-            "away_team": match.away_team,
-            "home_odds": float(odds[0]),
-            "draw_odds": float(odds[1]),
-            "away_odds": float(odds[2])
-        }
-        vector = array([self.vectorize(match_data)])
-        results = self.model["regressor"].predict(vector)[0]
-        home_score, away_score = results
-        min_score = min([home_score, away_score])
-        normer = round(min_score)
-        home_score = round(home_score - min_score + normer)
-        away_score = round(away_score - min_score + normer)
-        return home_score, away_score
+        return bets[0].home_score, bets[0].away_score
 
     # noinspection PyMethodMayBeStatic
     def encode_result(self, home_score: int, away_score: int) -> ndarray:
@@ -168,6 +425,19 @@ class SKLearnPredictor(Predictor):
         return array([encoded_home_score, encoded_away_score])
 
     # noinspection PyMethodMayBeStatic
+    def encode_batch(self, home_scores: ndarray, away_scores: ndarray) \
+            -> ndarray:
+        """
+        Encodes the results of many matches at once
+        :param home_scores: The home scores to encode
+        :param away_scores: The away scores to encode
+        :return: The encoded results, one row (home, away) per match
+        """
+        return column_stack((
+            1 / (home_scores.astype(float) + 1),
+            1 / (away_scores.astype(float) + 1)
+        ))
+
     def interpret_results(self, home_result: float, away_result: float) -> \
             Tuple[int, int]:
         """
@@ -176,24 +446,64 @@ class SKLearnPredictor(Predictor):
         :param away_result: The away goals result
         :return: The home goals, the away goals
         """
-        home_converted = (1 / home_result) - 1
-        away_converted = (1 / away_result) - 1
-        min_score = min([home_converted, away_converted])
-        normer = round(min_score)
-        home_score = round(home_converted - min_score + normer)
-        away_score = round(away_converted - min_score + normer)
+        home, away = self.interpret_batch(array([[home_result, away_result]]))
+        return int(home[0]), int(away[0])
+
+    @classmethod
+    def decode_batch(cls, results: ndarray) -> ndarray:
+        """
+        Reverses the encoding of encode_batch for raw regressor results.
+        Results outside of the range of encoded results are clipped to it,
+        so a result can not decode to fewer than 0 or more than max_goals
+        goals.
+        :param results: The raw results, one row (home, away) per match
+        :return: The unrounded goals, one row (home, away) per match
+        """
+        return (1 / clip(results, 1 / (cls.max_goals + 1), 1)) - 1
+
+    @classmethod
+    def interpret_batch(cls, results: ndarray) -> Tuple[ndarray, ndarray]:
+        """
+        Interprets the raw results of many matches at once
+        :param results: The raw results, one row (home, away) per match
+        :return: The home goals, the away goals
+        """
+        converted = cls.decode_batch(results)
+        min_score = converted.min(axis=1)
+        normer = rint(min_score)
+        home_score = rint(converted[:, 0] - min_score + normer).astype(int)
+        away_score = rint(converted[:, 1] - min_score + normer).astype(int)
         return home_score, away_score
 
-    def predict(self, matches: List[Match]) -> List[Bet]:
+    def predict(self, matches: Sequence[Match]) -> List[Bet]:
         """
         Performs the prediction
+        All matches are vectorized into a single matrix and predicted
+        using one call to the regressor.
         :param matches: The matches to predict
         :return: The predictions as Bet objects
         """
-        bets = []
-        for match in matches:
-            prediction = self.predict_match(match)
-            if prediction is not None:
-                home_goals, away_goals = prediction
-                bets.append(Bet(match, home_goals, away_goals))
-        return bets
+        if self.model is None:
+            self.logger.warning("No model available yet, skipping")
+            return []
+
+        batch = MatchBatch.from_matches(matches)
+        odds = full((len(batch), 3), nan)
+        if self.uses_odds:
+            known_odds = self.odds
+            for i, match in enumerate(matches):
+                match_odds = known_odds.get((match.home_team, match.away_team))
+                if match_odds is not None:
+                    odds[i] = match_odds
+            known = ~isnan(odds).any(axis=1)
+            batch = batch.select(known)
+            odds = odds[known]
+        if len(batch) == 0:
+            return []
+
+        vectors = self.vectorize_batch(
+            batch.home_team_id, batch.away_team_id, odds
+        )
+        results = self.model["regressor"].predict(vectors)
+        home_scores, away_scores = self.interpret_batch(results)
+        return batch.to_bets(home_scores, away_scores)
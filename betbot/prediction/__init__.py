@@ -26,6 +26,7 @@ from betbot.prediction.LeagueTablePredictor import LeagueTablePredictor
 from betbot.prediction.HomeTeamPredictor import HomeTeamPredictor
 from betbot.prediction.NamePredictor import NamePredictor
 from betbot.prediction.NameAndOddsPredictor import NameAndOddsPredictor
+from betbot.prediction.PoissonPredictor import PoissonPredictor
 
 predictors: List[Type[Predictor]] = [
     DrawPredictor,
@@ -34,5 +35,6 @@ predictors: List[Type[Predictor]] = [
     LeagueTablePredictor,
     HomeTeamPredictor,
     NameAndOddsPredictor,
-    NamePredictor
+    NamePredictor,
+    PoissonPredictor
 ]
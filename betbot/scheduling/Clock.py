@@ -0,0 +1,58 @@
+"""LICENSE
+Copyright 2020 Hermann Krumrey <hermann@krumreyh.com>
+
+This file is part of betbot.
+
+betbot is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+betbot is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with betbot.  If not, see <http://www.gnu.org/licenses/>.
+LICENSE"""
+
+import time
+import asyncio
+from datetime import datetime, timezone
+
+
+class Clock:
+    """
+    Class that provides the current time and the means to wait.
+    Can be replaced with a simulated clock to run schedules without
+    actually waiting.
+    """
+
+    def now(self) -> datetime:
+        """
+        :return: The current wall-clock time in UTC
+        """
+        return datetime.now(timezone.utc)
+
+    def monotonic(self) -> float:
+        """
+        :return: The value of a monotonic clock in seconds
+        """
+        return time.monotonic()
+
+    def sleep(self, seconds: float):
+        """
+        Blocks for a number of seconds
+        :param seconds: The amount of seconds to sleep
+        :return: None
+        """
+        time.sleep(seconds)
+
+    async def async_sleep(self, seconds: float):
+        """
+        Suspends the current coroutine for a number of seconds
+        :param seconds: The amount of seconds to sleep
+        :return: None
+        """
+        await asyncio.sleep(seconds)
@@ -0,0 +1,112 @@
+"""LICENSE
+Copyright 2020 Hermann Krumrey <hermann@krumreyh.com>
+
+This file is part of betbot.
+
+betbot is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+betbot is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with betbot.  If not, see <http://www.gnu.org/licenses/>.
+LICENSE"""
+
+import logging
+from typing import Iterable, Optional
+from datetime import timedelta
+from betbot.api.Match import Match
+from betbot.scheduling.Clock import Clock
+
+
+class Scheduler:
+    """
+    Class that decides when the next bot cycle should run, based on the
+    kickoff times of the open matches. Polls rarely while the next
+    betting deadline is far away and more often as it approaches.
+    """
+
+    def __init__(
+            self,
+            clock: Optional[Clock] = None,
+            min_interval: float = 5 * 60,
+            max_interval: float = 12 * 60 * 60,
+            idle_interval: float = 24 * 60 * 60,
+            deadline_margin: float = 2 * 60,
+            approach_factor: float = 0.5
+    ):
+        """
+        Initializes the scheduler
+        :param clock: The clock to use. Defaults to the system clock
+        :param min_interval: The minimum time between two cycles in seconds
+        :param max_interval: The maximum time between two cycles in seconds
+                             while there are open matches
+        :param idle_interval: The time between two cycles in seconds
+                              while no matches are open for betting
+        :param deadline_margin: The final cycle before a betting deadline
+                                runs this many seconds before kickoff
+        :param approach_factor: The fraction of the remaining time until
+                                the next deadline that is slept
+        """
+        self.logger = logging.getLogger(__name__)
+        self.clock = clock if clock is not None else Clock()
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.idle_interval = idle_interval
+        self.deadline_margin = deadline_margin
+        self.approach_factor = approach_factor
+
+    def next_delay(self, matches: Iterable[Match]) -> float:
+        """
+        Calculates how long to wait until the next cycle
+        :param matches: The matches of the current cycle
+        :return: The delay in seconds
+        """
+        now = self.clock.now()
+        margin = timedelta(seconds=self.deadline_margin)
+        deadlines = [
+            match.kickoff - margin
+            for match in matches
+            if match.kickoff is not None
+            and not match.finished
+            and match.kickoff - margin > now
+        ]
+        if len(deadlines) == 0:
+            return self.idle_interval
+
+        remaining = (min(deadlines) - now).total_seconds()
+        delay = remaining * self.approach_factor
+        delay = max(self.min_interval, min(self.max_interval, delay))
+        return min(delay, remaining)
+
+    def wait(self, delay: float):
+        """
+        Blocks until the delay has passed on the monotonic clock
+        :param delay: The delay in seconds
+        :return: None
+        """
+        self.logger.info(f"Next cycle in {int(delay)} seconds")
+        deadline = self.clock.monotonic() + delay
+        remaining = delay
+        while remaining > 0:
+            self.clock.sleep(remaining)
+            remaining = deadline - self.clock.monotonic()
+
+    async def async_wait(self, delay: float):
+        """
+        Suspends the current coroutine until the delay has passed on the
+        monotonic clock
+        :param delay: The delay in seconds
+        :return: None
+        """
+        self.logger.info(f"Next cycle in {int(delay)} seconds")
+        deadline = self.clock.monotonic() + delay
+        remaining = delay
+        while remaining > 0:
+            await self.clock.async_sleep(remaining)
+            remaining = deadline - self.clock.monotonic()
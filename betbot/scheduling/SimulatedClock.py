@@ -0,0 +1,77 @@
+"""LICENSE
+Copyright 2020 Hermann Krumrey <hermann@krumreyh.com>
+
+This file is part of betbot.
+
+betbot is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+betbot is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with betbot.  If not, see <http://www.gnu.org/licenses/>.
+LICENSE"""
+
+import asyncio
+from typing import List
+from datetime import datetime, timedelta
+from betbot.scheduling.Clock import Clock
+
+
+class SimulatedClock(Clock):
+    """
+    Clock whose time only advances when it is slept on.
+    Used to test schedules without waiting in real time.
+    """
+
+    def __init__(self, start: datetime):
+        """
+        Initializes the clock
+        :param start: The wall-clock time at which the simulation starts
+        """
+        self.start = start
+        self.elapsed = 0.0
+        self.sleeps: List[float] = []
+
+    def now(self) -> datetime:
+        """
+        :return: The simulated wall-clock time
+        """
+        return self.start + timedelta(seconds=self.elapsed)
+
+    def monotonic(self) -> float:
+        """
+        :return: The seconds elapsed since the start of the simulation
+        """
+        return self.elapsed
+
+    def advance(self, seconds: float):
+        """
+        Advances the clock without recording a sleep
+        :param seconds: The amount of seconds to advance
+        :return: None
+        """
+        self.elapsed += seconds
+
+    def sleep(self, seconds: float):
+        """
+        Advances the clock instantly and records the sleep
+        :param seconds: The amount of seconds to sleep
+        :return: None
+        """
+        self.sleeps.append(seconds)
+        self.advance(seconds)
+
+    async def async_sleep(self, seconds: float):
+        """
+        Advances the clock instantly and yields to the event loop
+        :param seconds: The amount of seconds to sleep
+        :return: None
+        """
+        self.sleep(seconds)
+        await asyncio.sleep(0)
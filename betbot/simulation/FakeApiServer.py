@@ -0,0 +1,304 @@
+"""LICENSE
+Copyright 2020 Hermann Krumrey <hermann@krumreyh.com>
+
+This file is part of betbot.
+
+betbot is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+betbot is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with betbot.  If not, see <http://www.gnu.org/licenses/>.
+LICENSE"""
+
+import json
+import time
+import random
+import logging
+from uuid import uuid4
+from threading import Thread, Lock
+from base64 import b64decode
+from datetime import datetime, timedelta, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Any, List, Tuple, Optional, Type
+from betbot.data.TeamRegistry import TeamRegistry
+
+
+class FakeApiServer:
+    """
+    Local stand-in for the v3 API of a bundesliga-tippspiel instance.
+    Implements the endpoints used by the bot and allows injecting latency
+    and server errors. Counts the requests it receives per endpoint.
+    """
+
+    def __init__(
+            self,
+            host: str = "127.0.0.1",
+            port: int = 0,
+            latency: float = 0.0,
+            jitter: float = 0.0,
+            error_rate: float = 0.0,
+            leagues: Optional[List[Tuple[str, int]]] = None,
+            key_lifetime: float = 60 * 60
+    ):
+        """
+        Initializes the server. The server is not started yet.
+        :param host: The host to listen on
+        :param port: The port to listen on. 0 picks a free port
+        :param latency: The delay of every response in seconds
+        :param jitter: Additional random delay of up to this many seconds
+        :param error_rate: The probability of answering with HTTP 500
+        :param leagues: The active leagues and seasons
+        :param key_lifetime: The lifetime of issued API keys in seconds
+        """
+        self.logger = logging.getLogger(__name__)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.leagues = leagues if leagues is not None \
+            else [("bl1", 2020), ("bl2", 2020)]
+        self.key_lifetime = key_lifetime
+        self.lock = Lock()
+        self.api_keys: Dict[str, Tuple[str, float]] = {}
+        self.bets: Dict[Tuple[str, ...], Tuple[int, int]] = {}
+        self.request_counts: Dict[str, int] = {}
+        self.teams = self.generate_teams()
+        self.server = ThreadingHTTPServer((host, port), self.create_handler())
+        self.thread: Optional[Thread] = None
+
+    @property
+    def url(self) -> str:
+        """
+        :return: The base URL of the server
+        """
+        host, port = self.server.server_address[:2]
+        if isinstance(host, bytes):
+            host = host.decode()
+        return f"http://{host}:{port}"
+
+    @property
+    def total_requests(self) -> int:
+        """
+        :return: The total amount of requests received
+        """
+        with self.lock:
+            return sum(self.request_counts.values())
+
+    def reset_counts(self):
+        """
+        Resets the request counters
+        :return: None
+        """
+        with self.lock:
+            self.request_counts = {}
+
+    def start(self):
+        """
+        Starts serving in a background thread
+        :return: None
+        """
+        self.thread = Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.logger.info(f"Serving fake API on {self.url}")
+
+    def stop(self):
+        """
+        Stops the server
+        :return: None
+        """
+        self.server.shutdown()
+        self.server.server_close()
+        if self.thread is not None:
+            self.thread.join()
+
+    def generate_teams(self) -> Dict[str, List[str]]:
+        """
+        Assigns 18 teams to every league
+        :return: The team abbreviations of each league
+        """
+        abbreviations = list(TeamRegistry.TEAMS)
+        teams = {}
+        for i, (league, _) in enumerate(self.leagues):
+            offset = (i * 18) % len(abbreviations)
+            rotated = abbreviations[offset:] + abbreviations[:offset]
+            teams[league] = rotated[:18]
+        return teams
+
+    def handle(
+            self,
+            method: str,
+            path: str,
+            headers: Dict[str, str],
+            body: Dict[str, Any]
+    ) -> Tuple[int, Dict[str, Any]]:
+        """
+        Handles an API request
+        :param method: The request method
+        :param path: The request path
+        :param headers: The request headers
+        :param body: The request's JSON body
+        :return: The HTTP status code and the response JSON
+        """
+        endpoint = path.split("/api/v3/", 1)[-1].strip("/")
+        name = endpoint.split("/")[0]
+        with self.lock:
+            key = f"{method} {name}"
+            self.request_counts[key] = self.request_counts.get(key, 0) + 1
+
+        time.sleep(self.latency + random.uniform(0, self.jitter))
+        if random.random() < self.error_rate:
+            return 500, {"status": "error", "reason": "Injected error"}
+
+        if name == "key" and method == "POST":
+            return self.create_key(body)
+        elif name == "key" and method == "DELETE":
+            with self.lock:
+                self.api_keys.pop(str(body.get("api_key", "")), None)
+            return 200, {"status": "ok", "data": {}}
+
+        username = self.authenticate(headers)
+        if username is None:
+            return 401, {"status": "error", "reason": "Unauthorized"}
+
+        if name == "authorize" and method == "GET":
+            return 200, {"status": "ok", "data": {}}
+        elif name == "leagues" and method == "GET":
+            leagues = [list(x) for x in self.leagues]
+            return 200, {"status": "ok", "data": {"leagues": leagues}}
+        elif name == "league_table" and method == "GET":
+            league = self.find_league(endpoint.split("/")[1:])
+            if league is None:
+                return 404, {"status": "error", "reason": "Unknown league"}
+            table = [
+                [i + 1, {"abbreviation": team}]
+                for i, team in enumerate(self.teams[league])
+            ]
+            return 200, {"status": "ok", "data": {"league_table": table}}
+        elif name == "matchday" and method == "GET":
+            league, season = endpoint.split("/")[1:3]
+            matches = self.generate_matches(league, int(season))
+            return 200, {"status": "ok", "data": {"matches": matches}}
+        elif name == "place_bets" and method == "PUT":
+            placed = []
+            with self.lock:
+                for bet in body.get("bets", []):
+                    bet_key = (username, bet["league"], str(bet["season"]),
+                               str(bet["matchday"]), bet["home_team"],
+                               bet["away_team"])
+                    self.bets[bet_key] = \
+                        (bet["home_score"], bet["away_score"])
+                    placed.append(bet)
+            return 200, {"status": "ok", "data": {"placed": placed}}
+        else:
+            return 404, {"status": "error", "reason": "Not found"}
+
+    def create_key(self, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        """
+        Issues a new API key. Every username/password combination is valid.
+        :param body: The request body containing the credentials
+        :return: The HTTP status code and the response JSON
+        """
+        username = body.get("username")
+        if not username or not body.get("password"):
+            return 401, {"status": "error", "reason": "Invalid credentials"}
+        api_key = uuid4().hex
+        expiration = time.time() + self.key_lifetime
+        with self.lock:
+            self.api_keys[api_key] = (str(username), expiration)
+        return 200, {
+            "status": "ok",
+            "data": {"api_key": api_key, "expiration": int(expiration)}
+        }
+
+    def authenticate(self, headers: Dict[str, str]) -> Optional[str]:
+        """
+        Checks the API key in the authorization header
+        :param headers: The request headers
+        :return: The user the key belongs to or None if the key is invalid
+        """
+        auth = headers.get("Authorization", "")
+        if not auth.startswith("Basic "):
+            return None
+        try:
+            api_key = b64decode(auth.split(" ", 1)[1]).decode("utf-8")
+        except ValueError:
+            return None
+        with self.lock:
+            username, expiration = self.api_keys.get(api_key, ("", 0.0))
+        if time.time() > expiration:
+            return None
+        return username
+
+    def find_league(self, parts: List[str]) -> Optional[str]:
+        """
+        Finds the league name in the parts of an endpoint path
+        :param parts: The path parts
+        :return: The league or None if no league matches
+        """
+        for part in parts:
+            if part in self.teams:
+                return part
+        return None
+
+    def generate_matches(self, league: str, season: int) \
+            -> List[Dict[str, Any]]:
+        """
+        Generates the matches of the current matchday of a league
+        :param league: The league
+        :param season: The season
+        :return: The match JSON data
+        """
+        teams = self.teams.get(league, [])
+        kickoff = datetime.now(timezone.utc) + timedelta(days=2)
+        return [
+            {
+                "league": league,
+                "season": season,
+                "matchday": 1,
+                "home_team_abbreviation": teams[i],
+                "away_team_abbreviation": teams[i + 1],
+                "finished": False,
+                "kickoff": kickoff.strftime("%Y-%m-%d:%H-%M-%S")
+            }
+            for i in range(0, len(teams) - 1, 2)
+        ]
+
+    def create_handler(self) -> Type[BaseHTTPRequestHandler]:
+        """
+        Creates the request handler class that forwards to this server
+        :return: The request handler class
+        """
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def respond(self):
+                length = int(self.headers.get("Content-Length", 0))
+                raw = self.rfile.read(length) if length > 0 else b""
+                try:
+                    body = json.loads(raw) if raw else {}
+                except ValueError:
+                    body = {}
+                status, data = server.handle(
+                    self.command, self.path, dict(self.headers), body
+                )
+                encoded = json.dumps(data).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(encoded)))
+                self.end_headers()
+                self.wfile.write(encoded)
+
+            do_GET = do_POST = do_PUT = do_DELETE = respond
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
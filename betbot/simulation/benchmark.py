@@ -0,0 +1,135 @@
+"""LICENSE
+Copyright 2020 Hermann Krumrey <hermann@krumreyh.com>
+
+This file is part of betbot.
+
+betbot is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+betbot is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with betbot.  If not, see <http://www.gnu.org/licenses/>.
+LICENSE"""
+
+import os
+import time
+import asyncio
+import tempfile
+from typing import List, Dict, Union, Optional
+from betbot.api.BetLedger import BetLedger
+from betbot.main import multi_main, async_multi_main
+from betbot.data.HistoryIngester import HistoryIngester
+from betbot.prediction.ModelRegistry import ModelRegistry
+from betbot.simulation.FakeApiServer import FakeApiServer
+
+
+def run_benchmark(
+        accounts: int,
+        predictor_name: str = "home-team",
+        modes: Optional[List[str]] = None,
+        cycles: int = 2,
+        concurrency: int = 8,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0
+) -> List[Dict[str, Union[str, int, float]]]:
+    """
+    Runs bot cycles for simulated accounts against a local fake API server.
+    The ledger, match history and models are stored in a temporary
+    directory, so the benchmark does not touch the bot's data.
+    :param accounts: The amount of simulated accounts
+    :param predictor_name: The predictor used by every account
+    :param modes: The runners to benchmark (sequential and/or async).
+                  Defaults to both
+    :param cycles: The amount of cycles to run per runner
+    :param concurrency: The concurrency limit of the async runner
+    :param latency: The response latency of the server in seconds
+    :param jitter: The additional random latency of the server in seconds
+    :param error_rate: The probability of server errors
+    :return: The measurements of every cycle
+    """
+    if modes is None:
+        modes = ["sequential", "async"]
+    config = [
+        (predictor_name, f"user{i}", "password") for i in range(accounts)
+    ]
+    results: List[Dict[str, Union[str, int, float]]] = []
+
+    for mode in modes:
+        server = FakeApiServer(
+            latency=latency, jitter=jitter, error_rate=error_rate
+        )
+        server.start()
+        model_registry = ModelRegistry.instance
+        with tempfile.TemporaryDirectory() as tempdir:
+            registry = ModelRegistry(os.path.join(tempdir, "models"))
+            ModelRegistry.instance = registry
+            data_path = os.path.join(tempdir, "history")
+            ledger = BetLedger(os.path.join(tempdir, "ledger.db"))
+            ingester = HistoryIngester(data_path)
+            try:
+                for cycle in range(cycles):
+                    server.reset_counts()
+                    start = time.monotonic()
+                    if mode == "async":
+                        asyncio.run(async_multi_main(
+                            server.url,
+                            config,
+                            False,
+                            concurrency,
+                            ledger=ledger,
+                            ingester=ingester,
+                            data_path=data_path
+                        ))
+                    else:
+                        multi_main(
+                            server.url,
+                            config,
+                            False,
+                            ledger=ledger,
+                            ingester=ingester,
+                            data_path=data_path
+                        )
+                    duration = time.monotonic() - start
+                    requests = server.total_requests
+                    results.append({
+                        "mode": mode,
+                        "cycle": cycle + 1,
+                        "accounts": accounts,
+                        "requests": requests,
+                        "requests_per_account": requests / max(accounts, 1),
+                        "seconds": duration,
+                        "accounts_per_second": accounts / duration
+                    })
+            finally:
+                registry.wait()
+                ModelRegistry.instance = model_registry
+        server.stop()
+
+    return results
+
+
+def format_results(results: List[Dict[str, Union[str, int, float]]]) -> str:
+    """
+    Formats benchmark results as a table
+    :param results: The results to format
+    :return: The formatted table
+    """
+    header = f"{'mode':<12}{'cycle':>6}{'accounts':>10}{'requests':>10}" \
+             f"{'req/acc':>9}{'seconds':>10}{'acc/s':>9}"
+    lines = [header, "-" * len(header)]
+    for result in results:
+        lines.append(
+            f"{result['mode']:<12}{result['cycle']:>6}"
+            f"{result['accounts']:>10}{result['requests']:>10}"
+            f"{result['requests_per_account']:>9.2f}"
+            f"{result['seconds']:>10.3f}"
+            f"{result['accounts_per_second']:>9.2f}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,108 @@
+"""LICENSE
+Copyright 2020 Hermann Krumrey <hermann@krumreyh.com>
+
+This file is part of betbot.
+
+betbot is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+betbot is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with betbot.  If not, see <http://www.gnu.org/licenses/>.
+LICENSE"""
+
+import os
+import tempfile
+from unittest import TestCase
+from betbot.data.TeamRegistry import TeamRegistry
+from betbot.data.FootballDataCoUk import FootballDataUk
+from betbot.evaluation.Backtester import Backtester
+from betbot.evaluation.BacktestApi import BacktestApi
+from betbot.prediction.HomeTeamPredictor import HomeTeamPredictor
+
+HISTORY = """Div,Date,HomeTeam,AwayTeam,FTHG,FTAG,WHH,WHD,WHA
+D1,10/08/2019,FCB,BVB,2,1,1.5,4.0,6.0
+D1,10/08/2019,S04,M05,1,0,2.5,3.2,2.8
+D1,17/08/2019,BVB,S04,1,3,1.8,3.6,4.2
+D1,24/08/2019,FCB,S04,2,1,1.3,5.0,9.0
+D1,24/08/2019,BVB,M05,1,0,1.6,4.0,5.5
+D1,20/09/2019,M05,FCB,0,2,7.0,4.5,1.4
+"""
+"""
+A football-data.co.uk file of a short season. The match between M05
+and FCB was rescheduled.
+"""
+
+
+class TestBacktester(TestCase):
+    """
+    Tests replaying past seasons
+    """
+
+    def setUp(self):
+        """
+        Stores the history file in a temporary directory and loads it
+        using a separate team registry
+        :return: None
+        """
+        self.registry = TeamRegistry.instance
+        TeamRegistry.instance = TeamRegistry(None, fuzzy=False)
+        self.teams = TeamRegistry.get()
+        self.tempdir = tempfile.TemporaryDirectory()
+        with open(os.path.join(self.tempdir.name, "D1-1920.csv"), "w") as f:
+            f.write(HISTORY)
+        self.columns = \
+            FootballDataUk(self.tempdir.name).get_history_columns()
+
+    def tearDown(self):
+        """
+        Restores the process-wide team registry and removes the
+        temporary directory
+        :return: None
+        """
+        TeamRegistry.instance = self.registry
+        self.tempdir.cleanup()
+
+    def test_split_matchdays(self):
+        """
+        Tests that matches are grouped into matchdays in order and that
+        rescheduled matches belong to the matchday they were played on
+        :return: None
+        """
+        matchdays = Backtester.split_matchdays(self.columns)
+        self.assertEqual(
+            [sorted(x.tolist()) for x in matchdays],
+            [[0, 1], [2], [3, 4], [5]]
+        )
+
+    def test_league_table(self):
+        """
+        Tests that the league table only contains earlier results
+        :return: None
+        """
+        api = BacktestApi(self.columns)
+        api.cutoff = self.columns["date"][2]
+        self.assertEqual(
+            api.get_league_table("bl1", 2019), ["FCB", "S04", "BVB", "M05"]
+        )
+        api.cutoff = self.columns["date"][3]
+        self.assertEqual(
+            api.get_league_table("bl1", 2019), ["S04", "FCB", "M05", "BVB"]
+        )
+
+    def test_replay(self):
+        """
+        Tests that every match of a season is bet on and scored
+        :return: None
+        """
+        points, matches, _ = Backtester.replay(
+            HomeTeamPredictor, 2019, self.tempdir.name, False
+        )
+        self.assertEqual(matches, 6)
+        self.assertEqual(points, 18 + 12 + 0 + 18 + 12 + 0)
@@ -0,0 +1,125 @@
+"""LICENSE
+Copyright 2020 Hermann Krumrey <hermann@krumreyh.com>
+
+This file is part of betbot.
+
+betbot is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+betbot is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with betbot.  If not, see <http://www.gnu.org/licenses/>.
+LICENSE"""
+
+import os
+import tempfile
+from typing import List
+from unittest import TestCase
+from betbot.api.Bet import Bet
+from betbot.api.Match import Match
+from betbot.api.BetLedger import BetLedger
+from betbot.api.ApiConnectionBase import ApiConnectionBase
+
+
+class TestBetLedger(TestCase):
+    """
+    Tests recording placed bets so that only changed bets are submitted
+    """
+
+    def setUp(self):
+        """
+        Creates a ledger in a temporary directory
+        :return: None
+        """
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tempdir.name, "ledger.db")
+        self.ledger = BetLedger(self.path)
+        self.api = ApiConnectionBase(
+            "user", "password", "http://localhost", ledger=self.ledger
+        )
+        self.matches = [
+            Match("bl1", 2020, 1, "FCB", "S04", False),
+            Match("bl1", 2020, 1, "BVB", "BMG", False)
+        ]
+
+    def tearDown(self):
+        """
+        Closes the ledger and removes the temporary directory
+        :return: None
+        """
+        self.ledger.connection.close()
+        self.tempdir.cleanup()
+
+    def bets(self, home_score: int) -> List[Bet]:
+        """
+        Creates bets on every match
+        :param home_score: The home score of the bets
+        :return: The bets
+        """
+        return [Bet(match, home_score, 0) for match in self.matches]
+
+    def test_changed_bets(self):
+        """
+        Tests that only new bets and bets with a different score are
+        considered changed, separately for every user
+        :return: None
+        """
+        bets = self.bets(2)
+        self.assertEqual(self.ledger.get_changed("user", bets), bets)
+        self.ledger.record("user", bets[:1])
+        self.assertEqual(self.ledger.get_changed("user", bets), bets[1:])
+        self.assertEqual(self.ledger.get_changed("other", bets), bets)
+
+        changed = self.bets(3)
+        self.assertEqual(self.ledger.get_changed("user", changed), changed)
+        self.ledger.record("user", changed)
+        self.assertEqual(self.ledger.get_changed("user", changed), [])
+
+    def test_persistence(self):
+        """
+        Tests that recorded bets are loaded from the database file
+        :return: None
+        """
+        bets = self.bets(2)
+        self.ledger.record("user", bets)
+        reloaded = BetLedger(self.path)
+        self.assertEqual(reloaded.get_changed("user", bets), [])
+        reloaded.connection.close()
+
+    def test_record_placed(self):
+        """
+        Tests that only the bets reported as placed by the server are
+        recorded
+        :return: None
+        """
+        bets = self.bets(2)
+        self.api.record_bets(bets, {
+            "status": "ok", "data": {"placed": [bets[1].to_dict()]}
+        })
+        self.assertEqual(self.ledger.get_changed("user", bets), bets[:1])
+
+        self.api.record_bets(bets, {"status": "error"})
+        self.assertEqual(self.ledger.get_changed("user", bets), bets[:1])
+
+    def test_record_unknown_format(self):
+        """
+        Tests that the submitted bets are only recorded if the server
+        reports all of them as placed in an unknown format
+        :return: None
+        """
+        bets = self.bets(2)
+        self.api.record_bets(bets, {
+            "status": "ok", "data": {"placed": [{"id": 1}]}
+        })
+        self.assertEqual(self.ledger.get_changed("user", bets), bets)
+
+        self.api.record_bets(bets, {
+            "status": "ok", "data": {"placed": [1, 2]}
+        })
+        self.assertEqual(self.ledger.get_changed("user", bets), [])
@@ -0,0 +1,163 @@
+"""LICENSE
+Copyright 2020 Hermann Krumrey <hermann@krumreyh.com>
+
+This file is part of betbot.
+
+betbot is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+betbot is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with betbot.  If not, see <http://www.gnu.org/licenses/>.
+LICENSE"""
+
+import time
+from threading import Lock, Thread
+from unittest import TestCase
+from typing import List, Tuple, Dict
+from betbot.api.Match import Match
+from betbot.data.CycleContext import CycleContext
+from betbot.data.OddsAggregator import OddsAggregator, Odds
+
+LEAGUES = [("bl1", 2020), ("bl2", 2020)]
+"""
+The active leagues of the fake API
+"""
+
+
+class FakeApi:
+    """
+    API that counts how often each endpoint is called
+    """
+
+    def __init__(self):
+        """
+        Initializes the call counters
+        :return: None
+        """
+        self.lock = Lock()
+        self.calls: Dict[str, int] = {}
+
+    def count(self, endpoint: str):
+        """
+        Counts a call
+        :param endpoint: The called endpoint
+        :return: None
+        """
+        with self.lock:
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+
+    def get_active_leagues(self) -> List[Tuple[str, int]]:
+        """
+        :return: The active leagues
+        """
+        self.count("leagues")
+        return list(LEAGUES)
+
+    def get_league_table(self, league: str, season: int) -> List[str]:
+        """
+        :param league: The league
+        :param season: The season
+        :return: The league table
+        """
+        self.count(f"table/{league}")
+        return ["FCB", "S04"]
+
+    def get_current_matchday_matches(self, league: str, season: int) \
+            -> List[Match]:
+        """
+        :param league: The league
+        :param season: The season
+        :return: The matches of the matchday
+        """
+        self.count(f"matches/{league}")
+        return [Match(league, season, 1, "FCB", "S04", False)]
+
+
+class TestCycleContext(TestCase):
+    """
+    Tests that the data of a bot cycle is fetched once and shared by all
+    accounts
+    """
+
+    def setUp(self):
+        """
+        Creates a context whose only odds source is slow and counts its
+        queries
+        :return: None
+        """
+        self.api = FakeApi()
+        self.lock = Lock()
+        self.queries: Dict[str, int] = {}
+        self.context = CycleContext("", OddsAggregator(
+            "", sources={"slow": self.source}
+        ))
+
+    def source(self, league: str) -> Tuple[Odds, float]:
+        """
+        Odds source that takes 0.3 seconds per query
+        :param league: The league for which to retrieve odds
+        :return: The odds and when they were fetched
+        """
+        with self.lock:
+            self.queries[league] = self.queries.get(league, 0) + 1
+        time.sleep(0.3)
+        return {("FCB", "S04"): (1.5, 4.0, 6.0)}, time.time()
+
+    def account(self):
+        """
+        Simulates the cycle of a single account
+        :return: None
+        """
+        for league, season in self.context.get_active_leagues(self.api):
+            self.context.get_matches(self.api, league, season)
+            self.context.get_league_table(self.api, league, season)
+            self.context.get_odds(league)
+
+    def test_shared_fetches(self):
+        """
+        Tests that two accounts running concurrently trigger exactly one
+        fetch per league and endpoint
+        :return: None
+        """
+        threads = [Thread(target=self.account) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.api.calls, {
+            "leagues": 1,
+            "matches/bl1": 1, "table/bl1": 1,
+            "matches/bl2": 1, "table/bl2": 1
+        })
+        self.assertEqual(self.queries, {"bl1": 1, "bl2": 1})
+        self.assertEqual(
+            self.context.get_all_odds(),
+            {league: {("FCB", "S04"): (1.5, 4.0, 6.0)}
+             for league, _ in LEAGUES}
+        )
+
+    def test_concurrent_leagues(self):
+        """
+        Tests that odds of different leagues are fetched concurrently
+        while every league is only fetched once
+        :return: None
+        """
+        threads = [
+            Thread(target=self.context.get_odds, args=(league,))
+            for league, _ in LEAGUES for _ in range(2)
+        ]
+        start = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertLess(time.monotonic() - start, 0.55)
+        self.assertEqual(self.queries, {"bl1": 1, "bl2": 1})
@@ -0,0 +1,129 @@
+"""LICENSE
+Copyright 2020 Hermann Krumrey <hermann@krumreyh.com>
+
+This file is part of betbot.
+
+betbot is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+betbot is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with betbot.  If not, see <http://www.gnu.org/licenses/>.
+LICENSE"""
+
+import os
+import tempfile
+import requests
+from unittest import TestCase
+from unittest.mock import patch
+from betbot.api.Bet import Bet
+from betbot.data.TeamRegistry import TeamRegistry
+from betbot.api.ApiConnection import ApiConnection
+from betbot.simulation.FakeApiServer import FakeApiServer
+from betbot.simulation.benchmark import run_benchmark
+
+
+class TestFakeApi(TestCase):
+    """
+    Tests the API connection against the fake API server
+    """
+
+    def setUp(self):
+        """
+        Starts the fake API server and connects to it
+        :return: None
+        """
+        self.server = FakeApiServer()
+        self.server.start()
+        self.session = requests.Session()
+        self.api = ApiConnection(
+            "user", "password", self.server.url,
+            retries=2, backoff=0.0, session=self.session
+        )
+
+    def tearDown(self):
+        """
+        Stops the fake API server
+        :return: None
+        """
+        self.session.close()
+        self.server.stop()
+
+    def test_endpoints(self):
+        """
+        Tests retrieving the matchday data and placing bets
+        :return: None
+        """
+        self.assertTrue(self.api.authorized())
+        leagues = [tuple(x) for x in self.api.get_active_leagues()]
+        self.assertEqual(leagues, [("bl1", 2020), ("bl2", 2020)])
+        self.assertEqual(
+            self.api.get_league_table("bl1", 2020), self.server.teams["bl1"]
+        )
+        matches = self.api.get_current_matchday_matches("bl1", 2020)
+        self.assertEqual(len(matches), 9)
+        self.assertEqual(
+            self.api.execute_api_call("league_table/xyz/2020", "GET", True),
+            {"status": "error", "reason": "Unknown league"}
+        )
+
+        self.api.place_bets([Bet(match, 2, 1) for match in matches])
+        self.assertEqual(len(self.server.bets), 9)
+        self.assertEqual(set(self.server.bets.values()), {(2, 1)})
+
+    def test_rejected_key(self):
+        """
+        Tests that the connection logs in again once the server rejects
+        its API key
+        :return: None
+        """
+        self.server.api_keys.clear()
+        self.assertEqual(len(self.api.get_active_leagues()), 2)
+        self.assertEqual(self.server.request_counts["POST key"], 2)
+        self.assertEqual(self.server.request_counts["GET leagues"], 2)
+
+    def test_injected_errors(self):
+        """
+        Tests that server errors are only retried for idempotent requests
+        :return: None
+        """
+        matches = self.api.get_current_matchday_matches("bl1", 2020)
+        self.server.error_rate = 1.0
+        self.server.reset_counts()
+        data = self.api.execute_api_call("leagues", "GET", True)
+        self.assertEqual(data["status"], "error")
+        self.assertEqual(self.server.request_counts, {"GET leagues": 3})
+
+        self.server.reset_counts()
+        self.api.place_bets([Bet(matches[0], 2, 1)])
+        self.assertEqual(self.server.request_counts, {"PUT place_bets": 1})
+        self.assertEqual(self.server.bets, {})
+
+    def test_benchmark(self):
+        """
+        Tests that the benchmark measures every cycle of every runner and
+        that unchanged bets are not placed again. The bot's data in the
+        home directory must not be touched.
+        :return: None
+        """
+        registry = TeamRegistry.instance
+        with tempfile.TemporaryDirectory() as home:
+            with patch.dict(os.environ, {"HOME": home}):
+                results = run_benchmark(2, cycles=2)
+            config = os.path.join(home, ".config/betbot")
+            for name in ["history", "models", "ledger.db"]:
+                self.assertFalse(os.path.exists(os.path.join(config, name)))
+        TeamRegistry.instance = registry
+        self.assertEqual(
+            [(x["mode"], x["cycle"]) for x in results],
+            [("sequential", 1), ("sequential", 2), ("async", 1), ("async", 2)]
+        )
+        for first, second in [results[0:2], results[2:4]]:
+            self.assertEqual(first["accounts"], 2)
+            self.assertLess(second["requests"], first["requests"])
@@ -0,0 +1,234 @@
+"""LICENSE
+Copyright 2020 Hermann Krumrey <hermann@krumreyh.com>
+
+This file is part of betbot.
+
+betbot is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+betbot is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with betbot.  If not, see <http://www.gnu.org/licenses/>.
+LICENSE"""
+
+import os
+import time
+import tempfile
+import requests
+from typing import Iterator
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+from betbot.data.TeamRegistry import TeamRegistry
+from betbot.data.FootballDataCoUk import FootballDataUk
+
+HISTORY = """Div,Date,Time,HomeTeam,AwayTeam,FTHG,FTAG,B365H,WHH,WHD,WHA
+D1,18/09/2020,19:30,Bayern Munich,Schalke 04,8,0,1.1,1.12,9.0,21.0
+D1,19/09/2020,15:30,Dortmund,M'gladbach,3,0,1.6,1.65,4.2,5.0
+D1,19/09/2020,15:30,Nowhere FC,Dortmund,1,1,2.0,2.1,3.4,3.3
+D1,19/09/2020,15:30,Mainz,RB Leipzig,x,3,4.5,4.6,4.0,1.7
+D2,20/09/2020,13:30,Hamburg,Dusseldorf,2,1,2.3,2.4,3.5,2.9
+"""
+"""
+A football-data.co.uk file with an unknown team and an invalid score
+"""
+
+FIXTURES = HISTORY + (
+    "A1,19/09/2020,17:00,Wolfsberg,Bayern Munich,,,1.8,1.9,3.6,4.0\n"
+    "SC0,19/09/2020,15:00,Dortmund,Hamburg,,,2.5,2.6,3.2,2.7\n"
+)
+"""
+A fixtures file that also contains matches of other leagues
+"""
+
+
+class TestFootballData(TestCase):
+    """
+    Tests parsing football-data.co.uk files
+    """
+
+    def setUp(self):
+        """
+        Stores the history file in a temporary directory and uses a
+        separate team registry
+        :return: None
+        """
+        self.registry = TeamRegistry.instance
+        TeamRegistry.instance = TeamRegistry(None, fuzzy=False)
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.history_file = os.path.join(self.tempdir.name, "D1-2021.csv")
+        with open(self.history_file, "w") as f:
+            f.write(HISTORY)
+        self.fetcher = FootballDataUk(self.tempdir.name)
+
+        FootballDataUk.odds_cache = None
+
+    def tearDown(self):
+        """
+        Restores the process-wide team registry, clears the odds cache
+        and removes the temporary directory
+        :return: None
+        """
+        TeamRegistry.instance = self.registry
+        FootballDataUk.odds_cache = None
+        self.tempdir.cleanup()
+
+    @staticmethod
+    def response(
+            status_code: int,
+            etag: str = "",
+            content: str = HISTORY
+    ) -> MagicMock:
+        """
+        Creates a response of the fixtures file
+        :param status_code: The HTTP status code
+        :param etag: The ETag of the response
+        :param content: The contents of the fixtures file
+        :return: The response
+        """
+        resp = MagicMock()
+        resp.status_code = status_code
+        resp.content = content.encode("latin1")
+        resp.headers = {"ETag": etag} if etag else {}
+        return resp
+
+    def test_column_projection(self):
+        """
+        Tests that only the requested columns are loaded and that missing
+        columns and values are left out
+        :return: None
+        """
+        lines = ["Div,HomeTeam,AwayTeam,FTHG", "D1,FCB,S04,8", "D1,BVB"]
+        rows = list(FootballDataUk.read_history(
+            lines, ["HomeTeam", "FTHG", "WHH"]
+        ))
+        self.assertEqual(rows, [
+            {"HomeTeam": "FCB", "FTHG": "8"},
+            {"HomeTeam": "BVB"}
+        ])
+        self.assertEqual(
+            list(FootballDataUk.read_history(lines[:2])),
+            [{"Div": "D1", "HomeTeam": "FCB", "AwayTeam": "S04", "FTHG": "8"}]
+        )
+        self.assertEqual(list(FootballDataUk.read_history([])), [])
+
+    def test_streaming(self):
+        """
+        Tests that rows are parsed lazily
+        :return: None
+        """
+        def lines() -> Iterator[str]:
+            yield "HomeTeam,AwayTeam"
+            yield "FCB,S04"
+            raise AssertionError("Read past the first row")
+
+        rows = FootballDataUk.read_history(lines())
+        self.assertEqual(next(rows), {"HomeTeam": "FCB", "AwayTeam": "S04"})
+
+    def test_matches(self):
+        """
+        Tests that rows with unknown teams or invalid values are skipped
+        :return: None
+        """
+        matches = list(self.fetcher.iter_matches(self.history_file))
+        self.assertEqual(
+            [(x["home_team"], x["away_team"]) for x in matches],
+            [("FCB", "S04"), ("BVB", "BMG"), ("HSV", "F95")]
+        )
+        self.assertEqual(matches[0]["home_score"], 8)
+        self.assertEqual(
+            (matches[0]["home_odds"], matches[0]["draw_odds"],
+             matches[0]["away_odds"]),
+            (1.12, 9.0, 21.0)
+        )
+
+    def test_history_columns(self):
+        """
+        Tests that the history is loaded into columns with leagues,
+        seasons and dates
+        :return: None
+        """
+        columns = self.fetcher.get_history_columns()
+        teams = TeamRegistry.get()
+        self.assertEqual(columns["league"].tolist(), [0, 0, 1])
+        self.assertEqual(columns["season"].tolist(), [2020] * 3)
+        self.assertEqual(columns["date"].tolist(), [18523, 18524, 18525])
+        self.assertEqual(
+            [teams.abbreviation(x) for x in columns["home_team"].tolist()],
+            ["FCB", "BVB", "HSV"]
+        )
+        self.assertEqual(columns["away_score"].tolist(), [0, 0, 1])
+
+    def test_odds_ttl(self):
+        """
+        Tests that odds are only fetched again once the TTL expired and
+        that they are revalidated using a conditional request
+        :return: None
+        """
+        with patch("requests.get") as get:
+            get.return_value = self.response(200, "v1")
+            odds = self.fetcher.get_odds()
+            self.assertEqual(odds[("FCB", "S04")], (1.12, 9.0, 21.0))
+            self.assertEqual(len(odds), 3)
+            self.assertEqual(self.fetcher.get_odds(), odds)
+            self.assertEqual(get.call_count, 1)
+            self.assertNotIn("If-None-Match", get.call_args[1]["headers"])
+
+            FootballDataUk.odds_cache["fetched"] -= 16 * 60
+            get.return_value = self.response(304)
+            self.assertEqual(self.fetcher.get_odds(), odds)
+            self.assertEqual(get.call_count, 2)
+            self.assertEqual(
+                get.call_args[1]["headers"]["If-None-Match"], "v1"
+            )
+            self.assertGreater(
+                FootballDataUk.odds_cache["fetched"], time.time() - 60
+            )
+
+    def test_odds_cache_file(self):
+        """
+        Tests that fetched odds are shared with other processes using the
+        odds cache file and that it is used if a request fails
+        :return: None
+        """
+        cache_path = os.path.join(self.tempdir.name, "odds.json")
+        fetcher = FootballDataUk(self.tempdir.name, odds_cache_path=cache_path)
+        with patch("requests.get") as get:
+            get.return_value = self.response(200)
+            odds = fetcher.get_odds()
+
+            FootballDataUk.odds_cache = None
+            self.assertEqual(fetcher.get_odds(), odds)
+            self.assertEqual(get.call_count, 1)
+
+            FootballDataUk.odds_cache = None
+            other = FootballDataUk(
+                self.tempdir.name, odds_ttl=0, odds_cache_path=cache_path
+            )
+            get.side_effect = requests.ConnectionError()
+            self.assertEqual(other.get_odds(), odds)
+            self.assertEqual(get.call_count, 2)
+
+    def test_odds_leagues(self):
+        """
+        Tests that matches of other leagues are dropped before their team
+        names are resolved, so that they are not mistaken for known teams
+        with similar names
+        :return: None
+        """
+        registry = TeamRegistry(None)
+        TeamRegistry.instance = registry
+        fetcher = FootballDataUk(self.tempdir.name)
+        with patch("requests.get") as get:
+            get.return_value = self.response(200, content=FIXTURES)
+            odds = fetcher.get_odds()
+        self.assertEqual(
+            sorted(odds), [("BVB", "BMG"), ("FCB", "S04"), ("HSV", "F95")]
+        )
+        self.assertNotIn("wolfsberg", registry.aliases)
+        self.assertNotIn("wolfsberg", registry.unknown)
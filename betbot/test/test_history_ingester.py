@@ -0,0 +1,140 @@
+"""LICENSE
+Copyright 2020 Hermann Krumrey <hermann@krumreyh.com>
+
+This file is part of betbot.
+
+betbot is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+betbot is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with betbot.  If not, see <http://www.gnu.org/licenses/>.
+LICENSE"""
+
+import os
+import csv
+import tempfile
+from typing import List
+from datetime import datetime, timezone
+from unittest import TestCase
+from betbot.api.Match import Match
+from betbot.data.TeamRegistry import TeamRegistry
+from betbot.data.HistoryIngester import HistoryIngester
+from betbot.data.FootballDataCoUk import FootballDataUk
+
+
+class TestHistoryIngester(TestCase):
+    """
+    Tests ingesting finished matches into the local history
+    """
+
+    def setUp(self):
+        """
+        Uses a temporary data directory and a separate team registry
+        :return: None
+        """
+        self.registry = TeamRegistry.instance
+        TeamRegistry.instance = TeamRegistry(None, fuzzy=False)
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.ingester = HistoryIngester(self.tempdir.name)
+        self.kickoff = datetime(2020, 9, 18, 18, 30, tzinfo=timezone.utc)
+        self.odds = {"bl1": {("FCB", "S04"): (1.12, 9.0, 21.0)}}
+
+    def tearDown(self):
+        """
+        Restores the process-wide team registry and removes the
+        temporary directory
+        :return: None
+        """
+        TeamRegistry.instance = self.registry
+        self.tempdir.cleanup()
+
+    def match(self, matchday: int, finished: bool) -> Match:
+        """
+        Creates a match between FCB and S04
+        :param matchday: The matchday of the match
+        :param finished: Whether the match is finished
+        :return: The match
+        """
+        return Match(
+            "bl1", 2020, matchday, "FCB", "S04", finished, self.kickoff,
+            8 if finished else None, 0 if finished else None
+        )
+
+    def read_rows(self) -> List[List[str]]:
+        """
+        :return: The rows of the ingested history file
+        """
+        path = os.path.join(self.ingester.path, "api-bl1-2020.csv")
+        with open(path, "r", encoding="latin1", newline="") as f:
+            return list(csv.reader(f))
+
+    def test_round_trip(self):
+        """
+        Tests that captured odds are stored together with the result and
+        that the ingested match is part of the history
+        :return: None
+        """
+        self.assertEqual(
+            self.ingester.ingest([self.match(1, False)], self.odds), 0
+        )
+        self.assertEqual(self.ingester.ingest([self.match(1, True)], {}), 1)
+        self.assertEqual(self.read_rows(), [
+            FootballDataUk.HISTORY_COLUMNS,
+            ["D1", "18/09/2020", "FCB", "S04", "8", "0",
+             "1.12", "9.0", "21.0"]
+        ])
+
+        columns = FootballDataUk(self.tempdir.name).get_history_columns()
+        self.assertEqual(columns["season"].tolist(), [2020])
+        self.assertEqual(columns["home_score"].tolist(), [8])
+        self.assertEqual(columns["home_odds"].tolist(), [1.12])
+
+    def test_deduplication(self):
+        """
+        Tests that results are only ingested once, even by a new ingester
+        :return: None
+        """
+        self.ingester.ingest([self.match(1, False)], self.odds)
+        self.assertEqual(self.ingester.ingest([self.match(1, True)], {}), 1)
+        self.assertEqual(self.ingester.ingest([self.match(1, True)], {}), 0)
+
+        other = HistoryIngester(self.tempdir.name)
+        other.ingest([self.match(1, False)], self.odds)
+        self.assertEqual(other.ingest([self.match(1, True)], {}), 0)
+        self.assertEqual(len(self.read_rows()), 2)
+
+    def test_high_water_marks(self):
+        """
+        Tests that results of matchdays before the high-water mark are
+        skipped and that their captured odds are discarded
+        :return: None
+        """
+        self.ingester.ingest(
+            [self.match(1, False), self.match(2, False)], self.odds
+        )
+        self.assertEqual(self.ingester.ingest([self.match(2, True)], {}), 1)
+        self.assertEqual(self.ingester.ingest([self.match(1, True)], {}), 0)
+
+        state = self.ingester.load_state()
+        self.assertEqual(state["marks"]["bl1/2020"], {
+            "matchday": 2, "matches": ["FCB/S04"]
+        })
+        self.assertEqual(state["odds"], {})
+        self.assertEqual(len(self.read_rows()), 2)
+
+    def test_missing_odds(self):
+        """
+        Tests that results without captured pre-match odds are skipped
+        :return: None
+        """
+        self.assertEqual(self.ingester.ingest([self.match(1, True)], {}), 0)
+        self.assertFalse(os.path.isfile(
+            os.path.join(self.ingester.path, "api-bl1-2020.csv")
+        ))
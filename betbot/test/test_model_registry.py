@@ -0,0 +1,111 @@
+"""LICENSE
+Copyright 2020 Hermann Krumrey <hermann@krumreyh.com>
+
+This file is part of betbot.
+
+betbot is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+betbot is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with betbot.  If not, see <http://www.gnu.org/licenses/>.
+LICENSE"""
+
+import os
+import tempfile
+from unittest import TestCase
+from typing import Dict, Any, Tuple
+from joblib import dump
+from betbot.prediction.ModelRegistry import ModelRegistry
+
+
+class TestModelRegistry(TestCase):
+    """
+    Tests storing and retrieving model versions
+    """
+
+    def setUp(self):
+        """
+        Creates a model registry in a temporary directory
+        :return: None
+        """
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.registry = ModelRegistry(self.tempdir.name)
+        self.trained = 0
+
+    def tearDown(self):
+        """
+        Removes the temporary directory
+        :return: None
+        """
+        self.registry.wait()
+        self.tempdir.cleanup()
+
+    def train(self) -> Tuple[Dict[str, Any], str]:
+        """
+        Trains a dummy model
+        :return: The model and the fingerprint of its training data
+        """
+        self.trained += 1
+        return {"trained": self.trained}, "fingerprint"
+
+    def get_model(self, **kwargs: Any) -> Any:
+        """
+        Retrieves the dummy model from the registry
+        :param kwargs: Additional arguments for get_model
+        :return: The model or None
+        """
+        return self.registry.get_model(
+            "dummy", "teams", "fingerprint", self.train, **kwargs
+        )
+
+    def test_first_training(self):
+        """
+        Tests that a missing model is trained in the background and used
+        once the training is done
+        :return: None
+        """
+        self.assertIsNone(self.get_model())
+        self.registry.wait("dummy")
+        self.assertEqual(self.get_model(), {"trained": 1})
+        self.registry.wait("dummy")
+        self.assertEqual(self.trained, 1)
+
+    def test_incompatible_schema(self):
+        """
+        Tests that models with a different feature schema are not used
+        :return: None
+        """
+        self.get_model()
+        self.registry.wait("dummy")
+        model = self.registry.get_model(
+            "dummy", "teams,odds", "fingerprint", self.train
+        )
+        self.assertIsNone(model)
+
+    def test_legacy_import(self):
+        """
+        Tests that legacy models are imported with an unknown
+        scikit-learn version, so they are retrained instead of used
+        :return: None
+        """
+        legacy_path = os.path.join(self.tempdir.name, "dummy.model")
+        dump({"trained": 0}, legacy_path)
+        self.assertIsNone(self.get_model(legacy_path=legacy_path))
+        self.assertFalse(os.path.isfile(legacy_path))
+        self.registry.wait("dummy")
+        self.assertEqual(self.get_model(), {"trained": 1})
+
+        index = self.registry.load_index()["dummy"]["versions"]
+        legacy = [
+            meta for meta in index.values()
+            if meta["code_version"]["betbot"] == "legacy"
+        ]
+        self.assertEqual(len(legacy), 1)
+        self.assertEqual(legacy[0]["code_version"]["sklearn"], "unknown")
@@ -0,0 +1,117 @@
+"""LICENSE
+Copyright 2020 Hermann Krumrey <hermann@krumreyh.com>
+
+This file is part of betbot.
+
+betbot is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+betbot is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with betbot.  If not, see <http://www.gnu.org/licenses/>.
+LICENSE"""
+
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+from concurrent.futures import ThreadPoolExecutor
+from numpy import zeros, flatnonzero
+from betbot.data.TeamRegistry import TeamRegistry
+from betbot.data.FootballDataCoUk import FootballDataUk
+from betbot.evaluation.ModelSelection import ModelSelection
+from betbot.prediction.NameAndOddsPredictor import NameAndOddsPredictor
+
+
+class TestModelSelection(TestCase):
+    """
+    Tests the cross-validation of scikit-learn predictors
+    """
+
+    def setUp(self):
+        """
+        Creates a model selection with its own team registry
+        :return: None
+        """
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.selection = ModelSelection(
+            NameAndOddsPredictor, cache_path=self.tempdir.name
+        )
+        self.teams = TeamRegistry(None, fuzzy=False)
+        self.selection.predictor.teams = self.teams
+
+    def tearDown(self):
+        """
+        Removes the temporary directory
+        :return: None
+        """
+        self.tempdir.cleanup()
+
+    def test_fold_features(self):
+        """
+        Tests that the features of a fold only know the teams of its
+        training seasons
+        :return: None
+        """
+        matches = [
+            (2018, "FCB", "S04"),
+            (2018, "BVB", "FCB"),
+            (2019, "RBL", "BVB")
+        ]
+        history = zeros(len(matches), FootballDataUk.HISTORY_DTYPE)
+        history["season"] = [x[0] for x in matches]
+        history["home_team"] = [self.teams.register(x[1]) for x in matches]
+        history["away_team"] = [self.teams.register(x[2]) for x in matches]
+        history["home_score"] = [2, 1, 0]
+        history["away_score"] = [0, 1, 3]
+        for odds in ["home_odds", "draw_odds", "away_odds"]:
+            history[odds] = 2.0
+        columns = {name: history[name] for name in history.dtype.names}
+
+        season = columns["season"]
+        fold = self.selection.build_fold(
+            columns,
+            flatnonzero(season < 2019),
+            flatnonzero(season == 2019)
+        )
+        self.assertEqual(fold["train_inputs"].shape, (2, 3 + 3 + 3))
+        self.assertEqual(fold["validation_inputs"].shape, (1, 3 + 3 + 3))
+        home, away = fold["validation_inputs"][:, :3], \
+            fold["validation_inputs"][:, 3:6]
+        self.assertEqual(home.nnz, 0)
+        self.assertEqual(away.nnz, 1)
+        self.assertEqual(fold["home_score"].tolist(), [0])
+        self.assertEqual(fold["away_score"].tolist(), [3])
+        self.assertEqual(fold["train_outputs"].shape[0], 2)
+
+    def test_results(self):
+        """
+        Tests that the results of the candidates are reported as points
+        per match, both overall and per validation season
+        :return: None
+        """
+        scores = {0: (70, 10, 1.0), 1: (30, 20, 2.0)}
+        module = "betbot.evaluation.ModelSelection"
+        with patch(f"{module}.ProcessPoolExecutor", ThreadPoolExecutor), \
+                patch.object(self.selection, "prepare"), \
+                patch.object(
+                    ModelSelection, "load_folds",
+                    return_value={"seasons": [2019, 2020]}
+                ), \
+                patch.object(
+                    ModelSelection, "evaluate",
+                    side_effect=lambda cls, path, fold, config: scores[fold]
+                ):
+            self.selection.candidates = [{"alpha": 1.0}]
+            results = self.selection.run()
+        self.assertEqual(len(results), 1)
+        self.assertAlmostEqual(results[0]["points_per_match"], 100 / 30)
+        self.assertEqual(results[0]["points"], 100)
+        self.assertEqual(results[0]["matches"], 30)
+        self.assertEqual(results[0]["season_points"], {2019: 7.0, 2020: 1.5})
+        self.assertEqual(results[0]["seconds"], 3.0)
@@ -0,0 +1,127 @@
+"""LICENSE
+Copyright 2020 Hermann Krumrey <hermann@krumreyh.com>
+
+This file is part of betbot.
+
+betbot is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+betbot is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with betbot.  If not, see <http://www.gnu.org/licenses/>.
+LICENSE"""
+
+import time
+from threading import Event
+from unittest import TestCase
+from typing import List, Callable, Tuple
+from betbot.data.OddsAggregator import OddsAggregator, Odds
+
+WANTED = [("FCB", "S04"), ("BVB", "RBL")]
+"""
+The matches that require odds
+"""
+
+
+class TestOddsAggregator(TestCase):
+    """
+    Tests querying and merging odds from several sources
+    """
+
+    def setUp(self):
+        """
+        Prepares the call log of the sources
+        :return: None
+        """
+        self.calls: List[str] = []
+        self.release = Event()
+
+    def tearDown(self):
+        """
+        Releases sources that are still blocked
+        :return: None
+        """
+        self.release.set()
+
+    def source(self, name: str, odds: Odds, delay: float = 0.0) \
+            -> Callable[[str], Tuple[Odds, float]]:
+        """
+        Creates a source that records its calls
+        :param name: The name of the source
+        :param odds: The odds the source returns
+        :param delay: The amount of seconds the source takes at most.
+                      The source returns early once it is released.
+        :return: The source
+        """
+        def query(_: str) -> Tuple[Odds, float]:
+            self.calls.append(name)
+            self.release.wait(delay)
+            return odds, time.time()
+        return query
+
+    def test_skips_slower_sources(self):
+        """
+        Tests that later sources are not started if the first one
+        covers all matches
+        :return: None
+        """
+        odds = {match: (1.5, 3.0, 4.0) for match in WANTED}
+        aggregator = OddsAggregator("", sources={
+            "fast": self.source("fast", odds),
+            "slow": self.source("slow", {}, 10.0)
+        })
+        self.assertEqual(aggregator.get_odds("bl1", WANTED), odds)
+        self.assertEqual(self.calls, ["fast"])
+
+    def test_falls_back_to_next_source(self):
+        """
+        Tests that the next source is started right away if the previous
+        one does not cover all matches
+        :return: None
+        """
+        first = {WANTED[0]: (1.5, 3.0, 4.0)}
+        second = {WANTED[1]: (2.0, 3.0, 3.0)}
+        aggregator = OddsAggregator("", sources={
+            "first": self.source("first", first),
+            "second": self.source("second", second)
+        }, hedge=10.0)
+        start = time.monotonic()
+        merged = aggregator.get_odds("bl1", WANTED)
+        self.assertLess(time.monotonic() - start, 5.0)
+        self.assertEqual(merged, {**first, **second})
+        self.assertEqual(self.calls, ["first", "second"])
+
+    def test_hedges_slow_sources(self):
+        """
+        Tests that the next source is started if the previous one does
+        not answer within the hedge delay
+        :return: None
+        """
+        odds = {match: (1.5, 3.0, 4.0) for match in WANTED}
+        aggregator = OddsAggregator("", sources={
+            "slow": self.source("slow", {}, 10.0),
+            "fast": self.source("fast", odds)
+        }, hedge=0.1)
+        self.assertEqual(aggregator.get_odds("bl1", WANTED), odds)
+        self.assertEqual(self.calls, ["slow", "fast"])
+
+    def test_budget(self):
+        """
+        Tests that a query returns once the budget is spent and that
+        sources that were not started by then are skipped
+        :return: None
+        """
+        aggregator = OddsAggregator("", sources={
+            "slow": self.source("slow", {}, 10.0),
+            "skipped": self.source("skipped", {})
+        }, budget=0.2, hedge=1.0)
+        start = time.monotonic()
+        self.assertEqual(aggregator.get_odds("bl1", WANTED), {})
+        self.assertLess(time.monotonic() - start, 1.0)
+        self.assertEqual(self.calls, ["slow"])
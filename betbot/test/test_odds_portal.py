@@ -0,0 +1,156 @@
+"""LICENSE
+Copyright 2020 Hermann Krumrey <hermann@krumreyh.com>
+
+This file is part of betbot.
+
+betbot is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+betbot is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with betbot.  If not, see <http://www.gnu.org/licenses/>.
+LICENSE"""
+
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+from betbot.data.OddsPortal import OddsPortal
+from betbot.data.TeamRegistry import TeamRegistry
+
+TOURNAMENT_PAGE = """
+<html><body>
+<table id="tournamentTable" class="table-main">
+  <tr class="center nob-border"><th>Today, 18 Sep</th><th>1</th></tr>
+  <tr class="odd deactivate">
+    <td class="table-time">20:30</td>
+    <td class="name table-participant">
+      <a href="/soccer/germany/bundesliga/bayern-schalke/">
+        Bayern Munich - Schalke 04
+      </a>
+    </td>
+    <td class="odds-nowrp">1.15</td>
+    <td class="odds-nowrp">8.50</td>
+    <td class="odds-nowrp">15.00</td>
+  </tr>
+  <tr class="deactivate">
+    <td class="name table-participant">Dortmund - Mainz</td>
+    <td class="odds-nowrp">1.45</td>
+    <td class="odds-nowrp">4.75</td>
+    <td class="odds-nowrp">6.50</td>
+  </tr>
+  <tr class="deactivate">
+    <td class="name table-participant">Unknown Club - Freiburg</td>
+    <td class="odds-nowrp">2.10</td>
+    <td class="odds-nowrp">3.40</td>
+    <td class="odds-nowrp">3.30</td>
+  </tr>
+  <tr class="deactivate">
+    <td class="name table-participant">Hoffenheim - Augsburg</td>
+    <td class="odds-nowrp">1.90</td>
+    <td class="odds-nowrp">-</td>
+    <td class="odds-nowrp">4.00</td>
+  </tr>
+  <tr class="deactivate">
+    <td class="name table-participant">Leverkusen</td>
+    <td class="odds-nowrp">1.90</td>
+    <td class="odds-nowrp">3.60</td>
+    <td class="odds-nowrp">4.00</td>
+  </tr>
+</table>
+</body></html>
+"""
+"""
+A tournament page as rendered by oddsportal.com
+"""
+
+SCRIPT_PAGE = """
+<html><body><div id="app"></div><script src="/app.js"></script></body></html>
+"""
+"""
+A page whose tournament table is rendered using JavaScript
+"""
+
+
+class TestOddsPortal(TestCase):
+    """
+    Tests parsing oddsportal.com pages without network access
+    """
+
+    def setUp(self):
+        """
+        Creates a scraper that uses a team registry which is not persisted
+        :return: None
+        """
+        OddsPortal.browser_only.clear()
+        self.pool = MagicMock()
+        self.pool.browser.return_value.__enter__.return_value.page_source \
+            = TOURNAMENT_PAGE
+        self.portal = OddsPortal(self.pool)
+        self.portal.teams = TeamRegistry(None, fuzzy=False)
+
+    def tearDown(self):
+        """
+        Forgets the pages that were marked as browser only
+        :return: None
+        """
+        OddsPortal.browser_only.clear()
+
+    def test_parse_odds(self):
+        """
+        Tests that valid rows are parsed and invalid rows are skipped
+        :return: None
+        """
+        odds = self.portal.parse_odds(TOURNAMENT_PAGE)
+        self.assertEqual(odds, {
+            ("FCB", "S04"): (1.15, 8.5, 15.0),
+            ("BVB", "M05"): (1.45, 4.75, 6.5)
+        })
+
+    def test_parse_without_table(self):
+        """
+        Tests that pages without a tournament table yield no odds
+        :return: None
+        """
+        self.assertEqual(self.portal.parse_odds(SCRIPT_PAGE), {})
+        self.assertEqual(self.portal.parse_odds(""), {})
+
+    def test_http_fast_path(self):
+        """
+        Tests that server-rendered pages do not require a browser
+        :return: None
+        """
+        response = MagicMock(status_code=200, text=TOURNAMENT_PAGE)
+        with patch("requests.get", return_value=response) as get:
+            odds = self.portal.get_odds("bl1")
+        self.assertEqual(len(odds), 2)
+        self.assertEqual(get.call_count, 1)
+        self.pool.browser.assert_not_called()
+
+    def test_browser_fallback(self):
+        """
+        Tests that pages rendered using JavaScript are fetched using the
+        browser, without trying a plain HTTP request again
+        :return: None
+        """
+        response = MagicMock(status_code=200, text=SCRIPT_PAGE)
+        with patch("requests.get", return_value=response) as get:
+            first = self.portal.get_odds("bl1")
+            second = self.portal.get_odds("bl1")
+        self.assertEqual(len(first), 2)
+        self.assertEqual(first, second)
+        self.assertEqual(get.call_count, 1)
+        self.assertEqual(self.pool.browser.call_count, 2)
+
+    def test_unknown_league(self):
+        """
+        Tests that unsupported leagues yield no odds
+        :return: None
+        """
+        with patch("requests.get") as get:
+            self.assertEqual(self.portal.get_odds("pl"), {})
+        get.assert_not_called()
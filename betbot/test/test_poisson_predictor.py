@@ -0,0 +1,142 @@
+"""LICENSE
+Copyright 2020 Hermann Krumrey <hermann@krumreyh.com>
+
+This file is part of betbot.
+
+betbot is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+betbot is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with betbot.  If not, see <http://www.gnu.org/licenses/>.
+LICENSE"""
+
+from unittest import TestCase
+from numpy import zeros, arange, array, exp, allclose, tril, triu
+from numpy.random import default_rng
+from betbot.api.Match import Match
+from betbot.data.TeamRegistry import TeamRegistry
+from betbot.data.FootballDataCoUk import FootballDataUk
+from betbot.prediction.PoissonPredictor import PoissonPredictor
+
+STRENGTHS = {"FCB": 1.0, "BVB": 0.2, "M05": -0.2, "S04": -0.5}
+"""
+The log strengths of the teams of the synthetic history
+"""
+
+
+class TestPoissonPredictor(TestCase):
+    """
+    Tests fitting the Poisson model on synthetic history and predicting
+    matches with it
+    """
+
+    def setUp(self):
+        """
+        Fits the model on a synthetic history in which FCB is by far the
+        strongest team
+        :return: None
+        """
+        self.registry = TeamRegistry.instance
+        TeamRegistry.instance = TeamRegistry(None, fuzzy=False)
+        teams = TeamRegistry.get()
+
+        rng = default_rng(42)
+        pairs = [
+            (home, away) for home in STRENGTHS for away in STRENGTHS
+            if home != away
+        ] * 20
+        history = zeros(len(pairs), FootballDataUk.HISTORY_DTYPE)
+        history["season"] = 2019
+        history["date"] = 18000 + arange(len(pairs)) // 6
+        history["home_team"] = [teams.register(x[0]) for x in pairs]
+        history["away_team"] = [teams.register(x[1]) for x in pairs]
+        history["home_score"] = [
+            rng.poisson(1.5 * exp(STRENGTHS[h] - STRENGTHS[a]))
+            for h, a in pairs
+        ]
+        history["away_score"] = [
+            rng.poisson(1.1 * exp(STRENGTHS[a] - STRENGTHS[h]))
+            for h, a in pairs
+        ]
+        columns = {name: history[name] for name in history.dtype.names}
+
+        self.predictor = PoissonPredictor(None, "bl1", 2020, load_model=False)
+        self.predictor.fit_history(columns)
+        self.teams = teams
+
+    def tearDown(self):
+        """
+        Restores the process-wide team registry
+        :return: None
+        """
+        TeamRegistry.instance = self.registry
+
+    def test_strengths(self):
+        """
+        Tests that the fitted strengths reflect the synthetic history
+        :return: None
+        """
+        model = self.predictor.model
+        strong = self.teams.register("FCB")
+        weak = self.teams.register("S04")
+        self.assertGreater(model["attack"][strong], model["attack"][weak])
+        self.assertGreater(model["defence"][strong], model["defence"][weak])
+        self.assertGreater(model["home"], 0.0)
+
+    def test_probabilities(self):
+        """
+        Tests that the result probabilities are normalized and favour the
+        strong team
+        :return: None
+        """
+        fcb, s04, bvb = [self.teams.register(x) for x in ["FCB", "S04", "BVB"]]
+        probabilities = self.predictor.probabilities(
+            array([fcb, s04, bvb]), array([s04, fcb, fcb])
+        )
+        size = self.predictor.max_goals + 1
+        self.assertEqual(probabilities.shape, (3, size, size))
+        self.assertTrue((probabilities >= 0).all())
+        self.assertTrue(allclose(probabilities.sum(axis=(1, 2)), 1.0))
+
+        home_wins = tril(probabilities, -1).sum(axis=(1, 2))
+        away_wins = triu(probabilities, 1).sum(axis=(1, 2))
+        self.assertGreater(home_wins[0], away_wins[0])
+        self.assertGreater(away_wins[1], home_wins[1])
+        self.assertGreater(away_wins[2], home_wins[2])
+
+    def test_predict(self):
+        """
+        Tests that bets favour the strong team and that unknown teams
+        are predicted as well
+        :return: None
+        """
+        matches = [
+            Match("bl1", 2020, 1, "FCB", "S04", False),
+            Match("bl1", 2020, 1, "S04", "FCB", False),
+            Match("bl1", 2020, 1, "RBL", "SCF", False)
+        ]
+        bets = self.predictor.predict(matches)
+        self.assertEqual([x.match for x in bets], matches)
+        self.assertGreater(bets[0].home_score, bets[0].away_score)
+        self.assertLess(bets[1].home_score, bets[1].away_score)
+        for bet in bets:
+            self.assertTrue(0 <= bet.home_score <= self.predictor.max_goals)
+            self.assertTrue(0 <= bet.away_score <= self.predictor.max_goals)
+
+    def test_schema(self):
+        """
+        Tests that the feature schema changes with the team registry,
+        since the team strengths are indexed by team ID
+        :return: None
+        """
+        schema = PoissonPredictor.feature_schema()
+        self.assertEqual(schema, PoissonPredictor.feature_schema())
+        self.teams.register("XYZ")
+        self.assertNotEqual(schema, PoissonPredictor.feature_schema())
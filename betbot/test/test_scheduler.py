@@ -0,0 +1,126 @@
+"""LICENSE
+Copyright 2020 Hermann Krumrey <hermann@krumreyh.com>
+
+This file is part of betbot.
+
+betbot is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+betbot is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with betbot.  If not, see <http://www.gnu.org/licenses/>.
+LICENSE"""
+
+import asyncio
+from unittest import TestCase
+from datetime import datetime, timedelta, timezone
+from betbot.api.Match import Match
+from betbot.scheduling.Scheduler import Scheduler
+from betbot.scheduling.SimulatedClock import SimulatedClock
+
+
+class TestScheduler(TestCase):
+    """
+    Tests the scheduling of bot cycles using a simulated clock
+    """
+
+    def setUp(self):
+        """
+        Creates a scheduler that uses a simulated clock
+        :return: None
+        """
+        self.start = datetime(2020, 9, 18, 12, 0, tzinfo=timezone.utc)
+        self.clock = SimulatedClock(self.start)
+        self.scheduler = Scheduler(
+            self.clock,
+            min_interval=5 * 60,
+            max_interval=12 * 60 * 60,
+            idle_interval=24 * 60 * 60,
+            deadline_margin=2 * 60,
+            approach_factor=0.5
+        )
+
+    def match(self, hours: float, finished: bool = False) -> Match:
+        """
+        Creates a match
+        :param hours: The hours from the start until kickoff
+        :param finished: Whether the match is finished
+        :return: The match
+        """
+        return Match(
+            "bl1", 2020, 1, "FCB", "S04", finished,
+            self.start + timedelta(hours=hours)
+        )
+
+    def test_idle_without_open_matches(self):
+        """
+        Tests that the idle interval is used if no match is open
+        :return: None
+        """
+        self.assertEqual(self.scheduler.next_delay([]), 24 * 60 * 60)
+        matches = [self.match(-1), self.match(5, True)]
+        self.assertEqual(self.scheduler.next_delay(matches), 24 * 60 * 60)
+
+    def test_approaching_deadline(self):
+        """
+        Tests that the delay shrinks as the next deadline approaches
+        :return: None
+        """
+        remaining = 10 * 60 * 60 - 2 * 60
+        delay = self.scheduler.next_delay([self.match(10), self.match(30)])
+        self.assertEqual(delay, remaining / 2)
+
+        far = self.scheduler.next_delay([self.match(48)])
+        self.assertEqual(far, 12 * 60 * 60)
+
+        self.clock.advance(remaining - 4 * 60)
+        delay = self.scheduler.next_delay([self.match(10)])
+        self.assertEqual(delay, 4 * 60)
+
+    def test_wait(self):
+        """
+        Tests that waiting advances the monotonic clock by the delay
+        :return: None
+        """
+        self.scheduler.wait(90)
+        self.assertEqual(self.clock.monotonic(), 90)
+        self.assertEqual(self.clock.sleeps, [90])
+        self.scheduler.wait(0)
+        self.assertEqual(self.clock.sleeps, [90])
+
+    def test_async_wait(self):
+        """
+        Tests that waiting asynchronously advances the monotonic clock
+        by the delay
+        :return: None
+        """
+        asyncio.run(self.scheduler.async_wait(120))
+        self.assertEqual(self.clock.monotonic(), 120)
+        self.assertEqual(self.clock.sleeps, [120])
+
+    def test_cycles_until_deadline(self):
+        """
+        Tests that a loop of cycles reaches the betting deadline without
+        passing it and without polling too often
+        :return: None
+        """
+        match = self.match(36)
+        deadline = match.kickoff - timedelta(minutes=2)
+        cycles = 0
+        while self.clock.now() < deadline:
+            delay = self.scheduler.next_delay([match])
+            if delay == 24 * 60 * 60:
+                break
+            self.scheduler.wait(delay)
+            cycles += 1
+
+        self.assertEqual(self.clock.now(), deadline)
+        self.assertLess(cycles, 15)
+        for delay in self.clock.sleeps[:-1]:
+            self.assertGreaterEqual(delay, 5 * 60)
@@ -0,0 +1,60 @@
+"""LICENSE
+Copyright 2020 Hermann Krumrey <hermann@krumreyh.com>
+
+This file is part of betbot.
+
+betbot is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+betbot is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with betbot.  If not, see <http://www.gnu.org/licenses/>.
+LICENSE"""
+
+from unittest import TestCase
+from numpy import array
+from betbot.prediction.NamePredictor import NamePredictor
+from betbot.prediction.NameAndOddsPredictor import NameAndOddsPredictor
+
+
+class TestSKLearnPredictor(TestCase):
+    """
+    Tests decoding the results of scikit-learn regressors
+    """
+
+    def test_interpret_batch(self):
+        """
+        Tests that encoded results are decoded into scorelines
+        :return: None
+        """
+        results = array([[1 / 3, 1 / 2], [1, 1 / 4], [1 / 2, 1 / 2]])
+        home, away = NameAndOddsPredictor.interpret_batch(results)
+        self.assertEqual(home.tolist(), [2, 0, 1])
+        self.assertEqual(away.tolist(), [1, 3, 1])
+
+    def test_clipping(self):
+        """
+        Tests that results outside of the encoded range are clipped
+        :return: None
+        """
+        results = array([[2.0, -1.0], [0.0, 0.5]])
+        home, away = NameAndOddsPredictor.interpret_batch(results)
+        self.assertEqual(home.tolist(), [0, 10])
+        self.assertEqual(away.tolist(), [10, 1])
+
+    def test_name_predictor_avoids_draws(self):
+        """
+        Tests that the name predictor turns draws into wins for the team
+        with the better result
+        :return: None
+        """
+        results = array([[0.35, 0.3], [0.3, 0.35], [2.0, 2.0]])
+        home, away = NamePredictor.interpret_batch(results)
+        self.assertEqual(home.tolist(), [2, 3, 0])
+        self.assertEqual(away.tolist(), [3, 2, 1])
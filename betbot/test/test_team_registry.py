@@ -0,0 +1,109 @@
+"""LICENSE
+Copyright 2020 Hermann Krumrey <hermann@krumreyh.com>
+
+This file is part of betbot.
+
+betbot is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+betbot is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with betbot.  If not, see <http://www.gnu.org/licenses/>.
+LICENSE"""
+
+import os
+import tempfile
+from unittest import TestCase
+from betbot.data.TeamRegistry import TeamRegistry
+
+
+class TestTeamRegistry(TestCase):
+    """
+    Tests resolving team names to team IDs
+    """
+
+    def setUp(self):
+        """
+        Creates a team registry persisted in a temporary directory
+        :return: None
+        """
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tempdir.name, "teams.json")
+        self.registry = TeamRegistry(self.path)
+
+    def tearDown(self):
+        """
+        Removes the temporary directory
+        :return: None
+        """
+        self.tempdir.cleanup()
+
+    def test_resolve_aliases(self):
+        """
+        Tests that known aliases are resolved regardless of accents,
+        case and punctuation
+        :return: None
+        """
+        self.assertEqual(self.registry.resolve_abbreviation("FCB"), "FCB")
+        self.assertEqual(
+            self.registry.resolve_abbreviation("Bayern Munich"), "FCB"
+        )
+        self.assertEqual(
+            self.registry.resolve_abbreviation("fortuna düsseldorf"), "F95"
+        )
+        self.assertEqual(
+            self.registry.resolve_abbreviation("St. Pauli"), "STP"
+        )
+
+    def test_fuzzy_matches_are_not_persisted(self):
+        """
+        Tests that fuzzy matches are only remembered in memory
+        :return: None
+        """
+        self.assertEqual(
+            self.registry.resolve_abbreviation("Bayern Munchen"), "FCB"
+        )
+        self.assertFalse(os.path.isfile(self.path))
+        reloaded = TeamRegistry(self.path, fuzzy=False)
+        self.assertIsNone(reloaded.resolve_abbreviation("Bayern Munchen"))
+
+    def test_similar_clubs(self):
+        """
+        Tests that clubs whose names are spelled similarly to known teams
+        are not matched to them
+        :return: None
+        """
+        self.assertIsNone(self.registry.resolve("Wolfsberg"))
+        self.assertIsNone(self.registry.resolve("Fribourg"))
+        self.assertIsNone(self.registry.resolve("Freiberg"))
+        self.assertEqual(
+            self.registry.resolve_abbreviation("Greuther Fuerth"), "SGF"
+        )
+
+    def test_reserve_squads(self):
+        """
+        Tests that reserve and youth squads are not matched to their
+        first teams
+        :return: None
+        """
+        self.assertIsNone(self.registry.resolve("Schalke 04 II"))
+        self.assertIsNone(self.registry.resolve("Schalke 04 U19"))
+
+    def test_register(self):
+        """
+        Tests that registered teams get stable IDs and are persisted
+        :return: None
+        """
+        known = len(self.registry)
+        team_id = self.registry.register("XYZ")
+        self.assertEqual(team_id, known)
+        self.assertEqual(self.registry.register("XYZ"), team_id)
+        reloaded = TeamRegistry(self.path)
+        self.assertEqual(reloaded.team_id("XYZ"), team_id)
+        self.assertNotEqual(reloaded.version, TeamRegistry(None).version)
@@ -41,6 +41,7 @@ if __name__ == "__main__":
         scripts=list(map(lambda x: os.path.join("bin", x), os.listdir("bin"))),
         install_requires=[
             "requests",
+            "aiohttp",
             "beautifulsoup4",
             "puffotter",
             "scikit-learn",